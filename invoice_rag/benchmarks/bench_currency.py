@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Benchmark: legacy regex currency parser vs. src.currency
+
+Times both implementations over a generated corpus of Indonesian and English
+money strings and checks that every result matches. The legacy parser is
+kept here verbatim as the reference; --write-golden regenerates
+tests/data/currency_golden.json from it.
+
+Usage:
+    python benchmarks/bench_currency.py [--rounds N] [--write-golden]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import re
+import sys
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.currency import _parse_number, parse_currency, parse_currency_batch  # noqa: E402
+
+GOLDEN_PATH = os.path.join(project_root, "tests", "data", "currency_golden.json")
+
+
+def legacy_parse_indonesian_currency(value_str):
+    """Parse Indonesian currency format to float.
+
+    Indonesian format examples:
+    - "59.385" -> 59385.0 (dots as thousands separator)
+    - "6.000.000" -> 6000000.0 (multiple dots as thousands separators)
+    - "25,500" -> 25500.0 (comma as decimal separator)
+    - "59.385,50" -> 59385.5 (dots for thousands, comma for decimal)
+    - "RP 500,000.00" -> 500000.0 (with currency prefix)
+    - "Rp136.000" -> 136000.0 (various currency formats)
+
+    NOTE: Rejects invalid range formats like "-20000-60000"
+    """
+    if not value_str:
+        return 0.0
+
+    # Convert to string and clean
+    value_str = str(value_str).strip()
+
+    # Handle edge cases that might cause errors
+    if not value_str or value_str.lower() in ["null", "none", "-", ""]:
+        return 0.0
+
+    # VALIDATION: Reject obvious invalid formats
+    original_value = value_str
+
+    # Remove currency symbols more thoroughly
+    # First remove common currency patterns
+    value_str = re.sub(r"\b[Rp]+\b", "", value_str, flags=re.IGNORECASE)
+    value_str = re.sub(r"\s+", "", value_str)  # Remove all spaces
+
+    # STRICT VALIDATION: Check for suspicious range patterns
+    # Count dashes and numbers to detect invalid ranges
+    if "-" in value_str:
+        dash_count = value_str.count("-")
+        # If multiple dashes or complex patterns, it might be invalid
+        parts = [p for p in value_str.split("-") if p and p.strip()]
+
+        # If we have multiple numeric parts separated by dashes, this is suspicious
+        if len(parts) > 2:
+            print(
+                f"[WARNING] Suspicious range format detected: '{original_value}' - rejecting"
+            )
+            return 0.0
+
+        # If we have exactly 2 parts and both are purely numeric (no dots/commas)
+        # this is likely an invalid range format
+        if len(parts) == 2 and all(p.isdigit() for p in parts):
+            print(
+                f"[WARNING] Invalid range format detected: '{original_value}' - rejecting"
+            )
+            return 0.0
+
+        # Handle legitimate cases like negative numbers
+        if dash_count >= 2 or (
+            dash_count == 1
+            and not (value_str.startswith("-") and len(value_str.split("-")) == 2)
+        ):
+            # This might be a range, take the last number only if it's reasonable
+            if len(parts) > 1:
+                value_str = parts[-1]  # Take the last non-empty part
+
+    # Remove any remaining non-numeric characters except dots and commas
+    value_str = re.sub(
+        r"[^\d.,]", "", value_str
+    )  # Remove the \- from regex since we handled ranges
+
+    if not value_str:
+        return 0.0
+
+    # Check if it has both dots and comma (Indonesian full format)
+    if "." in value_str and "," in value_str:
+        # Determine which is decimal separator
+        # In Indonesian: dots for thousands, comma for decimal
+        # But also handle English format: comma for thousands, dot for decimal
+
+        # Find last dot and comma positions
+        last_dot = value_str.rfind(".")
+        last_comma = value_str.rfind(",")
+
+        if last_comma > last_dot:
+            # Comma comes after dot: "59.385,50" (Indonesian format)
+            parts = value_str.split(",")
+            integer_part = parts[0].replace(".", "")  # Remove thousand separators
+            decimal_part = parts[1] if len(parts) > 1 else "0"
+            try:
+                return float(f"{integer_part}.{decimal_part}")
+            except ValueError:
+                return 0.0
+        else:
+            # Dot comes after comma: "500,000.00" (English format)
+            parts = value_str.split(".")
+            integer_part = parts[0].replace(",", "")  # Remove thousand separators
+            decimal_part = parts[1] if len(parts) > 1 else "0"
+            try:
+                return float(f"{integer_part}.{decimal_part}")
+            except ValueError:
+                return 0.0
+
+    # Check if it only has comma (could be decimal or thousands)
+    elif "," in value_str and value_str.count(",") == 1:
+        # Could be decimal or thousands separator
+        parts = value_str.split(",")
+        if len(parts) == 2:
+            # If the part after comma has 3 digits, it's thousands
+            if len(parts[1]) == 3 and parts[1].isdigit():
+                try:
+                    return float(value_str.replace(",", ""))
+                except ValueError:
+                    return 0.0
+            # Otherwise it's decimal
+            else:
+                try:
+                    return float(value_str.replace(",", "."))
+                except ValueError:
+                    return 0.0
+
+    # Check if it only has dots
+    elif "." in value_str:
+        dot_count = value_str.count(".")
+        if dot_count > 1:
+            # Multiple dots = thousands separators, e.g., "6.000.000"
+            try:
+                return float(value_str.replace(".", ""))
+            except ValueError:
+                return 0.0
+        else:
+            # Single dot - check context to determine if thousands or decimal
+            parts = value_str.split(".")
+            if len(parts) == 2:
+                # If last part has exactly 3 digits, likely thousands separator
+                if len(parts[1]) == 3 and parts[1].isdigit() and len(parts[0]) <= 3:
+                    try:
+                        return float(value_str.replace(".", ""))
+                    except ValueError:
+                        return 0.0
+                else:
+                    # Otherwise treat as decimal separator
+                    try:
+                        return float(value_str)
+                    except ValueError:
+                        return 0.0
+
+    # No special characters, just convert
+    try:
+        return float(value_str)
+    except ValueError:
+        return 0.0
+
+
+def _group(number, sep):
+    digits = str(number)
+    groups = []
+    while len(digits) > 3:
+        groups.insert(0, digits[-3:])
+        digits = digits[:-3]
+    groups.insert(0, digits)
+    return sep.join(groups)
+
+
+def build_corpus(size=4000, seed=42):
+    """Generate realistic and adversarial money values (deterministic)."""
+    rng = random.Random(seed)
+    corpus = [
+        None, "", " ", "null", "None", "NULL", "-", "0", 0, 0.0, 1500, -2500, 12.5, 59.385,
+        "59.385", "6.000.000", "25,500", "59.385,50", "RP 500,000.00", "Rp136.000",
+        "Rp. 15.000", "IDR 45,000", "Rp 1.250.000,-", "Rp-5000", "-20000-60000",
+        "20000-60000", "20.000-60.000", "Rp 20.000 - Rp 60.000", "1-2-3", "--5000",
+        "5000--", "-12,50", "1,000,000", "1,000,000.50", "1.000.000,50", "1,2.3,4",
+        "12,", ",5", ".", ",", "..", ".50", "1.", "1234.567", "123.4567", "12.34",
+        "Total: Rp 87.500", "Rp87.500,00", "USD 12.99", "$1,299.00", "€ 3,50",
+        "rp 10.000", "pRp 10.000", "RpRp 5.000", "R 2.500", "p 2.500", "Rp10-20",
+        "Rp 10 - 20", "10.000 x 2", "2 x 10.000", "½", "١٢٣", "１２,５００", "Rp\u00a015.000",
+    ]
+    prefixes = ["", "", "", "Rp", "Rp ", "RP ", "Rp. ", "IDR ", "idr", "$", "USD "]
+    suffixes = ["", "", "", ",-", ",00", ".00", " ", " IDR", "-"]
+    for _ in range(size):
+        amount = rng.choice([rng.randint(0, 999), rng.randint(1000, 999999), rng.randint(10**6, 10**9)])
+        cents = rng.randint(0, 99)
+        style = rng.randrange(8)
+        if style == 0:
+            number = _group(amount, ".")
+        elif style == 1:
+            number = _group(amount, ",")
+        elif style == 2:
+            number = f"{_group(amount, '.')},{cents:02d}"
+        elif style == 3:
+            number = f"{_group(amount, ',')}.{cents:02d}"
+        elif style == 4:
+            number = str(amount)
+        elif style == 5:
+            number = f"{amount}.{cents}"
+        elif style == 6:
+            number = f"{_group(amount, rng.choice('.,'))}-{_group(rng.randint(0, 99999), '.')}"
+        else:
+            number = "".join(rng.choice("0123456789.,- ") for _ in range(rng.randint(1, 9)))
+        corpus.append(rng.choice(prefixes) + number + rng.choice(suffixes))
+    return corpus
+
+
+def legacy_results(corpus):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return [legacy_parse_indonesian_currency(value) for value in corpus]
+
+
+def time_it(func, rounds):
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(rounds):
+            func()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark currency parsing")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--write-golden", action="store_true", help=f"Rewrite {GOLDEN_PATH}")
+    args = parser.parse_args()
+
+    corpus = build_corpus()
+    expected = legacy_results(corpus)
+
+    if args.write_golden:
+        with open(GOLDEN_PATH, "w", encoding="utf-8") as golden_file:
+            rows = (json.dumps([value, result], ensure_ascii=False) for value, result in zip(corpus, expected))
+            golden_file.write("[\n" + ",\n".join(rows) + "\n]\n")
+        print(f"Wrote {len(corpus)} cases to {GOLDEN_PATH}")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        actual = parse_currency_batch(corpus)
+    mismatches = [(v, e, a) for v, e, a in zip(corpus, expected, actual) if e != a]
+    print(f"Corpus: {len(corpus)} values, {len(mismatches)} mismatches")
+    for value, legacy, new in mismatches[:10]:
+        print(f"  {value!r}: legacy={legacy} new={new}")
+
+    legacy_time = time_it(lambda: [legacy_parse_indonesian_currency(v) for v in corpus], args.rounds)
+    single_time = time_it(lambda: [parse_currency(v) for v in corpus], args.rounds)
+    _parse_number.cache_clear()
+    cold_time = time_it(lambda: (_parse_number.cache_clear(), parse_currency_batch(corpus)), args.rounds)
+    batch_time = time_it(lambda: parse_currency_batch(corpus), args.rounds)
+
+    per_value = 1e6 / (len(corpus) * args.rounds)
+    print(f"legacy:              {legacy_time * per_value:6.2f} us/value")
+    print(f"parse_currency:      {single_time * per_value:6.2f} us/value ({legacy_time / single_time:.1f}x)")
+    print(f"batch (cold cache):  {cold_time * per_value:6.2f} us/value ({legacy_time / cold_time:.1f}x)")
+    print(f"batch (warm cache):  {batch_time * per_value:6.2f} us/value ({legacy_time / batch_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
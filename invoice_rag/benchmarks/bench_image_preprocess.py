@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark: raw base64 upload vs. the image preprocessing stage
+
+Compares payload size and preparation time for every image in a folder
+(default: invoices/). With --llm it also times the full extraction through
+Groq for both paths, so the end-to-end latency difference can be measured.
+
+Usage:
+    python benchmarks/bench_image_preprocess.py [image_dir] [--llm]
+"""
+
+import argparse
+import base64
+import os
+import sys
+import time
+from io import BytesIO
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.image_preprocess import guess_mime_type, preprocess_image_bytes  # noqa: E402
+from src.metrics import percentile  # noqa: E402
+
+
+def synthetic_photo():
+    """Build a phone-sized JPEG (4000x3000) when no sample images are available."""
+    from PIL import Image, ImageDraw
+    import numpy as np
+
+    noise = np.random.default_rng(0).integers(90, 160, (3000, 4000, 3), dtype=np.uint8)
+    image = Image.fromarray(noise)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((1400, 200, 2600, 2800), fill=(245, 245, 240))
+    for row in range(40):
+        draw.text((1450, 260 + row * 60), f"ITEM {row:02d}   1 x 12.500   12.500", fill=(20, 20, 20))
+
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=92)
+    return buffer.getvalue()
+
+
+def load_images(image_dir):
+    images = []
+    if os.path.isdir(image_dir):
+        for name in sorted(os.listdir(image_dir)):
+            if name.lower().endswith((".jpg", ".jpeg", ".png", ".webp")):
+                with open(os.path.join(image_dir, name), "rb") as image_file:
+                    images.append((name, image_file.read()))
+    if not images:
+        print(f"No images found in {image_dir} - using a synthetic 4000x3000 photo")
+        images.append(("synthetic.jpg", synthetic_photo()))
+    return images
+
+
+def time_llm(name, base64_image, mime_type):
+    from src.processor import process_invoice_with_llm
+
+    started = time.perf_counter()
+    result = process_invoice_with_llm(name, base64_image=base64_image, mime_type=mime_type)
+    return time.perf_counter() - started, result is not None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark image preprocessing")
+    parser.add_argument("image_dir", nargs="?", default="invoices")
+    parser.add_argument("--llm", action="store_true", help="Also time end-to-end Groq extraction")
+    args = parser.parse_args()
+
+    images = load_images(args.image_dir)
+    raw_total = prepared_total = 0
+    prep_times, raw_llm, prepared_llm = [], [], []
+
+    print(f"{'image':<30} {'raw payload':>12} {'prepared':>12} {'ratio':>7} {'prep ms':>8}")
+    for name, raw_bytes in images:
+        raw_b64 = base64.b64encode(raw_bytes).decode("utf-8")
+
+        started = time.perf_counter()
+        prepared_bytes, mime_type = preprocess_image_bytes(raw_bytes)
+        prepared_b64 = base64.b64encode(prepared_bytes).decode("utf-8")
+        prep_times.append(time.perf_counter() - started)
+
+        raw_total += len(raw_b64)
+        prepared_total += len(prepared_b64)
+        print(
+            f"{name[:30]:<30} {len(raw_b64) / 1024:>10.0f}KB {len(prepared_b64) / 1024:>10.0f}KB "
+            f"{len(prepared_b64) / len(raw_b64):>7.2f} {prep_times[-1] * 1000:>8.1f}"
+        )
+
+        if args.llm:
+            raw_llm.append(time_llm(name, raw_b64, guess_mime_type(raw_bytes)))
+            prepared_llm.append(time_llm(name, prepared_b64, mime_type))
+
+    print("\nSUMMARY")
+    print(f"Images: {len(images)}")
+    print(f"Payload: {raw_total / 1024:,.0f}KB raw -> {prepared_total / 1024:,.0f}KB prepared "
+          f"({prepared_total / raw_total:.0%})")
+    print(f"Preprocessing time: p50 {percentile(prep_times, 50) * 1000:.1f}ms, "
+          f"p95 {percentile(prep_times, 95) * 1000:.1f}ms")
+
+    if args.llm:
+        for label, runs in (("raw", raw_llm), ("prepared", prepared_llm)):
+            latencies = [elapsed for elapsed, _ in runs]
+            successes = sum(1 for _, ok in runs if ok)
+            print(f"LLM end-to-end ({label}): p50 {percentile(latencies, 50):.2f}s, "
+                  f"p95 {percentile(latencies, 95):.2f}s, {successes}/{len(runs)} extracted")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark: verbose vs. compact extraction output schema
+
+Offline, it renders synthetic receipts of growing length in both schemas and
+compares their size, checking that the compact form decodes to the same
+validated invoice. Both schemas are serialized without whitespace, so the
+comparison measures the schema (short keys, positional item rows) and not
+indentation. Sizes are reported in bytes and in approximate tokens (a rough
+BPE stand-in; no model tokenizer is available offline). With --llm it sends
+every image in a folder (default: invoices/) through Groq in both modes and
+reports the completion tokens and latency the API actually measured.
+
+Usage:
+    python benchmarks/bench_output_format.py [image_dir] [--llm]
+"""
+
+import argparse
+import base64
+import contextlib
+import io
+import json
+import os
+import re
+import sys
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.metrics import percentile  # noqa: E402
+from src.processor import parse_invoice_response  # noqa: E402
+
+# Rough BPE stand-in: words, numbers and punctuation each count as a token
+_TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]")
+
+
+def approx_tokens(text):
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+def synthetic_receipt(item_count):
+    items = [
+        {
+            "name": f"ITEM BELANJA {i:02d}",
+            "quantity": 1 + i % 3,
+            "unit_price": f"{(i % 9 + 1) * 2}.500",
+            "total_price": f"{(i % 9 + 1) * 2 * (1 + i % 3)}.500",
+        }
+        for i in range(item_count)
+    ]
+    return {
+        "shop_name": "Indomaret Point Sudirman",
+        "invoice_date": "2025-01-15",
+        "total_amount": "1.234.500",
+        "transaction_type": "retail",
+        "items": items,
+    }
+
+
+def render(receipt):
+    verbose = json.dumps(receipt, separators=(",", ":"))
+    compact = json.dumps(
+        {
+            "s": receipt["shop_name"],
+            "d": receipt["invoice_date"],
+            "t": receipt["total_amount"],
+            "y": receipt["transaction_type"],
+            "i": [
+                [item["name"], item["quantity"], item["unit_price"], item["total_price"]]
+                for item in receipt["items"]
+            ],
+        },
+        separators=(",", ":"),
+    )
+    return verbose, compact
+
+
+def offline_report():
+    print("Both schemas minified; tokens are approximate (real counts: --llm)")
+    print(f"{'items':>5} {'verbose B':>10} {'compact B':>10} {'saved':>6} "
+          f"{'verbose ~tok':>13} {'compact ~tok':>13} {'saved':>6} {'decode ok':>10}")
+    for item_count in (5, 15, 30, 60):
+        verbose, compact = render(synthetic_receipt(item_count))
+        with contextlib.redirect_stdout(io.StringIO()):
+            same = parse_invoice_response(verbose) == parse_invoice_response(compact, "compact")
+        verbose_tokens, compact_tokens = approx_tokens(verbose), approx_tokens(compact)
+        print(f"{item_count:>5} {len(verbose):>10} {len(compact):>10} "
+              f"{1 - len(compact) / len(verbose):>6.0%} {verbose_tokens:>13} {compact_tokens:>13} "
+              f"{1 - compact_tokens / verbose_tokens:>6.0%} {str(same):>10}")
+
+
+def llm_report(image_dir):
+    from src.image_preprocess import preprocess_image_bytes
+    from src.llm_gateway import chat_completion
+    from src.processor import build_extraction_request, get_ocr_model
+
+    images = sorted(
+        os.path.join(image_dir, name)
+        for name in os.listdir(image_dir)
+        if name.lower().endswith((".jpg", ".jpeg", ".png"))
+    )
+    if not images:
+        print(f"No images found in {image_dir}")
+        return
+
+    results = {"verbose": [], "compact": []}
+    for image_path in images:
+        with open(image_path, "rb") as image_file:
+            image_bytes, mime_type = preprocess_image_bytes(image_file.read())
+        base64_image = base64.b64encode(image_bytes).decode("utf-8")
+
+        for output_format, runs in results.items():
+            started = time.perf_counter()
+            response = chat_completion(
+                **build_extraction_request(base64_image, mime_type, get_ocr_model(), output_format)
+            )
+            elapsed = time.perf_counter() - started
+            with contextlib.redirect_stdout(io.StringIO()):
+                ok = parse_invoice_response(response.choices[0].message.content, output_format) is not None
+            runs.append((elapsed, response.usage.completion_tokens, ok))
+
+    for output_format, runs in results.items():
+        latencies = [elapsed for elapsed, _, _ in runs]
+        tokens = [count for _, count, _ in runs]
+        print(f"{output_format:>8}: completion tokens p50 {percentile(tokens, 50)}, "
+              f"p95 {percentile(tokens, 95)} | latency p50 {percentile(latencies, 50):.2f}s, "
+              f"p95 {percentile(latencies, 95):.2f}s | {sum(ok for _, _, ok in runs)}/{len(runs)} decoded")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark extraction output schemas")
+    parser.add_argument("image_dir", nargs="?", default="invoices")
+    parser.add_argument("--llm", action="store_true", help="Measure real completions through Groq")
+    args = parser.parse_args()
+
+    offline_report()
+    if args.llm:
+        print()
+        llm_report(args.image_dir)
+
+
+if __name__ == "__main__":
+    main()
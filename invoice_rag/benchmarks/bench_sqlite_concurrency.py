@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Benchmark: concurrent SQLite writes and reads, default vs. tuned pragma profiles
+
+Writer threads save invoices the way save_to_database_robust() does (open a
+connection, insert an invoice and its items, commit, close) while reader
+threads run the aggregate query used by the analysis module. Each profile
+runs on a fresh database file seeded with the same invoices:
+
+- default: plain sqlite3 connections (rollback journal, synchronous=FULL)
+- tuned:   connect_sqlite() with the default SQLITE_* profile from db_config
+           (busy timeout and caches, rollback journal)
+- wal:     the tuned profile plus the opt-in SQLITE_JOURNAL_MODE=WAL and
+           SQLITE_SYNCHRONOUS=NORMAL
+
+Reports write/read throughput, write latency percentiles and how many
+operations failed with "database is locked".
+
+Usage:
+    python benchmarks/bench_sqlite_concurrency.py [--writers 8] [--readers 4] [--seconds 5]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src import database  # noqa: E402
+from src.db_config import connect_sqlite  # noqa: E402
+from src.metrics import percentile  # noqa: E402
+from src.processor import _insert_invoice, create_tables  # noqa: E402
+
+INVOICE = {
+    "shop_name": "Indomaret",
+    "invoice_date": "2025-01-15",
+    "total_amount": 59385.0,
+    "transaction_type": "retail",
+    "items": [
+        {"name": "AQUA 600ML", "quantity": 2, "unit_price": 3500.0, "total_price": 7000.0},
+        {"name": "INDOMIE GORENG", "quantity": 5, "unit_price": 3100.0, "total_price": 15500.0},
+        {"name": "TEH PUCUK", "quantity": 1, "unit_price": 3800.0, "total_price": 3800.0},
+    ],
+}
+
+READ_QUERY = """
+    SELECT shop_name, COUNT(*), SUM(total_amount)
+    FROM invoices
+    WHERE invoice_date >= '2025-01-01'
+    GROUP BY shop_name
+"""
+
+
+PROFILES = [
+    ("default", {"SQLITE_PROFILE_ENABLED": "false"}),
+    ("tuned", {"SQLITE_PROFILE_ENABLED": "true"}),
+    ("wal", {"SQLITE_PROFILE_ENABLED": "true", "SQLITE_JOURNAL_MODE": "WAL", "SQLITE_SYNCHRONOUS": "NORMAL"}),
+]
+
+
+def run_profile(name, env, writers, readers, seconds, seed):
+    for env_var in ("SQLITE_PROFILE_ENABLED", "SQLITE_JOURNAL_MODE", "SQLITE_SYNCHRONOUS"):
+        os.environ[env_var] = env.get(env_var, "")
+    db_dir = tempfile.mkdtemp(prefix=f"bench_sqlite_{name}_")
+    db_path = os.path.join(db_dir, "invoices.db")
+
+    # Point the processor at the benchmark database
+    database.get_default_db_path = lambda: db_path
+    create_tables()
+    conn = connect_sqlite(db_path)
+    for _ in range(seed):
+        _insert_invoice(conn.cursor(), INVOICE, "seed.jpg")
+    conn.commit()
+    conn.close()
+
+    stats = {"writes": 0, "reads": 0, "locked": 0, "write_latencies": []}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def count(key, latency=None):
+        with lock:
+            stats[key] += 1
+            if latency is not None:
+                stats["write_latencies"].append(latency)
+
+    def writer():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                conn = connect_sqlite(db_path)
+                try:
+                    _insert_invoice(conn.cursor(), INVOICE, "bench.jpg")
+                    conn.commit()
+                finally:
+                    conn.close()
+                count("writes", time.perf_counter() - started)
+            except sqlite3.OperationalError:
+                count("locked")
+
+    def reader():
+        while time.perf_counter() < deadline:
+            try:
+                conn = connect_sqlite(db_path)
+                try:
+                    conn.execute(READ_QUERY).fetchall()
+                finally:
+                    conn.close()
+                count("reads")
+            except sqlite3.OperationalError:
+                count("locked")
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies = stats["write_latencies"]
+    return {
+        "profile": name,
+        "writes_per_s": stats["writes"] / seconds,
+        "reads_per_s": stats["reads"] / seconds,
+        "write_p50_ms": percentile(latencies, 50) * 1000,
+        "write_p95_ms": percentile(latencies, 95) * 1000,
+        "locked": stats["locked"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent SQLite writes and reads")
+    parser.add_argument("--writers", type=int, default=8, help="Writer threads (default: 8)")
+    parser.add_argument("--readers", type=int, default=4, help="Reader threads (default: 4)")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration per profile (default: 5)")
+    parser.add_argument("--seed", type=int, default=5000, help="Invoices inserted before timing (default: 5000)")
+    args = parser.parse_args()
+
+    print(f"{args.writers} writers, {args.readers} readers, {args.seconds:.0f}s per profile\n")
+    print(f"{'profile':<8} {'writes/s':>9} {'reads/s':>9} {'write p50':>10} {'p95':>9} {'locked':>7}")
+    for name, env in PROFILES:
+        result = run_profile(name, env, args.writers, args.readers, args.seconds, args.seed)
+        print(
+            f"{result['profile']:<8} {result['writes_per_s']:>9.0f} {result['reads_per_s']:>9.0f} "
+            f"{result['write_p50_ms']:>8.1f}ms {result['write_p95_ms']:>7.1f}ms {result['locked']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark: extraction prompt and model variants on a labeled receipt corpus
+
+Runs each labeled image (see src/prompt_eval.py for the labels.json layout)
+through every prompt variant x model and prints prompt/completion tokens,
+latency percentiles and total/date/item-count accuracy per combination.
+
+Completions come from an OpenAI-compatible endpoint (--base-url), optionally
+recorded to a JSON-lines store (--record), or are replayed from such a store
+(--replay) so the comparison can be repeated offline at no cost.
+
+Usage:
+    python benchmarks/eval_prompts.py corpus/ --base-url http://localhost:8000/v1 \\
+        --models meta-llama/llama-4-scout-17b-16e-instruct --record runs.jsonl
+    python benchmarks/eval_prompts.py corpus/ --replay runs.jsonl \\
+        --variants verbose,compact,short --prompt short=prompts/short.txt
+"""
+
+import argparse
+import json
+import os
+import sys
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.processor import get_ocr_model  # noqa: E402
+from src.prompt_eval import (  # noqa: E402
+    format_report,
+    get_prompt_variants,
+    load_corpus,
+    load_recordings,
+    openai_backend,
+    record_backend,
+    replay_backend,
+    run_eval,
+    summarize,
+)
+
+
+def parse_prompt_files(values, output_format):
+    prompt_files = {}
+    for value in values:
+        name, _, path = value.partition("=")
+        if not path:
+            raise SystemExit(f"Expected NAME=PATH, got {value!r}")
+        prompt_files[name] = (path, output_format)
+    return prompt_files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate extraction prompts and models")
+    parser.add_argument("corpus_dir", help="Folder with receipt images and labels.json")
+    parser.add_argument("--variants", default="verbose,compact",
+                        help="Comma-separated prompt variants (default: verbose,compact)")
+    parser.add_argument("--models", default=get_ocr_model(), help="Comma-separated model names")
+    parser.add_argument("--prompt", action="append", default=[], metavar="NAME=PATH",
+                        help="Extra prompt variant answering in the verbose schema")
+    parser.add_argument("--compact-prompt", action="append", default=[], metavar="NAME=PATH",
+                        help="Extra prompt variant answering in the compact schema")
+    parser.add_argument("--base-url", help="OpenAI-compatible API base URL")
+    parser.add_argument("--api-key-env", default="GROQ_API_KEY",
+                        help="Environment variable holding the API key (default: GROQ_API_KEY)")
+    parser.add_argument("--record", help="Append live responses to this JSON-lines store")
+    parser.add_argument("--replay", help="Answer from this JSON-lines store instead of an API")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args()
+
+    if bool(args.base_url) == bool(args.replay):
+        raise SystemExit("Give exactly one of --base-url or --replay")
+
+    prompt_files = parse_prompt_files(args.prompt, "verbose")
+    prompt_files.update(parse_prompt_files(args.compact_prompt, "compact"))
+    all_variants = get_prompt_variants(prompt_files)
+    names = args.variants.split(",") + [name for name in prompt_files if name not in args.variants.split(",")]
+    unknown = [name for name in names if name not in all_variants]
+    if unknown:
+        raise SystemExit(f"Unknown prompt variants: {', '.join(unknown)}")
+    variants = {name: all_variants[name] for name in names}
+    models = args.models.split(",")
+
+    if args.replay:
+        complete = replay_backend(load_recordings(args.replay))
+    else:
+        complete = openai_backend(args.base_url, os.environ.get(args.api_key_env))
+        if args.record:
+            complete = record_backend(complete, args.record)
+
+    corpus = load_corpus(args.corpus_dir)
+    print(f"{len(corpus)} labeled receipts x {len(variants)} prompts x {len(models)} models\n")
+    summary = summarize(run_eval(corpus, variants, models, complete))
+    print(json.dumps(summary, indent=2) if args.json else format_report(summary))
+
+
+if __name__ == "__main__":
+    main()
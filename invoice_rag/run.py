@@ -9,16 +9,17 @@ import subprocess
 
 def main():
     """Main runner function."""
-    processor_path = os.path.join(os.path.dirname(__file__), 'src', 'processor.py')
+    cli_path = os.path.join(os.path.dirname(__file__), 'src', 'cli.py')
     
-    if not os.path.exists(processor_path):
-        print(f"Error: processor.py not found at {processor_path}")
+    if not os.path.exists(cli_path):
+        print(f"Error: cli.py not found at {cli_path}")
         print("Make sure you're running this from the invoice_rag directory")
         sys.exit(1)
     
-    # Run the processor as a subprocess
+    # Run the CLI as a module so its package imports resolve,
+    # passing through options such as --bulk/--workers/--max-inflight
     try:
-        result = subprocess.run([sys.executable, processor_path], 
+        result = subprocess.run([sys.executable, '-m', 'src.cli', *sys.argv[1:]], 
                               cwd=os.path.dirname(__file__),
                               check=True)
         sys.exit(result.returncode)
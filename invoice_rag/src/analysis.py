@@ -1,7 +1,10 @@
 import sqlite3
+from contextlib import closing
 import os
 from datetime import datetime, timedelta
 
+from src.dates import parse_date
+
 # Database path - same as used in other modules
 def get_db_path():
     """Get the database path"""
@@ -9,13 +12,13 @@ def get_db_path():
     return os.path.join(current_dir, 'database', 'invoices.db')
 
 def get_db_connection():
-    """Get database connection - supports both SQLite and Supabase"""
+    """Borrow a pooled database connection (context manager) - supports both SQLite and Supabase"""
     try:
-        from src.db_config import get_raw_connection
-        return get_raw_connection()
+        from src.db_config import raw_connection
+        return raw_connection()
     except ImportError:
         # Fallback to SQLite
-        return sqlite3.connect(get_db_path())
+        return closing(sqlite3.connect(get_db_path()))
 
 def get_placeholder():
     """Get SQL parameter placeholder for current database"""
@@ -27,8 +30,7 @@ def get_placeholder():
 
 def analyze_invoices(weeks_back: int | None = None):
     """Analyze invoices and return summary statistics for a given period."""
-    conn = get_db_connection()
-    try:
+    with get_db_connection() as conn:
         cursor = conn.cursor()
 
         params = []
@@ -95,37 +97,14 @@ def analyze_invoices(weeks_back: int | None = None):
             'average_amount': average_amount or 0.0,
             'top_vendors': top_vendors
         }
-    
-    finally:
-        conn.close()
 
 def parse_invoice_date(date_str):
     """Parse various date formats from Indonesian invoices."""
-    if not date_str:
-        return None
-    
-    # Common date formats
-    formats = [
-        "%d/%m/%Y",
-        "%d-%m-%Y", 
-        "%d.%m.%Y",
-        "%Y-%m-%d",
-        "%d/%m/%y",
-        "%d-%m-%y"
-    ]
-    
-    for fmt in formats:
-        try:
-            return datetime.strptime(date_str, fmt)
-        except ValueError:
-            continue
-    
-    return None
+    return parse_date(date_str)
 
 def get_weekly_data(weeks_back=4):
     """Get invoice data for the last N weeks."""
-    conn = get_db_connection()
-    try:
+    with get_db_connection() as conn:
         cursor = conn.cursor()
         placeholder = get_placeholder()
         
@@ -153,9 +132,6 @@ def get_weekly_data(weeks_back=4):
             })
         
         return weekly_invoices
-    
-    finally:
-        conn.close()
 
 def calculate_daily_totals(weeks_back=4):
     """Calculate daily spending totals."""
@@ -475,8 +451,7 @@ def analyze_item_spending(weeks_back=4):
         }
     
     # Get items for all invoices in the period
-    conn = get_db_connection()
-    try:
+    with get_db_connection() as conn:
         cursor = conn.cursor()
         
         # Get all items for invoices in the time period
@@ -534,9 +509,6 @@ def analyze_item_spending(weeks_back=4):
             'top_items': top_items[:20],  # Top 20 items
             'total_unique_items': len(item_totals)
         }
-    
-    finally:
-        conn.close()
 
 def analyze_transaction_types(weeks_back=4):
     """Analyze spending by transaction type (bank, retail, e-commerce)."""
@@ -1,6 +1,5 @@
 import os
 import json
-from groq import Groq
 from dotenv import load_dotenv
 from typing import List, Dict, Any, cast, Iterable
 from groq.types.chat.chat_completion_message_param import ChatCompletionMessageParam
@@ -11,19 +10,18 @@ from src.analysis import (
     find_biggest_spending_categories,
     generate_comprehensive_analysis,
 )
-from src.database import get_db_session, Invoice
+from src.database import session_scope, Invoice
+from src.llm_gateway import chat_completion
 from telegram_bot.spending_limits import get_monthly_limit
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Groq client
+# The Groq client itself lives in src.llm_gateway (shared with the processor)
 groq_api_key = os.environ.get("GROQ_API_KEY")
 if not groq_api_key:
     raise ValueError("GROQ_API_KEY not found in environment variables")
 
-client = Groq(api_key=groq_api_key)
-
 # Model configuration
 CHAT_MODEL = os.environ.get("CHAT_MODEL", "meta-llama/llama-4-scout-17b-16e-instruct")
 
@@ -173,19 +171,19 @@ tools: List[Dict[str, Any]] = [
 def get_recent_invoices_list(limit: int = 5) -> Dict[str, Any]:
     """Get a list of recent invoices."""
     try:
-        session = get_db_session()
-        invoices = session.query(Invoice).order_by(Invoice.processed_at.desc()).limit(limit).all()
-        
-        if not invoices:
-            return {"success": False, "message": "No invoices found in the database."}
-        
-        invoice_list = []
-        for inv in invoices:
-            invoice_list.append({
-                "date": inv.invoice_date or "Unknown date",
-                "shop": inv.shop_name,
-                "amount": f"Rp {inv.total_amount:,.2f}"
-            })
+        with session_scope() as session:
+            invoices = session.query(Invoice).order_by(Invoice.processed_at.desc()).limit(limit).all()
+
+            if not invoices:
+                return {"success": False, "message": "No invoices found in the database."}
+
+            invoice_list = []
+            for inv in invoices:
+                invoice_list.append({
+                    "date": inv.invoice_date or "Unknown date",
+                    "shop": inv.shop_name,
+                    "amount": f"Rp {inv.total_amount:,.2f}"
+                })
         
         return {"success": True, "invoices": invoice_list, "count": len(invoice_list)}
     except Exception as e:
@@ -270,7 +268,7 @@ def run_conversation(user_message: str, chat_history: List[Dict[str, Any]] | Non
     try:
         for iteration in range(MAX_ITERATIONS):
             # API call to get response (may include tool calls)
-            response = client.chat.completions.create(
+            response = chat_completion(
                 model=CHAT_MODEL,
                 messages=cast(Iterable[ChatCompletionMessageParam], messages),
                 tools=cast(Iterable[ChatCompletionToolParam], tools),
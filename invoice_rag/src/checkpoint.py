@@ -0,0 +1,138 @@
+"""
+Ingestion Checkpoint Manifest - makes folder processing resumable
+
+Every image handed to the processor is recorded in the ingest_manifest table
+(in the invoices database) keyed by its absolute path and SHA-256 content
+hash, with a status, attempt count and the resulting invoice_id. Successful
+files are marked done inside the same transaction that inserts the invoice,
+so a crash can never leave a saved invoice that a rerun would insert again.
+
+Statuses:
+    pending  seen but not finished (new, or interrupted by a crash)
+    done     saved; skipped on every later run
+    failed   extraction or save failed; only retried with --retry-failed
+"""
+
+import os
+
+from src.db_config import connect_sqlite
+from src.ocr_cache import hash_image_bytes
+
+MANIFEST_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS ingest_manifest (
+        path TEXT NOT NULL,
+        content_hash TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        invoice_id INTEGER,
+        last_error TEXT,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (path, content_hash)
+    )
+"""
+
+
+def _connect(db_path=None):
+    if db_path is None:
+        from src.database import get_default_db_path
+
+        db_path = get_default_db_path()
+
+    conn = connect_sqlite(db_path, timeout=10)
+    conn.execute(MANIFEST_TABLE_SQL)
+    return conn
+
+
+def manifest_key(image_path):
+    """Normalize a path so reruns from another working directory match."""
+    return os.path.abspath(image_path)
+
+
+def plan_pending(image_paths, retry_failed=False, db_path=None):
+    """
+    Register images in the manifest and pick the ones that still need work.
+
+    Args:
+        image_paths: Candidate image files
+        retry_failed: Also return files whose previous attempts failed
+        db_path: Manifest database (defaults to the invoices database)
+
+    Returns:
+        Tuple of (dict of image_path -> content_hash to process, in input
+        order, and dict of status counts over all candidates)
+    """
+    hashes = {}
+    for image_path in image_paths:
+        try:
+            with open(image_path, "rb") as image_file:
+                hashes[image_path] = hash_image_bytes(image_file.read())
+        except OSError as e:
+            print(f"[WARNING] Could not read {image_path}: {e}")
+
+    conn = _connect(db_path)
+    try:
+        conn.executemany(
+            "INSERT OR IGNORE INTO ingest_manifest (path, content_hash) VALUES (?, ?)",
+            [(manifest_key(path), content_hash) for path, content_hash in hashes.items()],
+        )
+        conn.commit()
+
+        statuses = {}
+        for path, content_hash in hashes.items():
+            row = conn.execute(
+                "SELECT status FROM ingest_manifest WHERE path = ? AND content_hash = ?",
+                (manifest_key(path), content_hash),
+            ).fetchone()
+            statuses[path] = row[0]
+    finally:
+        conn.close()
+
+    wanted = {"pending", "failed"} if retry_failed else {"pending"}
+    pending = {path: hashes[path] for path in hashes if statuses[path] in wanted}
+
+    counts = {"pending": 0, "done": 0, "failed": 0}
+    for status in statuses.values():
+        counts[status] = counts.get(status, 0) + 1
+    return pending, counts
+
+
+def mark_done(cursor, image_path, content_hash, invoice_id):
+    """Mark an image as saved, using the cursor of the invoice insert transaction."""
+    cursor.execute(MANIFEST_TABLE_SQL)
+    cursor.execute(
+        """
+        INSERT INTO ingest_manifest (path, content_hash, status, attempts, invoice_id)
+        VALUES (?, ?, 'done', 1, ?)
+        ON CONFLICT (path, content_hash) DO UPDATE SET
+            status = 'done',
+            attempts = attempts + 1,
+            invoice_id = excluded.invoice_id,
+            last_error = NULL,
+            updated_at = CURRENT_TIMESTAMP
+    """,
+        (manifest_key(image_path), content_hash, invoice_id),
+    )
+
+
+def mark_failed(image_path, content_hash, error=None, db_path=None):
+    """Record a failed attempt for an image."""
+    try:
+        conn = _connect(db_path)
+        try:
+            conn.execute(
+                """
+                INSERT INTO ingest_manifest (path, content_hash, status, attempts, last_error)
+                VALUES (?, ?, 'failed', 1, ?)
+                ON CONFLICT (path, content_hash) DO UPDATE SET
+                    status = 'failed',
+                    attempts = attempts + 1,
+                    last_error = excluded.last_error,
+                    updated_at = CURRENT_TIMESTAMP
+            """,
+                (manifest_key(image_path), content_hash, error),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"[WARNING] Could not update checkpoint for {image_path}: {e}")
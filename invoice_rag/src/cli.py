@@ -0,0 +1,253 @@
+"""
+Invoice Processor CLI - process invoice images from the command line
+
+Usage:
+    python -m src.cli [--bulk] [--workers N] [--max-inflight N]
+    python -m src.cli --watch [--watch-dir invoices]
+    python -m src.cli --reparse [--dry-run]
+    python -m src.cli --build-profiles
+
+Kept apart from src.processor so the processing module is only loaded once
+(running a module with -m loads it as __main__, and the pipeline and watcher
+import src.processor again).
+"""
+
+import os
+import time
+
+from src.processor import process_invoice, save_to_database_robust
+
+
+def find_image_paths():
+    """Find invoice images in invoices/, the current directory or its parent."""
+    # Get image paths - check multiple locations
+    print(f"Current working directory: {os.getcwd()}")
+
+    # Try invoices subdirectory first
+    image_paths = []
+    image_dir = "invoices"
+    print(f"Looking for images in: {image_dir}")
+
+    if os.path.exists(image_dir):
+        image_paths = [
+            os.path.join(image_dir, f)
+            for f in os.listdir(image_dir)
+            if f.lower().endswith((".jpg", ".jpeg", ".png"))
+        ]
+        print(f"Found in invoices/: {image_paths}")
+
+    # If no images in invoices/, check root directory
+    if not image_paths:
+        root_images = [
+            f for f in os.listdir(".") if f.lower().endswith((".jpg", ".jpeg", ".png"))
+        ]
+        if root_images:
+            image_paths = root_images
+            print(f"Found in root: {image_paths}")
+
+    # If still no images, check parent directory
+    if not image_paths:
+        try:
+            parent_images = [
+                f
+                for f in os.listdir("..")
+                if f.lower().endswith((".jpg", ".jpeg", ".png"))
+            ]
+            if parent_images:
+                image_paths = [os.path.join("..", f) for f in parent_images]
+                print(f"Found in parent: {image_paths}")
+        except Exception:
+            pass
+
+    return image_paths
+
+
+def parse_args(argv=None):
+    """Parse command line options for the processor."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Process invoice images")
+    parser.add_argument(
+        "--bulk",
+        action="store_true",
+        help="Use the concurrent staged pipeline (for large backfills)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Number of concurrent LLM requests in bulk mode (default: 4)",
+    )
+    parser.add_argument(
+        "--max-inflight",
+        type=int,
+        default=16,
+        help="Maximum images held between pipeline stages in bulk mode (default: 16)",
+    )
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="Also reprocess images whose earlier attempts failed",
+    )
+    parser.add_argument(
+        "--no-checkpoint",
+        action="store_true",
+        help="Ignore the checkpoint manifest and process every image",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and process new or changed images as they arrive",
+    )
+    parser.add_argument(
+        "--watch-dir",
+        default="invoices",
+        help="Folder to watch in --watch mode (default: invoices)",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=2.0,
+        help="Seconds between folder scans in --watch mode (default: 2)",
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=3.0,
+        help="Seconds a file must stay unchanged before it is processed (default: 3)",
+    )
+    parser.add_argument(
+        "--reparse",
+        action="store_true",
+        help="Re-run parsing/validation over archived LLM responses and update changed invoices",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="With --reparse, only report what would change",
+    )
+    parser.add_argument(
+        "--build-profiles",
+        action="store_true",
+        help="Rebuild the per-vendor prompt profiles from the invoices already saved",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Main function to process invoices."""
+    args = parse_args(argv)
+
+    print("INVOICE PROCESSOR")
+    print("=" * 50)
+    print("Processing invoice images with robust date/time formatting...")
+
+    if args.reparse:
+        from .response_archive import reparse_archive
+
+        reparse_archive(workers=args.workers, dry_run=args.dry_run)
+        return
+
+    if args.build_profiles:
+        from .vendor_profiles import rebuild_vendor_profiles
+
+        rebuild_vendor_profiles()
+        return
+
+    # Check for API key
+    if not os.environ.get("GROQ_API_KEY"):
+        print("[ERROR] GROQ_API_KEY not found in environment variables")
+        print("Please set up your .env file with GROQ_API_KEY=your_key_here")
+        return
+
+    if args.watch:
+        from .watcher import run_watch
+
+        run_watch(
+            args.watch_dir,
+            workers=args.workers,
+            poll_interval=args.poll_interval,
+            debounce=args.debounce,
+            retry_failed=args.retry_failed,
+        )
+        return
+
+    image_paths = find_image_paths()
+
+    if not image_paths:
+        print("[ERROR] No image files found!")
+        print("Checked: invoices/, current directory, and parent directory")
+        return
+
+    print(f"Found {len(image_paths)} images to process")
+
+    # Resume from the checkpoint manifest: skip images already saved
+    content_hashes = {}
+    if not args.no_checkpoint:
+        from .checkpoint import plan_pending
+
+        content_hashes, counts = plan_pending(image_paths, retry_failed=args.retry_failed)
+        print(
+            f"Checkpoint: {counts['done']} done, {counts['failed']} failed, "
+            f"{counts['pending']} pending"
+        )
+        image_paths = list(content_hashes)
+        if not image_paths:
+            print("Nothing to do - all images already processed")
+            if counts["failed"] and not args.retry_failed:
+                print("Use --retry-failed to reprocess failed images")
+            return
+
+    if args.bulk:
+        from .pipeline import run_bulk
+
+        run_bulk(
+            image_paths,
+            workers=args.workers,
+            max_inflight=args.max_inflight,
+            checkpoint=not args.no_checkpoint,
+        )
+        return
+
+    from .checkpoint import mark_failed
+    from .metrics import format_progress
+
+    # Process each image
+    successful_count = 0
+    total_amount = 0
+    started = time.perf_counter()
+
+    for index, image_path in enumerate(image_paths, 1):
+        content_hash = content_hashes.get(image_path)
+        invoice_data = process_invoice(image_path)
+        if invoice_data:
+            invoice_id = save_to_database_robust(invoice_data, image_path, content_hash)
+            if invoice_id:
+                print(f"   [SUCCESS] Saved to database with ID: {invoice_id}")
+                total_amount += invoice_data.get("total_amount", 0)
+                successful_count += 1
+            else:
+                print("   [ERROR] Failed to save to database")
+                if content_hash:
+                    mark_failed(image_path, content_hash, "database error")
+        else:
+            print(f"[ERROR] Failed to extract data from {os.path.basename(image_path)}")
+            if content_hash:
+                mark_failed(image_path, content_hash, "extraction failed")
+
+        print(format_progress(index, len(image_paths), time.perf_counter() - started))
+
+    print("\nPROCESSING COMPLETE!")
+    print(f"Processed {successful_count}/{len(image_paths)} invoices successfully")
+    print(f"Total amount: Rp {total_amount:,.2f}")
+    print("All dates standardized to YYYY-MM-DD format")
+    print("All times standardized to HH:MM format")
+
+    if successful_count > 0:
+        print("\nView results: python view_database.py")
+
+
+if __name__ == "__main__":
+    print("Starting invoice processor...")
+    main()
+    print("Processor finished.")
@@ -1,12 +1,18 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, BigInteger, Numeric, Boolean
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, BigInteger, Numeric, Boolean
+from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from enum import Enum
 import os
+import threading
 
 Base = declarative_base()
 
+# Database URLs whose tables have been created in this process
+_schema_lock = threading.Lock()
+_schema_ready = set()
+
 class TransactionType(str, Enum):
     """Transaction type enum for validation."""
     BANK = "bank"
@@ -110,33 +116,71 @@ class Token(Base):
     def __repr__(self):
         return f"<Token(used={self.is_used})>"
 
+def _database_url(db_path=None):
+    """URL of the given SQLite file, or of the configured database."""
+    from src.db_config import get_database_url, USE_SUPABASE
+
+    if db_path is not None and not USE_SUPABASE:
+        # Legacy mode: specific SQLite database
+        return f'sqlite:///{db_path}'
+    # Use unified config (supports both SQLite and Supabase)
+    return get_database_url()
+
+def init_db(db_path=None):
+    """
+    Create the ORM tables once per database in this process.
+
+    Later calls are no-ops. Supabase tables are created via schema files.
+
+    Args:
+        db_path: Optional SQLite file (defaults to the configured database)
+    """
+    from src.db_config import get_engine, USE_SUPABASE
+
+    if USE_SUPABASE:
+        return
+    db_url = _database_url(db_path)
+    with _schema_lock:
+        if db_url not in _schema_ready:
+            Base.metadata.create_all(get_engine(db_url))
+            _schema_ready.add(db_url)
+
 def get_db_session(db_path=None):
-    """Creates a database session with the specified database."""
+    """
+    Creates a database session with the specified database.
+
+    The engine and sessionmaker are shared process-wide (see db_config), so
+    this is cheap; close the session when done, or use session_scope().
+    """
+    from src.db_config import get_session_factory
+
+    init_db(db_path)
+    return get_session_factory(_database_url(db_path))()
+
+def get_scoped_db_session(db_path=None):
+    """Thread-local session registry for the database (see db_config.get_scoped_session)."""
+    from src.db_config import get_scoped_session
+
+    init_db(db_path)
+    return get_scoped_session(_database_url(db_path))
+
+@contextmanager
+def session_scope(db_path=None):
+    """
+    Provide a session for one unit of work.
+
+    Commits when the block succeeds, rolls back if it raises, and always
+    closes the session.
+    """
+    session = get_db_session(db_path)
     try:
-        from src.db_config import get_engine, USE_SUPABASE
-        
-        if db_path is not None and not USE_SUPABASE:
-            # Legacy mode: specific SQLite database
-            engine = create_engine(f'sqlite:///{db_path}')
-        else:
-            # Use unified config (supports both SQLite and Supabase)
-            engine = get_engine()
-        
-        # Only create tables for SQLite (Supabase tables created via schema files)
-        from src.db_config import USE_SUPABASE
-        if not USE_SUPABASE:
-            Base.metadata.create_all(engine)
-        
-        Session = sessionmaker(bind=engine)
-        return Session()
-    except ImportError:
-        # Fallback to original SQLite-only behavior
-        if db_path is None:
-            db_path = get_default_db_path()
-        engine = create_engine(f'sqlite:///{db_path}')
-        Base.metadata.create_all(engine)
-        Session = sessionmaker(bind=engine)
-        return Session()
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
 
 def insert_invoice_data(session, invoice_data, image_path):
     """Inserts extracted invoice data (Pydantic model) into the database."""
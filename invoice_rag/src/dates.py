@@ -0,0 +1,123 @@
+"""
+Date Normalization - shared, memoized date parsing for invoices
+
+Used by RobustInvoice.validate_date_format (normalize_date_string) and by the
+analysis/visualization code (parse_date). The canonical YYYY-MM-DD form takes
+a date.fromisoformat fast path; other layouts are matched with precompiled
+regexes instead of trying strptime formats one exception at a time. Results
+are kept in bounded LRU caches because the same dates repeat across rows.
+"""
+
+import re
+from datetime import date, datetime
+from functools import lru_cache
+
+DATE_CACHE_SIZE = 4096
+
+# Date patterns found in LLM output, searched anywhere in the value
+_INVOICE_DATE_PATTERNS = [
+    (re.compile(r"(\d{4})-(\d{2})-(\d{2})"), "ymd"),  # YYYY-MM-DD
+    (re.compile(r"(\d{2})-(\d{2})-(\d{4})"), "dmy"),  # DD-MM-YYYY
+    (re.compile(r"(\d{2})/(\d{2})/(\d{4})"), "dmy"),  # DD/MM/YYYY
+    (re.compile(r"(\d{4})/(\d{2})/(\d{2})"), "ymd"),  # YYYY/MM/DD
+    (re.compile(r"(\d{2})\.(\d{2})\.(\d{4})"), "dmy"),  # DD.MM.YYYY
+]
+
+# Same field rules as strptime's %d, %m, %Y and %y directives
+_DAY = r"(3[0-1]|[1-2]\d|0[1-9]|[1-9]| [1-9])"
+_MONTH = r"(1[0-2]|0[1-9]|[1-9])"
+_YEAR = r"(\d\d\d\d)"
+_SHORT_YEAR = r"(\d\d)"
+
+# Stored date layouts, in the order they are tried
+_STORED_DATE_FORMATS = [
+    (re.compile(_DAY + "/" + _MONTH + "/" + _YEAR), "dmY"),  # %d/%m/%Y
+    (re.compile(_DAY + "-" + _MONTH + "-" + _YEAR), "dmY"),  # %d-%m-%Y
+    (re.compile(_DAY + r"\." + _MONTH + r"\." + _YEAR), "dmY"),  # %d.%m.%Y
+    (re.compile(_YEAR + "-" + _MONTH + "-" + _DAY), "Ymd"),  # %Y-%m-%d
+    (re.compile(_DAY + "/" + _MONTH + "/" + _SHORT_YEAR), "dmy"),  # %d/%m/%y
+    (re.compile(_DAY + "-" + _MONTH + "-" + _SHORT_YEAR), "dmy"),  # %d-%m-%y
+]
+
+
+def _is_iso_shape(value):
+    return len(value) == 10 and value[4] == "-" and value[7] == "-"
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def normalize_date_string(value):
+    """
+    Standardize a date string to YYYY-MM-DD.
+
+    The first recognised date anywhere in the value is used; month and day
+    are range-checked only (1-12, 1-31).
+
+    Returns:
+        The normalized date, or the original value if no pattern matches
+    """
+    if _is_iso_shape(value) and value.isascii() and (value[:4] + value[5:7] + value[8:]).isdigit():
+        if 1 <= int(value[5:7]) <= 12 and 1 <= int(value[8:10]) <= 31:
+            return value
+
+    for pattern, order in _INVOICE_DATE_PATTERNS:
+        match = pattern.search(value)
+        if match:
+            if order == "ymd":
+                year, month, day = match.groups()
+            else:
+                day, month, year = match.groups()
+
+            year, month, day = int(year), int(month), int(day)
+            if 1 <= month <= 12 and 1 <= day <= 31:
+                return f"{year:04d}-{month:02d}-{day:02d}"
+
+    return value
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _parse_date_string(value):
+    if _is_iso_shape(value):
+        try:
+            parsed = date.fromisoformat(value)
+            return datetime(parsed.year, parsed.month, parsed.day)
+        except ValueError:
+            pass
+
+    for pattern, order in _STORED_DATE_FORMATS:
+        match = pattern.match(value)
+        if not match or match.end() != len(value):
+            continue
+
+        if order == "Ymd":
+            year, month, day = match.groups()
+        else:
+            day, month, year = match.groups()
+        year = int(year)
+        if order == "dmy":
+            year += 2000 if year <= 68 else 1900
+
+        try:
+            return datetime(year, int(month), int(day))
+        except ValueError:
+            continue  # e.g. 31/02/2024
+
+    return None
+
+
+def parse_date(value):
+    """
+    Parse a stored invoice date (DD/MM/YYYY, DD-MM-YYYY, DD.MM.YYYY,
+    YYYY-MM-DD, DD/MM/YY or DD-MM-YY) into a datetime.
+
+    Returns:
+        datetime, or None if the value is empty or not a recognised date
+    """
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if not isinstance(value, str):
+        return None
+    return _parse_date_string(value)
@@ -2,10 +2,30 @@
 Unified Database Configuration Module
 Supports both SQLite (local) and PostgreSQL/Supabase (cloud)
 Switch between databases using USE_SUPABASE environment variable
+
+Engines, session factories and scoped sessions are created lazily, once per
+database URL, and shared by the whole process.
+
+Every SQLite connection (SQLAlchemy engines and the raw sqlite3 paths via
+connect_sqlite()) gets the pragma profile from get_sqlite_pragmas(): a busy
+timeout instead of immediate "database is locked" errors, and larger
+page/mmap caches. These settings only last for the connection. WAL
+journaling (SQLITE_JOURNAL_MODE=WAL, usually with SQLITE_SYNCHRONOUS=NORMAL)
+is opt-in: it is stored in the database file itself, and it trades a higher
+write tail latency for readers that are not blocked by the writer.
+
+Raw (non-ORM) queries borrow connections through raw_connection(): a
+psycopg2 ThreadedConnectionPool for Postgres, and one reusable sqlite3
+connection per thread for SQLite. Usage counters: get_raw_pool_stats().
 """
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import scoped_session, sessionmaker
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -13,6 +33,38 @@ load_dotenv()
 # Database selection flag
 USE_SUPABASE = os.getenv("USE_SUPABASE", "false").lower() == "true"
 
+# SQLite pragma profile (environment variable, default); "" keeps SQLite's own
+# default. journal_mode and synchronous are left alone unless configured:
+# journal_mode=WAL persists in the database file.
+SQLITE_PRAGMA_DEFAULTS = {
+    "journal_mode": ("SQLITE_JOURNAL_MODE", ""),
+    "synchronous": ("SQLITE_SYNCHRONOUS", ""),
+    "busy_timeout": ("SQLITE_BUSY_TIMEOUT_MS", "5000"),
+    "cache_size": ("SQLITE_CACHE_SIZE", "-20000"),  # negative = KiB, i.e. 20 MB
+    "mmap_size": ("SQLITE_MMAP_SIZE", "134217728"),  # 128 MB
+    "temp_store": ("SQLITE_TEMP_STORE", "MEMORY"),
+}
+
+# Raw connection pool (Postgres) and per-thread SQLite connections
+_raw_pool_lock = threading.RLock()
+_pg_pool = None
+_pg_slots = None
+_sqlite_local = threading.local()
+_raw_stats = {
+    "acquired": 0,
+    "opened": 0,
+    "discarded": 0,
+    "in_use": 0,
+    "peak_in_use": 0,
+    "wait_seconds": 0.0,
+}
+
+# Process-wide registry, keyed by database URL
+_registry_lock = threading.RLock()
+_engines = {}
+_session_factories = {}
+_scoped_sessions = {}
+
 def get_database_url():
     """
     Get appropriate database URL based on configuration.
@@ -40,14 +92,65 @@ def get_database_url():
         db_path = get_default_db_path()
         return f"sqlite:///{db_path}"
 
-def get_engine():
+def sqlite_profile_enabled():
+    """Whether SQLite connections get the pragma profile."""
+    return os.getenv("SQLITE_PROFILE_ENABLED", "true").lower() == "true"
+
+def get_sqlite_pragmas():
+    """
+    Get the SQLite pragma profile from the environment.
+
+    Returns:
+        Dict of pragma name -> value for the configured pragmas (empty when
+        SQLITE_PROFILE_ENABLED=false)
+
+    Raises:
+        ValueError: If a configured value is not a plain word or integer
+    """
+    if not sqlite_profile_enabled():
+        return {}
+    pragmas = {}
+    for name, (env_var, default) in SQLITE_PRAGMA_DEFAULTS.items():
+        value = os.getenv(env_var, default).strip()
+        if not value:
+            continue
+        if not re.fullmatch(r"-?\d+|[A-Za-z]+", value):
+            raise ValueError(f"Invalid {env_var}: {value!r}")
+        pragmas[name] = value
+    return pragmas
+
+def apply_sqlite_pragmas(conn, pragmas=None):
+    """Apply the pragma profile to an open sqlite3 connection."""
+    pragmas = get_sqlite_pragmas() if pragmas is None else pragmas
+    cursor = conn.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+    finally:
+        cursor.close()
+    return conn
+
+def connect_sqlite(db_path, **kwargs):
+    """
+    sqlite3.connect() with the pragma profile applied.
+
+    An explicit ``timeout`` (seconds) takes precedence over the profile's
+    busy_timeout.
+    """
+    pragmas = get_sqlite_pragmas()
+    if pragmas and "timeout" in kwargs:
+        pragmas["busy_timeout"] = str(int(kwargs["timeout"] * 1000))
+    return apply_sqlite_pragmas(sqlite3.connect(db_path, **kwargs), pragmas)
+
+def _on_sqlite_connect(dbapi_connection, connection_record):
+    apply_sqlite_pragmas(dbapi_connection)
+
+def _create_engine(db_url):
     """
     Create SQLAlchemy engine based on database type.
     Includes connection pooling for PostgreSQL.
     """
-    db_url = get_database_url()
-    
-    if USE_SUPABASE:
+    if db_url.startswith("postgresql"):
         # PostgreSQL-specific settings
         return create_engine(
             db_url,
@@ -58,45 +161,244 @@ def get_engine():
         )
     else:
         # SQLite-specific settings
-        return create_engine(
+        engine = create_engine(
             db_url,
             connect_args={'check_same_thread': False},  # SQLite threading
             echo=False
         )
+        event.listen(engine, "connect", _on_sqlite_connect)
+        return engine
+
+def _registered(registry, db_url, create):
+    """Return registry[db_url], creating it under the lock on first use."""
+    value = registry.get(db_url)
+    if value is None:
+        with _registry_lock:
+            value = registry.get(db_url)
+            if value is None:
+                value = registry[db_url] = create()
+    return value
+
+def get_engine(db_url=None):
+    """
+    Get the process-wide engine for a database URL.
+
+    Args:
+        db_url: Database URL (defaults to get_database_url())
+
+    Returns:
+        Engine created on first use and shared afterwards, so its
+        connection pool is reused across requests
+    """
+    db_url = db_url or get_database_url()
+    return _registered(_engines, db_url, lambda: _create_engine(db_url))
+
+def get_session_factory(db_url=None):
+    """Get the cached sessionmaker bound to get_engine(db_url)."""
+    db_url = db_url or get_database_url()
+    return _registered(
+        _session_factories, db_url, lambda: sessionmaker(bind=get_engine(db_url))
+    )
+
+def get_scoped_session(db_url=None):
+    """
+    Get the thread-local session registry for a database URL.
+
+    Calling the returned scoped_session gives the same Session within a
+    thread; call .remove() on it when the thread's unit of work is done.
+    """
+    db_url = db_url or get_database_url()
+    return _registered(
+        _scoped_sessions, db_url, lambda: scoped_session(get_session_factory(db_url))
+    )
+
+def dispose_engines():
+    """Close every pooled connection and forget the registered engines."""
+    with _registry_lock:
+        for sessions in _scoped_sessions.values():
+            sessions.remove()
+        for engine in _engines.values():
+            engine.dispose()
+        _scoped_sessions.clear()
+        _session_factories.clear()
+        _engines.clear()
 
 def get_session():
     """
     Get database session that works with both SQLite and PostgreSQL.
     This replaces get_db_session() from database.py
     """
-    engine = get_engine()
-    Session = sessionmaker(bind=engine)
-    return Session()
+    return get_session_factory()()
+
+def _postgres_params():
+    return {
+        "host": os.getenv("SUPABASE_DB_HOST"),
+        "port": os.getenv("SUPABASE_DB_PORT", "5432"),
+        "database": os.getenv("SUPABASE_DB_NAME", "postgres"),
+        "user": os.getenv("SUPABASE_DB_USER", "postgres"),
+        "password": os.getenv("SUPABASE_DB_PASSWORD"),
+    }
 
 def get_raw_connection():
     """
     Get raw database connection for modules using sqlite3 directly.
     Returns appropriate connection object (sqlite3 or psycopg2).
+
+    The caller owns (and must close) the connection; prefer
+    raw_connection(), which reuses pooled connections.
     """
     if USE_SUPABASE:
         import psycopg2
-        db_host = os.getenv("SUPABASE_DB_HOST")
-        db_port = os.getenv("SUPABASE_DB_PORT", "5432")
-        db_name = os.getenv("SUPABASE_DB_NAME", "postgres")
-        db_user = os.getenv("SUPABASE_DB_USER", "postgres")
-        db_password = os.getenv("SUPABASE_DB_PASSWORD")
-        
-        return psycopg2.connect(
-            host=db_host,
-            port=db_port,
-            database=db_name,
-            user=db_user,
-            password=db_password
-        )
+        return psycopg2.connect(**_postgres_params())
     else:
-        import sqlite3
         from src.database import get_default_db_path
-        return sqlite3.connect(get_default_db_path())
+        return connect_sqlite(get_default_db_path())
+
+def raw_pool_enabled():
+    """Whether raw_connection() reuses connections."""
+    return os.getenv("RAW_POOL_ENABLED", "true").lower() == "true"
+
+def _count(name, amount=1):
+    with _raw_pool_lock:
+        _raw_stats[name] += amount
+
+def _get_pg_pool():
+    """Create the process-wide psycopg2 pool on first use."""
+    global _pg_pool, _pg_slots
+    with _raw_pool_lock:
+        if _pg_pool is None:
+            from psycopg2.pool import ThreadedConnectionPool
+
+            class CountingPool(ThreadedConnectionPool):
+                def _connect(self, key=None):
+                    _count("opened")
+                    return super()._connect(key)
+
+            min_conn = int(os.getenv("RAW_POOL_MIN_CONN", "1"))
+            max_conn = int(os.getenv("RAW_POOL_MAX_CONN", "10"))
+            _pg_pool = CountingPool(min_conn, max_conn, **_postgres_params())
+            # ThreadedConnectionPool raises when exhausted; callers wait for a slot instead
+            _pg_slots = threading.BoundedSemaphore(max_conn)
+        return _pg_pool, _pg_slots
+
+@contextmanager
+def _pooled_postgres():
+    pool, slots = _get_pg_pool()
+    started = time.perf_counter()
+    if not slots.acquire(timeout=float(os.getenv("RAW_POOL_TIMEOUT", "30"))):
+        raise TimeoutError("Timed out waiting for a pooled database connection")
+    _count("wait_seconds", time.perf_counter() - started)
+    try:
+        conn = pool.getconn()
+        broken = False
+        try:
+            yield conn
+        except Exception:
+            broken = bool(conn.closed)
+            if not broken:
+                try:
+                    conn.rollback()
+                except Exception:
+                    broken = True
+            raise
+        finally:
+            if broken or conn.closed:
+                _count("discarded")
+            pool.putconn(conn, close=broken or bool(conn.closed))
+    finally:
+        slots.release()
+
+@contextmanager
+def _thread_sqlite():
+    from src.database import get_default_db_path
+
+    db_path = get_default_db_path()
+    connections = getattr(_sqlite_local, "connections", None)
+    if connections is None:
+        connections = _sqlite_local.connections = {}
+    entry = connections.get(db_path)
+    if entry is None:
+        entry = connections[db_path] = {"conn": connect_sqlite(db_path), "depth": 0}
+        _count("opened")
+
+    conn = entry["conn"]
+    entry["depth"] += 1
+    try:
+        yield conn
+    finally:
+        entry["depth"] -= 1
+        if entry["depth"] == 0:
+            # Like closing a fresh connection: drop anything left uncommitted
+            conn.rollback()
+
+@contextmanager
+def _unpooled():
+    conn = get_raw_connection()
+    _count("opened")
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+@contextmanager
+def raw_connection():
+    """
+    Borrow a raw database connection (sqlite3 or psycopg2).
+
+    Postgres connections come from a ThreadedConnectionPool
+    (RAW_POOL_MIN_CONN..RAW_POOL_MAX_CONN; callers wait up to
+    RAW_POOL_TIMEOUT seconds for a free one). SQLite connections are kept
+    open per thread and database file. Commit explicitly; uncommitted
+    changes are rolled back when the connection is given back, and a
+    broken Postgres connection is discarded instead of being reused.
+
+    Usage:
+        with raw_connection() as conn:
+            cursor = conn.cursor()
+            ...
+    """
+    if not raw_pool_enabled():
+        provider = _unpooled()
+    elif USE_SUPABASE:
+        provider = _pooled_postgres()
+    else:
+        provider = _thread_sqlite()
+
+    with provider as conn:
+        with _raw_pool_lock:
+            _raw_stats["acquired"] += 1
+            _raw_stats["in_use"] += 1
+            _raw_stats["peak_in_use"] = max(_raw_stats["peak_in_use"], _raw_stats["in_use"])
+        try:
+            yield conn
+        finally:
+            _count("in_use", -1)
+
+def get_raw_pool_stats():
+    """
+    Get raw connection usage counters.
+
+    Returns:
+        Dict with acquired/opened/discarded counts, connections in use (now
+        and peak), total seconds spent waiting for a Postgres slot, and the
+        reuse rate (share of borrows that did not open a connection)
+    """
+    with _raw_pool_lock:
+        stats = dict(_raw_stats)
+    stats["backend"] = get_db_type()
+    stats["reuse_rate"] = 1 - stats["opened"] / stats["acquired"] if stats["acquired"] else 0.0
+    return stats
+
+def close_raw_connections():
+    """Close the Postgres pool and this thread's SQLite connections."""
+    global _pg_pool, _pg_slots
+    with _raw_pool_lock:
+        if _pg_pool is not None:
+            _pg_pool.closeall()
+            _pg_pool = _pg_slots = None
+    for entry in getattr(_sqlite_local, "connections", {}).values():
+        entry["conn"].close()
+    _sqlite_local.connections = {}
 
 def execute_query(query, params=None, fetch_one=False, fetch_all=True):
     """
@@ -112,36 +414,35 @@ def execute_query(query, params=None, fetch_one=False, fetch_all=True):
     Returns:
         Query results or None for INSERT/UPDATE/DELETE
     """
-    conn = get_raw_connection()
-    cursor = conn.cursor()
+    with raw_connection() as conn:
+        cursor = conn.cursor()
     
-    try:
-        # Convert SQLite placeholders (?) to PostgreSQL (%s) if needed
-        if USE_SUPABASE and '?' in query:
-            query = query.replace('?', '%s')
+        try:
+            # Convert SQLite placeholders (?) to PostgreSQL (%s) if needed
+            if USE_SUPABASE and '?' in query:
+                query = query.replace('?', '%s')
         
-        if params:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
         
-        if fetch_one:
-            result = cursor.fetchone()
-        elif fetch_all:
-            result = cursor.fetchall()
-        else:
-            result = None
+            if fetch_one:
+                result = cursor.fetchone()
+            elif fetch_all:
+                result = cursor.fetchall()
+            else:
+                result = None
         
-        conn.commit()
-        return result
+            conn.commit()
+            return result
     
-    except Exception as e:
-        conn.rollback()
-        raise e
+        except Exception as e:
+            conn.rollback()
+            raise e
     
-    finally:
-        cursor.close()
-        conn.close()
+        finally:
+            cursor.close()
 
 # Convenience functions for common operations
 def get_db_type():
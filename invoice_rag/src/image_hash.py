@@ -0,0 +1,157 @@
+"""
+Perceptual Image Hashing - near-duplicate receipt detection before OCR
+
+A 256-bit DCT perceptual hash (pHash) survives re-compression, resizing and
+lighting changes, so re-sending the same receipt photo lands a few bits from
+the original. Receipts share a lot of layout (white paper, header, item
+rows), so the hash must be large enough for two different receipts of the
+same shop to stay well apart: a 64-bit hash puts them only 3-7 bits apart.
+Hashes are stored per user in the image_hashes table and new uploads are
+compared by Hamming distance against that user's recent hashes.
+
+Configuration (environment variables):
+    DEDUP_ENABLED        (default: true)
+    DEDUP_MAX_DISTANCE   max differing bits out of 256 to count as a duplicate (default: 8)
+    DEDUP_LOOKBACK_DAYS  how far back to compare (default: 30)
+    DEDUP_MODE           "flag" to process duplicates but warn the user,
+                         "skip" to short-circuit them before the LLM call (default: flag)
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+from io import BytesIO
+
+from dotenv import load_dotenv
+
+from src.db_config import connect_sqlite
+
+load_dotenv()
+
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+DEDUP_MAX_DISTANCE = int(os.getenv("DEDUP_MAX_DISTANCE", "8"))
+DEDUP_LOOKBACK_DAYS = int(os.getenv("DEDUP_LOOKBACK_DAYS", "30"))
+DEDUP_MODE = os.getenv("DEDUP_MODE", "flag").lower()
+
+# Low-frequency DCT block kept from a HASH_SIZE * 4 square downscale
+HASH_SIZE = 16
+
+_tables_ready = set()
+
+
+def compute_phash(image_bytes, hash_size=HASH_SIZE):
+    """
+    Compute a DCT perceptual hash of an image.
+
+    Returns:
+        Unsigned integer of hash_size * hash_size bits, or None if the image
+        cannot be decoded
+    """
+    try:
+        import cv2
+        import numpy as np
+        from PIL import Image, ImageOps
+
+        image = Image.open(BytesIO(image_bytes))
+        image = ImageOps.exif_transpose(image).convert("L")
+        side = hash_size * 4
+        image = image.resize((side, side), Image.LANCZOS)
+    except Exception as e:
+        print(f"[WARNING] Could not hash image: {e}")
+        return None
+
+    dct = cv2.dct(np.asarray(image, dtype=np.float32))[:hash_size, :hash_size].flatten()
+    # Compare against the median of the AC terms; the DC term is overall brightness
+    bits = dct > np.median(dct[1:])
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
+def hamming_distance(hash_a, hash_b):
+    """Number of differing bits between two hashes."""
+    return (hash_a ^ hash_b).bit_count()
+
+
+def _to_hex(value):
+    # 256-bit hashes do not fit an SQLite INTEGER, store them as fixed-width hex
+    return format(value, f"0{HASH_SIZE * HASH_SIZE // 4}x")
+
+
+def _connect(db_path=None):
+    if db_path is None:
+        from src.database import get_default_db_path
+
+        db_path = get_default_db_path()
+
+    conn = connect_sqlite(db_path)
+    if db_path not in _tables_ready:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS image_hashes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                phash TEXT NOT NULL,
+                invoice_id INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_image_hashes_user_created ON image_hashes(user_id, created_at)"
+        )
+        conn.commit()
+        _tables_ready.add(db_path)
+    return conn
+
+
+def record_image_hash(user_id, phash, invoice_id=None, db_path=None):
+    """Store the hash of an ingested image for later duplicate lookups."""
+    if phash is None:
+        return
+    conn = _connect(db_path)
+    try:
+        conn.execute(
+            "INSERT INTO image_hashes (user_id, phash, invoice_id) VALUES (?, ?, ?)",
+            (str(user_id), _to_hex(phash), invoice_id),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def find_near_duplicate(user_id, phash, max_distance=None, lookback_days=None, db_path=None):
+    """
+    Find the closest recent image from the same user within max_distance bits.
+
+    Returns:
+        Dict with invoice_id, distance and created_at, or None if no near-duplicate
+    """
+    if not DEDUP_ENABLED or phash is None:
+        return None
+    if max_distance is None:
+        max_distance = DEDUP_MAX_DISTANCE
+    if lookback_days is None:
+        lookback_days = DEDUP_LOOKBACK_DAYS
+
+    since = (datetime.now(timezone.utc) - timedelta(days=lookback_days)).strftime("%Y-%m-%d %H:%M:%S")
+    conn = _connect(db_path)
+    try:
+        rows = conn.execute(
+            """
+            SELECT phash, invoice_id, created_at FROM image_hashes
+            WHERE user_id = ? AND created_at >= ?
+            ORDER BY created_at DESC
+            LIMIT 500
+        """,
+            (str(user_id), since),
+        ).fetchall()
+    finally:
+        conn.close()
+
+    best = None
+    for stored, invoice_id, created_at in rows:
+        distance = hamming_distance(phash, int(stored, 16))
+        if distance <= max_distance and (best is None or distance < best["distance"]):
+            best = {"invoice_id": invoice_id, "distance": distance, "created_at": created_at}
+    return best
@@ -0,0 +1,190 @@
+"""
+Image Preprocessing - shrink receipt photos before they are sent to the vision model
+
+Phone photos are usually several megabytes, most of which the model does not
+need. This stage auto-orients using EXIF, crops to the receipt (see
+receipt_crop.py), caps the longest edge, optionally converts to grayscale and
+re-encodes as JPEG/WebP within a byte budget.
+
+Configured per deployment through environment variables:
+    IMAGE_PREPROCESS_ENABLED  (default: true)
+    IMAGE_CROP_ENABLED        crop and flatten the receipt (default: true)
+    IMAGE_MAX_EDGE            longest edge in pixels (default: 1600)
+    IMAGE_GRAYSCALE           convert to grayscale (default: false)
+    IMAGE_FORMAT              JPEG or WEBP (default: JPEG)
+    IMAGE_MAX_BYTES           target encoded size (default: 600000)
+    IMAGE_QUALITY             starting encoder quality (default: 85)
+    IMAGE_MIN_QUALITY         lowest quality tried before downscaling further (default: 45)
+"""
+
+import os
+from io import BytesIO
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+
+
+def get_preprocess_config():
+    """Read the preprocessing settings from the environment."""
+    image_format = os.getenv("IMAGE_FORMAT", "JPEG").upper()
+    if image_format not in ("JPEG", "WEBP"):
+        image_format = "JPEG"
+
+    return {
+        "enabled": os.getenv("IMAGE_PREPROCESS_ENABLED", "true").lower() == "true",
+        "crop": os.getenv("IMAGE_CROP_ENABLED", "true").lower() == "true",
+        "max_edge": int(os.getenv("IMAGE_MAX_EDGE", "1600")),
+        "grayscale": os.getenv("IMAGE_GRAYSCALE", "false").lower() == "true",
+        "format": image_format,
+        "max_bytes": int(os.getenv("IMAGE_MAX_BYTES", "600000")),
+        "quality": int(os.getenv("IMAGE_QUALITY", "85")),
+        "min_quality": int(os.getenv("IMAGE_MIN_QUALITY", "45")),
+    }
+
+
+def guess_mime_type(image_bytes):
+    """Guess the MIME type of raw image bytes from their signature."""
+    if image_bytes.startswith(b"\x89PNG"):
+        return "image/png"
+    if image_bytes[:4] == b"RIFF" and image_bytes[8:12] == b"WEBP":
+        return "image/webp"
+    return "image/jpeg"
+
+
+def _encode(image, image_format, quality):
+    buffer = BytesIO()
+    if image_format == "WEBP":
+        image.save(buffer, format="WEBP", quality=quality, method=4)
+    else:
+        image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def _crop(image):
+    """Return the image cropped to the receipt, or None to keep it as is."""
+    from src.receipt_crop import crop_receipt
+
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    try:
+        return crop_receipt(image)
+    except Exception as e:
+        print(f"[WARNING] Receipt crop skipped: {e}")
+        return None
+
+
+def load_receipt_image(image_bytes, config):
+    """
+    Decode an image, apply EXIF orientation, receipt crop and color mode.
+
+    Returns:
+        Tuple of (PIL image, transformed) where transformed tells whether the
+        pixels differ from the original file
+
+    Raises:
+        Exception: If the image cannot be decoded
+    """
+    from PIL import Image, ImageOps
+
+    image = Image.open(BytesIO(image_bytes))
+    image.load()
+
+    # EXIF orientation tag: anything but 1 means the pixels need rotating
+    transformed = image.getexif().get(0x0112, 1) != 1
+    if transformed:
+        image = ImageOps.exif_transpose(image)
+
+    if config["crop"]:
+        cropped = _crop(image)
+        if cropped is not None:
+            image = cropped
+            transformed = True
+
+    if config["grayscale"]:
+        image = image.convert("L")
+        transformed = True
+    elif image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    return image, transformed
+
+
+def encode_for_upload(image, config):
+    """
+    Downscale and encode a PIL image within the configured byte budget.
+
+    Returns:
+        Tuple of (encoded bytes, resized) where resized tells whether the
+        image had to be scaled down
+    """
+    from PIL import Image
+
+    resized = False
+    max_edge = config["max_edge"]
+    if max_edge > 0 and max(image.size) > max_edge:
+        image = image.copy()
+        image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        resized = True
+
+    image_format = config["format"]
+    quality = config["quality"]
+    encoded = _encode(image, image_format, quality)
+
+    # Trade quality first, then resolution, until the payload fits the budget
+    while len(encoded) > config["max_bytes"]:
+        if quality > config["min_quality"]:
+            quality = max(quality - 10, config["min_quality"])
+        elif min(image.size) > 400:
+            image = image.resize(
+                (int(image.width * 0.85), int(image.height * 0.85)), Image.LANCZOS
+            )
+            resized = True
+        else:
+            break
+        encoded = _encode(image, image_format, quality)
+    return encoded, resized
+
+
+def preprocess_image_bytes(image_bytes, config=None):
+    """
+    Orient, downscale and re-encode an image to fit the configured byte budget.
+
+    Args:
+        image_bytes: Raw image file contents
+        config: Settings dict (defaults to get_preprocess_config())
+
+    Returns:
+        Tuple of (image_bytes, mime_type). The original bytes are returned
+        unchanged when preprocessing is disabled, the image cannot be decoded,
+        or re-encoding would not make it smaller.
+    """
+    if config is None:
+        config = get_preprocess_config()
+    if not config["enabled"]:
+        return image_bytes, guess_mime_type(image_bytes)
+
+    try:
+        image, transformed = load_receipt_image(image_bytes, config)
+    except Exception as e:
+        print(f"[WARNING] Image preprocessing skipped: {e}")
+        return image_bytes, guess_mime_type(image_bytes)
+
+    return finish_preprocess(image_bytes, image, transformed, config)
+
+
+def finish_preprocess(image_bytes, image, transformed, config):
+    """
+    Encode an image loaded with load_receipt_image() for upload.
+
+    Returns:
+        Tuple of (image_bytes, mime_type); the original bytes when
+        re-encoding an untouched image would not make it smaller
+    """
+    encoded, resized = encode_for_upload(image, config)
+
+    if not (transformed or resized) and len(encoded) >= len(image_bytes):
+        return image_bytes, guess_mime_type(image_bytes)
+
+    return encoded, MIME_TYPES[config["format"]]
@@ -0,0 +1,141 @@
+"""
+Image Quality Gate - reject unreadable photos before paying for an LLM call
+
+Blurry, very dark/overexposed or tiny photos almost always come back from the
+vision model as a failed extraction after several seconds. This gate checks
+them locally in a few milliseconds:
+- blur: variance of the Laplacian, measured at a fixed working size so the
+  threshold does not depend on the camera resolution
+- exposure: mean brightness
+- resolution: shortest image edge
+
+Configuration (environment variables):
+    QUALITY_GATE_ENABLED        (default: true)
+    QUALITY_MIN_SHARPNESS       minimum Laplacian variance (default: 60)
+    QUALITY_MIN_BRIGHTNESS      minimum mean brightness 0-255 (default: 40)
+    QUALITY_MAX_BRIGHTNESS      maximum mean brightness 0-255 (default: 245)
+    QUALITY_MIN_SHORT_EDGE      minimum shortest edge in pixels (default: 300)
+"""
+
+import os
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Sharpness is measured after scaling the longest edge to this size
+QUALITY_WORKING_EDGE = 1000
+
+RETAKE_HINTS = {
+    "blurry": "The photo looks blurry - hold the phone steady and let it focus on the receipt.",
+    "too_dark": "The photo is too dark - try again with more light.",
+    "too_bright": "The photo is overexposed - avoid direct light or glare on the receipt.",
+    "too_small": "The photo resolution is too low - move closer or send it uncompressed.",
+}
+
+_stats_lock = threading.Lock()
+_stats = {"checked": 0, "rejected": 0, "reasons": {}}
+
+
+def get_quality_config():
+    """Read the quality thresholds from the environment."""
+    return {
+        "enabled": os.getenv("QUALITY_GATE_ENABLED", "true").lower() == "true",
+        "min_sharpness": float(os.getenv("QUALITY_MIN_SHARPNESS", "60")),
+        "min_brightness": float(os.getenv("QUALITY_MIN_BRIGHTNESS", "40")),
+        "max_brightness": float(os.getenv("QUALITY_MAX_BRIGHTNESS", "245")),
+        "min_short_edge": int(os.getenv("QUALITY_MIN_SHORT_EDGE", "300")),
+    }
+
+
+def assess_image_quality(image_bytes, config=None):
+    """
+    Measure blur, brightness and resolution of an image.
+
+    Args:
+        image_bytes: Raw image file contents
+        config: Thresholds dict (defaults to get_quality_config())
+
+    Returns:
+        Dict with ok, reasons (list of RETAKE_HINTS keys), sharpness,
+        brightness, width and height; None if OpenCV cannot decode the image
+        (the file is then left to the normal preprocessing path)
+    """
+    if config is None:
+        config = get_quality_config()
+
+    import cv2
+    import numpy as np
+
+    image = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        return None
+
+    height, width = image.shape
+    scale = QUALITY_WORKING_EDGE / max(height, width)
+    if scale < 1:
+        image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    sharpness = float(cv2.Laplacian(image, cv2.CV_64F).var())
+    brightness = float(image.mean())
+
+    reasons = []
+    if min(height, width) < config["min_short_edge"]:
+        reasons.append("too_small")
+    if brightness < config["min_brightness"]:
+        reasons.append("too_dark")
+    elif brightness > config["max_brightness"]:
+        reasons.append("too_bright")
+    if sharpness < config["min_sharpness"]:
+        reasons.append("blurry")
+
+    result = {
+        "ok": not reasons,
+        "reasons": reasons,
+        "sharpness": sharpness,
+        "brightness": brightness,
+        "width": width,
+        "height": height,
+    }
+    _record(result)
+    return result
+
+
+def check_image_quality(image_bytes):
+    """
+    Run the quality gate if it is enabled.
+
+    Returns:
+        The assess_image_quality() result, or None when the gate is disabled
+        or the image could not be assessed
+    """
+    config = get_quality_config()
+    if not config["enabled"]:
+        return None
+    return assess_image_quality(image_bytes, config)
+
+
+def retake_message(reasons):
+    """Human-readable retake advice for a list of rejection reasons."""
+    return "\n".join(f"- {RETAKE_HINTS[reason]}" for reason in reasons)
+
+
+def _record(result):
+    with _stats_lock:
+        _stats["checked"] += 1
+        if not result["ok"]:
+            _stats["rejected"] += 1
+            for reason in result["reasons"]:
+                _stats["reasons"][reason] = _stats["reasons"].get(reason, 0) + 1
+
+
+def get_quality_stats():
+    """Return checked/rejected counts; every rejection is an LLM call saved."""
+    with _stats_lock:
+        return {
+            "checked": _stats["checked"],
+            "rejected": _stats["rejected"],
+            "llm_calls_saved": _stats["rejected"],
+            "reasons": dict(_stats["reasons"]),
+        }
@@ -0,0 +1,401 @@
+"""
+LLM Gateway - shared, pooled access to the Groq API
+
+Owns one long-lived sync client and one async client per event loop with
+HTTP keep-alive pools, so OCR calls and chatbot turns reuse connections
+instead of building a new client per request. Every call goes through:
+- a process-wide concurrency limit shared by threads and event loops; slots
+  are granted first come, first served, and a streamed completion keeps its
+  slot until the stream is consumed or closed
+- retry with jittered exponential backoff on 429 / 5xx / connection errors
+- per-call latency and status counters (see get_gateway_stats())
+
+Configuration (environment variables):
+    LLM_TIMEOUT              request timeout in seconds (default: 60)
+    LLM_MAX_RETRIES          retries after the first attempt (default: 3)
+    LLM_MAX_CONCURRENCY      concurrent requests per process (default: 8)
+    LLM_POOL_CONNECTIONS     max HTTP connections per client (default: 20)
+    LLM_KEEPALIVE            idle keep-alive connections kept open (default: 10)
+    LLM_BACKOFF_BASE         first backoff step in seconds (default: 0.5)
+    LLM_BACKOFF_MAX          backoff cap in seconds (default: 8)
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+from collections import deque
+
+import httpx
+from dotenv import load_dotenv
+from groq import (
+    APIConnectionError,
+    APIStatusError,
+    APITimeoutError,
+    AsyncGroq,
+    Groq,
+)
+
+from src.metrics import percentile
+
+load_dotenv()
+
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_POOL_CONNECTIONS = int(os.getenv("LLM_POOL_CONNECTIONS", "20"))
+LLM_KEEPALIVE = int(os.getenv("LLM_KEEPALIVE", "10"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "8"))
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+_client_lock = threading.Lock()
+_sync_client = None
+# httpx.AsyncClient connections belong to the loop that opened them
+_async_clients = weakref.WeakKeyDictionary()
+
+
+class _SlotPool:
+    """Request slots shared by threads and event loops, granted in arrival order."""
+
+    def __init__(self, size):
+        self._lock = threading.Lock()
+        self._size = size
+        self._free = size
+        self._waiters = deque()  # callbacks that hand a released slot to a waiter
+
+    def acquire(self):
+        """Block the calling thread until a slot is free."""
+        with self._lock:
+            if self._free and not self._waiters:
+                self._free -= 1
+                return
+            granted = threading.Event()
+            self._waiters.append(granted.set)
+        granted.wait()
+
+    async def acquire_async(self):
+        """Wait for a slot without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._free and not self._waiters:
+                self._free -= 1
+                return
+            future = loop.create_future()
+
+            def grant():
+                loop.call_soon_threadsafe(_resolve, future)
+
+            self._waiters.append(grant)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                try:
+                    self._waiters.remove(grant)
+                    handed_over = False
+                except ValueError:
+                    handed_over = True
+            if handed_over:
+                # The slot arrived while the waiter was being cancelled
+                self.release()
+            raise
+
+    def release(self):
+        """Hand the slot to the longest waiter, or return it to the pool."""
+        while True:
+            with self._lock:
+                if not self._waiters:
+                    if self._free >= self._size:
+                        raise ValueError("LLM slot released too many times")
+                    self._free += 1
+                    return
+                grant = self._waiters.popleft()
+            try:
+                grant()
+                return
+            except RuntimeError:
+                continue  # the waiting event loop has been closed
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+_slots = _SlotPool(LLM_MAX_CONCURRENCY)
+
+_stats_lock = threading.Lock()
+_status_counts = {}
+_latencies = deque(maxlen=1000)
+_stats = {"calls": 0, "retries": 0, "in_flight": 0}
+
+
+def _get_api_key():
+    api_key = os.environ.get("GROQ_API_KEY")
+    if not api_key:
+        raise ValueError("GROQ_API_KEY not found in environment variables")
+    return api_key
+
+
+def _limits():
+    return httpx.Limits(
+        max_connections=LLM_POOL_CONNECTIONS,
+        max_keepalive_connections=LLM_KEEPALIVE,
+        keepalive_expiry=30.0,
+    )
+
+
+def get_client():
+    """Return the shared synchronous Groq client (created on first use)."""
+    global _sync_client
+    if _sync_client is None:
+        with _client_lock:
+            if _sync_client is None:
+                _sync_client = Groq(
+                    api_key=_get_api_key(),
+                    timeout=LLM_TIMEOUT,
+                    max_retries=0,  # retries are handled here
+                    http_client=httpx.Client(limits=_limits(), timeout=LLM_TIMEOUT),
+                )
+    return _sync_client
+
+
+def get_async_client():
+    """Return the AsyncGroq client of the running event loop (created on first use).
+
+    Each loop (e.g. each asyncio.run()) gets its own client and connection
+    pool, since pooled connections cannot be reused from another loop.
+    """
+    loop = asyncio.get_running_loop()
+    with _client_lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            client = AsyncGroq(
+                api_key=_get_api_key(),
+                timeout=LLM_TIMEOUT,
+                max_retries=0,
+                http_client=httpx.AsyncClient(limits=_limits(), timeout=LLM_TIMEOUT),
+            )
+            _async_clients[loop] = client
+    return client
+
+
+def _classify(error):
+    """Map an exception to (status label, retryable, retry_after seconds)."""
+    if error is None:
+        return "success", False, None
+    if isinstance(error, APITimeoutError):
+        return "timeout", True, None
+    if isinstance(error, APIConnectionError):
+        return "connection_error", True, None
+    if isinstance(error, APIStatusError):
+        code = error.status_code
+        retry_after = None
+        try:
+            retry_after = float(error.response.headers.get("retry-after"))
+        except (TypeError, ValueError, AttributeError):
+            pass
+        if code == 429:
+            return "rate_limited", True, retry_after
+        if code >= 500:
+            return "server_error", True, retry_after
+        return f"http_{code}", code in RETRYABLE_STATUS_CODES, retry_after
+    return "error", False, None
+
+
+def _backoff(attempt, retry_after=None):
+    """Full-jitter exponential backoff, honouring Retry-After when given."""
+    delay = random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, LLM_BACKOFF_MAX))
+    return delay
+
+
+def _record(status, elapsed=None, retried=False):
+    with _stats_lock:
+        _status_counts[status] = _status_counts.get(status, 0) + 1
+        if retried:
+            _stats["retries"] += 1
+        if elapsed is not None:
+            _stats["calls"] += 1
+            _latencies.append(elapsed)
+
+
+def _track_in_flight(delta):
+    with _stats_lock:
+        _stats["in_flight"] += delta
+
+
+def _release_slot():
+    _track_in_flight(-1)
+    _slots.release()
+
+
+class _HeldStream:
+    """A streamed completion that holds its slot until consumed or closed.
+
+    The call's latency is recorded when the stream ends, so it covers the
+    whole answer rather than the time to the response headers.
+    """
+
+    def __init__(self, stream, started):
+        self._stream = stream
+        self._started = started
+        self._held = True
+
+    def _finish(self, error):
+        if not self._held:
+            return False
+        self._held = False
+        _release_slot()
+        _record(_classify(error)[0], elapsed=time.perf_counter() - self._started)
+        return True
+
+    def __iter__(self):
+        error = None
+        try:
+            yield from self._stream
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.close(error)
+
+    def close(self, error=None):
+        if self._finish(error) and hasattr(self._stream, "close"):
+            self._stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __del__(self):
+        self._finish(None)
+
+
+class _AsyncHeldStream(_HeldStream):
+    """Async counterpart of _HeldStream for AsyncGroq streams."""
+
+    def __iter__(self):
+        raise TypeError("use 'async for' with an async completion stream")
+
+    def __enter__(self):
+        raise TypeError("use 'async with' with an async completion stream")
+
+    def __exit__(self, *exc_info):
+        raise TypeError("use 'async with' with an async completion stream")
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        error = None
+        try:
+            async for chunk in self._stream:
+                yield chunk
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            await self.close(error)
+
+    async def close(self, error=None):
+        if self._finish(error) and hasattr(self._stream, "close"):
+            await self._stream.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+def chat_completion(**kwargs):
+    """Create a chat completion through the shared sync client.
+
+    Accepts the same keyword arguments as client.chat.completions.create().
+    Raises the last API error once retries are exhausted. With
+    ``stream=True`` the concurrency slot is held until the returned stream
+    is exhausted or closed.
+    """
+    client = get_client()
+    started = time.perf_counter()
+    attempt = 0
+
+    while True:
+        _slots.acquire()
+        _track_in_flight(1)
+        try:
+            response = client.chat.completions.create(**kwargs)
+            error = None
+        except Exception as e:
+            response, error = None, e
+        except BaseException:
+            _release_slot()
+            raise
+        if error is None and kwargs.get("stream"):
+            return _HeldStream(response, started)
+        _release_slot()
+
+        status, retryable, retry_after = _classify(error)
+        if error is None or not retryable or attempt >= LLM_MAX_RETRIES:
+            _record(status, elapsed=time.perf_counter() - started)
+            if error is not None:
+                raise error
+            return response
+
+        _record(status, retried=True)
+        time.sleep(_backoff(attempt, retry_after))
+        attempt += 1
+
+
+async def async_chat_completion(**kwargs):
+    """Async counterpart of chat_completion() using the loop's AsyncGroq client."""
+    client = get_async_client()
+    started = time.perf_counter()
+    attempt = 0
+
+    while True:
+        await _slots.acquire_async()
+        _track_in_flight(1)
+        try:
+            response = await client.chat.completions.create(**kwargs)
+            error = None
+        except Exception as e:
+            response, error = None, e
+        except BaseException:
+            _release_slot()  # cancelled or interrupted mid-request
+            raise
+        if error is None and kwargs.get("stream"):
+            return _AsyncHeldStream(response, started)
+        _release_slot()
+
+        status, retryable, retry_after = _classify(error)
+        if error is None or not retryable or attempt >= LLM_MAX_RETRIES:
+            _record(status, elapsed=time.perf_counter() - started)
+            if error is not None:
+                raise error
+            return response
+
+        _record(status, retried=True)
+        await asyncio.sleep(_backoff(attempt, retry_after))
+        attempt += 1
+
+
+def get_gateway_stats():
+    """Return call counts, per-status counters and latency percentiles."""
+    with _stats_lock:
+        latencies = list(_latencies)
+        stats = dict(_stats)
+        stats["status_counts"] = dict(_status_counts)
+
+    stats["max_concurrency"] = LLM_MAX_CONCURRENCY
+    stats["latency_p50"] = percentile(latencies, 50)
+    stats["latency_p95"] = percentile(latencies, 95)
+    return stats
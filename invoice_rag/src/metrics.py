@@ -0,0 +1,32 @@
+"""
+Metrics helpers shared by the pipeline, gateway and benchmarks.
+"""
+
+import math
+
+
+def percentile(values, pct):
+    """Return the nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100.0 * len(ordered)), 1)
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def format_duration(seconds):
+    """Format seconds as e.g. '42s', '6m 15s' or '1h 05m'."""
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+
+
+def format_progress(done, total, elapsed):
+    """Return a one-line progress/ETA summary for a batch run."""
+    rate = done / elapsed if elapsed > 0 else 0.0
+    percent = done / total * 100 if total else 100.0
+    eta = format_duration((total - done) / rate) if rate > 0 else "?"
+    return f"Progress: {done}/{total} ({percent:.0f}%) - {rate:.2f} images/s - ETA {eta}"
@@ -0,0 +1,163 @@
+"""
+OCR Model Router - try a fast vision model first, escalate only when needed
+
+Each receipt is extracted with OCR_FAST_MODEL. The result is escalated to
+OCR_STRONG_MODEL when:
+- extraction or RobustInvoice validation failed
+- the total was rejected by the currency parser (it came back as 0)
+- the item prices disagree with total_amount by more than the tolerance
+
+Per-model latency, success and escalation counters are available through
+get_router_stats().
+
+Configuration (environment variables):
+    OCR_ROUTING_ENABLED      (default: false - every receipt goes to OCR_MODEL)
+    OCR_FAST_MODEL           first model tried
+    OCR_STRONG_MODEL         model used on escalation
+    OCR_ITEM_SUM_TOLERANCE   allowed relative gap between the item sum and the
+                             total, for tax/discount lines (default: 0.15)
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+from dotenv import load_dotenv
+
+from src.metrics import percentile
+
+load_dotenv()
+
+_stats_lock = threading.Lock()
+_model_stats = {}
+
+
+def routing_enabled():
+    """Whether receipts are routed fast-model-first."""
+    return os.getenv("OCR_ROUTING_ENABLED", "false").lower() == "true"
+
+
+def get_route():
+    """Return the models to try, in order."""
+    fast = os.getenv("OCR_FAST_MODEL", "meta-llama/llama-4-scout-17b-16e-instruct")
+    strong = os.getenv("OCR_STRONG_MODEL", "meta-llama/llama-4-maverick-17b-128e-instruct")
+    return [fast] if fast == strong else [fast, strong]
+
+
+def get_route_key():
+    """Label used in cache keys for routed extractions."""
+    return "route:" + ">".join(get_route())
+
+
+def escalation_reason(invoice_data):
+    """
+    Decide whether an extraction should be retried with a stronger model.
+
+    Returns:
+        Reason string ("validation_failed", "total_rejected", "item_sum_mismatch")
+        or None if the result looks trustworthy
+    """
+    if not invoice_data:
+        return "validation_failed"
+
+    total = invoice_data.get("total_amount") or 0.0
+    if total <= 0:
+        return "total_rejected"
+
+    item_totals = [item.get("total_price") or 0.0 for item in invoice_data.get("items") or []]
+    item_sum = sum(item_totals)
+    if item_sum > 0:
+        tolerance = float(os.getenv("OCR_ITEM_SUM_TOLERANCE", "0.15"))
+        if abs(item_sum - total) > tolerance * total:
+            return "item_sum_mismatch"
+    return None
+
+
+def _record(model, elapsed, reason, escalated):
+    with _stats_lock:
+        stats = _model_stats.setdefault(
+            model,
+            {"calls": 0, "successes": 0, "escalations": 0, "reasons": {}, "latencies": deque(maxlen=1000)},
+        )
+        stats["calls"] += 1
+        stats["latencies"].append(elapsed)
+        if reason is None:
+            stats["successes"] += 1
+        else:
+            stats["reasons"][reason] = stats["reasons"].get(reason, 0) + 1
+        if escalated:
+            stats["escalations"] += 1
+
+
+def _next_step(route, index, model, invoice_data, elapsed):
+    """Record one attempt; return True if the next model should be tried."""
+    reason = escalation_reason(invoice_data)
+    escalate = reason is not None and index < len(route) - 1
+    _record(model, elapsed, reason, escalate)
+    if escalate:
+        print(f"   [ROUTER] {model} result rejected ({reason}) - escalating to {route[index + 1]}")
+    return escalate
+
+
+def _keep_usable(best, model, invoice_data):
+    """Latest usable result so far; an escalation that fails keeps the earlier one."""
+    if invoice_data is not None:
+        return model, invoice_data
+    if best[1] is not None:
+        print(f"   [ROUTER] {model} failed - keeping the {best[0]} result")
+    return best
+
+
+def route_extraction(extract, *args, **kwargs):
+    """
+    Run extract(*args, model=..., **kwargs) along the route until a result passes.
+
+    Returns:
+        The first accepted result; otherwise the last non-None one, so a
+        failed escalation does not discard a usable fast-model answer
+    """
+    route = get_route()
+    best = (None, None)
+    for index, model in enumerate(route):
+        started = time.perf_counter()
+        invoice_data = extract(*args, model=model, **kwargs)
+        best = _keep_usable(best, model, invoice_data)
+        if not _next_step(route, index, model, invoice_data, time.perf_counter() - started):
+            break
+    return best[1]
+
+
+async def async_route_extraction(extract, *args, **kwargs):
+    """Async counterpart of route_extraction for coroutine extractors."""
+    route = get_route()
+    best = (None, None)
+    for index, model in enumerate(route):
+        started = time.perf_counter()
+        invoice_data = await extract(*args, model=model, **kwargs)
+        best = _keep_usable(best, model, invoice_data)
+        if not _next_step(route, index, model, invoice_data, time.perf_counter() - started):
+            break
+    return best[1]
+
+
+def get_router_stats():
+    """Return per-model calls, success/escalation rates and latency percentiles."""
+    with _stats_lock:
+        snapshot = {
+            model: (dict(stats), list(stats["latencies"]), dict(stats["reasons"]))
+            for model, stats in _model_stats.items()
+        }
+
+    report = {}
+    for model, (stats, latencies, reasons) in snapshot.items():
+        calls = stats["calls"]
+        report[model] = {
+            "calls": calls,
+            "success_rate": stats["successes"] / calls if calls else 0.0,
+            "escalation_rate": stats["escalations"] / calls if calls else 0.0,
+            "rejection_reasons": reasons,
+            "latency_p50": percentile(latencies, 50),
+            "latency_p95": percentile(latencies, 95),
+        }
+    return report
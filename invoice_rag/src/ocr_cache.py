@@ -0,0 +1,190 @@
+"""
+OCR Result Cache - content-addressed store of validated LLM extractions
+
+Entries are keyed by the SHA-256 of the raw image bytes plus the OCR model
+and a cache version (the prompt version and a hash of the image settings, see
+processor.get_cache_version()), so re-sent photos and re-run backfills skip
+the Groq call. Stored in a local SQLite file with TTL expiry and LRU eviction.
+
+Configuration (environment variables):
+    OCR_CACHE_ENABLED       (default: true)
+    OCR_CACHE_MAX_ENTRIES   entries kept before LRU eviction (default: 5000)
+    OCR_CACHE_TTL_DAYS      age after which entries expire (default: 90)
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from src.db_config import connect_sqlite
+
+load_dotenv()
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+_initialized_paths = set()
+
+
+def get_cache_config():
+    """Read the cache settings from the environment."""
+    return {
+        "enabled": os.getenv("OCR_CACHE_ENABLED", "true").lower() == "true",
+        "max_entries": int(os.getenv("OCR_CACHE_MAX_ENTRIES", "5000")),
+        "ttl_days": float(os.getenv("OCR_CACHE_TTL_DAYS", "90")),
+    }
+
+
+def get_cache_path():
+    """Get the cache database path (OCR_CACHE_PATH or database/ocr_cache.db)."""
+    configured = os.getenv("OCR_CACHE_PATH")
+    if configured:
+        return configured
+    invoice_rag_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(invoice_rag_dir, "database", "ocr_cache.db")
+
+
+def hash_image_bytes(image_bytes):
+    """Return the hex SHA-256 digest of raw image bytes."""
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def _connect():
+    path = get_cache_path()
+    conn = connect_sqlite(path, timeout=10)
+    if path not in _initialized_paths:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ocr_cache (
+                image_sha256 TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                invoice_json TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_accessed REAL NOT NULL,
+                PRIMARY KEY (image_sha256, model, prompt_version)
+            )
+        """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_ocr_cache_last_accessed ON ocr_cache(last_accessed)"
+        )
+        conn.commit()
+        _initialized_paths.add(path)
+    return conn
+
+
+def get_cached_invoice(image_hash, model, prompt_version):
+    """
+    Look up a cached extraction.
+
+    Returns:
+        The stored invoice dict, or None on a miss (or when caching is disabled)
+    """
+    config = get_cache_config()
+    if not config["enabled"]:
+        return None
+
+    try:
+        conn = _connect()
+        try:
+            row = conn.execute(
+                """
+                SELECT invoice_json, created_at FROM ocr_cache
+                WHERE image_sha256 = ? AND model = ? AND prompt_version = ?
+            """,
+                (image_hash, model, prompt_version),
+            ).fetchone()
+
+            now = time.time()
+            if row and now - row[1] <= config["ttl_days"] * 86400:
+                conn.execute(
+                    """
+                    UPDATE ocr_cache SET last_accessed = ?
+                    WHERE image_sha256 = ? AND model = ? AND prompt_version = ?
+                """,
+                    (now, image_hash, model, prompt_version),
+                )
+                conn.commit()
+                _count("hits")
+                return json.loads(row[0])
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"[WARNING] OCR cache lookup failed: {e}")
+
+    _count("misses")
+    return None
+
+
+def store_invoice(image_hash, model, prompt_version, invoice_data):
+    """Store a validated extraction and evict expired / least recently used entries."""
+    config = get_cache_config()
+    if not config["enabled"] or not invoice_data:
+        return
+
+    try:
+        conn = _connect()
+        try:
+            now = time.time()
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO ocr_cache (
+                    image_sha256, model, prompt_version, invoice_json, created_at, last_accessed
+                ) VALUES (?, ?, ?, ?, ?, ?)
+            """,
+                (image_hash, model, prompt_version, json.dumps(invoice_data), now, now),
+            )
+            _count("stores")
+
+            evicted = conn.execute(
+                "DELETE FROM ocr_cache WHERE created_at < ?",
+                (now - config["ttl_days"] * 86400,),
+            ).rowcount
+
+            entries = conn.execute("SELECT COUNT(*) FROM ocr_cache").fetchone()[0]
+            if entries > config["max_entries"]:
+                evicted += conn.execute(
+                    """
+                    DELETE FROM ocr_cache WHERE rowid IN (
+                        SELECT rowid FROM ocr_cache ORDER BY last_accessed ASC LIMIT ?
+                    )
+                """,
+                    (entries - config["max_entries"],),
+                ).rowcount
+
+            conn.commit()
+            if evicted:
+                _count("evictions", evicted)
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"[WARNING] OCR cache store failed: {e}")
+
+
+def get_cache_stats():
+    """Return hit/miss/store/eviction counters plus the current entry count."""
+    with _stats_lock:
+        stats = dict(_stats)
+
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    stats["entries"] = 0
+    if get_cache_config()["enabled"]:
+        try:
+            conn = _connect()
+            try:
+                stats["entries"] = conn.execute("SELECT COUNT(*) FROM ocr_cache").fetchone()[0]
+            finally:
+                conn.close()
+        except Exception:
+            pass
+    return stats
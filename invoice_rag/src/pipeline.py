@@ -0,0 +1,300 @@
+"""
+Bulk Ingestion Pipeline - concurrent staged processing for large backfills
+
+Stages (connected by bounded queues):
+1. Discovery/encoding: reads each image, answers repeats from the OCR
+   cache and QRIS receipts from their QR code, and downscales/base64-encodes
+   the rest (very long receipts as several strips, see src/tiling.py)
+2. LLM pool: a fixed number of workers calling the extraction model; the
+   strips of a long receipt are extracted concurrently and merged
+3. DB writer: a single thread saving results in batched transactions
+
+With checkpointing on, saved images are marked done in the ingestion
+manifest inside the same batch transaction and failures are recorded, so an
+interrupted backfill can be resumed (see src/checkpoint.py).
+"""
+
+import os
+import queue
+import threading
+import time
+
+from src.checkpoint import mark_failed
+from src.metrics import format_progress, percentile
+from src.model_router import get_router_stats, routing_enabled
+from src.ocr_cache import get_cached_invoice, hash_image_bytes, store_invoice
+from src.processor import (
+    get_cache_model,
+    get_cache_version,
+    prepare_image_tiles,
+    process_invoice_with_llm,
+    process_tiles_with_llm,
+    qris_fast_path,
+    quality_gate,
+    save_many_to_database,
+    validate_cached_invoice,
+)
+from src.tiling import get_tiling_stats
+
+# Maximum invoices written per transaction and how long the writer waits
+# to fill a batch before flushing what it has
+WRITE_BATCH_SIZE = 25
+WRITE_BATCH_TIMEOUT = 1.0
+
+_STOP = object()
+
+
+def _discover(image_paths, encoded_q, result_q, inflight, stats, lock):
+    """Stage 1: read and encode images, respecting the in-flight limit."""
+    cache_model = get_cache_model()
+    cache_version = get_cache_version()
+    for image_path in image_paths:
+        inflight.acquire()
+        try:
+            with open(image_path, "rb") as image_file:
+                image_bytes = image_file.read()
+        except Exception as e:
+            print(f"[ERROR] Could not read {image_path}: {e}")
+            with lock:
+                stats["failed"] += 1
+            inflight.release()
+            continue
+
+        image_hash = hash_image_bytes(image_bytes)
+        try:
+            cached = get_cached_invoice(image_hash, cache_model, cache_version)
+            if cached:
+                invoice_data = validate_cached_invoice(cached)
+                with lock:
+                    stats["cache_hits"] += 1
+                result_q.put((image_path, image_hash, invoice_data))
+                continue
+
+            from_qr, vendor_profile = qris_fast_path(image_bytes)
+            if from_qr:
+                with lock:
+                    stats["qris_hits"] += 1
+                result_q.put((image_path, image_hash, from_qr))
+                continue
+
+            if quality_gate(image_bytes):
+                with lock:
+                    stats["quality_rejected"] += 1
+                result_q.put((image_path, image_hash, None))
+                continue
+
+            tiles = prepare_image_tiles(image_bytes)
+        except Exception as e:
+            # Hand the image to the writer as failed so its in-flight slot is released
+            print(f"[ERROR] Could not prepare {image_path}: {e}")
+            result_q.put((image_path, image_hash, None))
+            continue
+        encoded_q.put((image_path, image_hash, tiles, vendor_profile))
+
+
+def _extract(encoded_q, result_q, stats, lock):
+    """Stage 2: call the LLM for each encoded image."""
+    cache_model = get_cache_model()
+    cache_version = get_cache_version()
+    while True:
+        job = encoded_q.get()
+        if job is _STOP:
+            break
+        image_path, image_hash, tiles, vendor_profile = job
+
+        invoice_data = None
+        try:
+            started = time.perf_counter()
+            if len(tiles) > 1:
+                invoice_data = process_tiles_with_llm(tiles)
+            else:
+                base64_image, mime_type = tiles[0]
+                invoice_data = process_invoice_with_llm(
+                    image_path,
+                    base64_image=base64_image,
+                    mime_type=mime_type,
+                    vendor_profile=vendor_profile,
+                )
+            elapsed = time.perf_counter() - started
+            store_invoice(image_hash, cache_model, cache_version, invoice_data)
+
+            with lock:
+                stats["latencies"].append(elapsed)
+        except Exception as e:
+            print(f"[ERROR] Extraction of {os.path.basename(image_path)} failed: {e}")
+            invoice_data = None
+        finally:
+            # Every job reaches the writer, which marks failures and releases the slot
+            result_q.put((image_path, image_hash, invoice_data))
+
+
+def _write(result_q, inflight, stats, lock, checkpoint=False):
+    """Stage 3: save extracted invoices in batches."""
+    batch = []
+    hashes = []
+    done = False
+
+    while not done:
+        deadline = time.monotonic() + WRITE_BATCH_TIMEOUT
+        while len(batch) < WRITE_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                job = result_q.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if job is _STOP:
+                done = True
+                break
+
+            image_path, image_hash, invoice_data = job
+            if invoice_data:
+                batch.append((invoice_data, image_path))
+                hashes.append(image_hash)
+            else:
+                print(f"[ERROR] Failed to extract data from {os.path.basename(image_path)}")
+                if checkpoint:
+                    mark_failed(image_path, image_hash, "extraction failed")
+                with lock:
+                    stats["failed"] += 1
+                inflight.release()
+
+        if not batch:
+            _report_progress(stats, lock)
+            continue
+
+        if checkpoint:
+            invoice_ids = save_many_to_database(batch, content_hashes=hashes)
+        else:
+            invoice_ids = save_many_to_database(batch)
+        with lock:
+            if invoice_ids is None:
+                stats["failed"] += len(batch)
+            else:
+                stats["saved"] += len(batch)
+                stats["total_amount"] += sum(
+                    invoice_data.get("total_amount", 0) for invoice_data, _ in batch
+                )
+        if invoice_ids is not None:
+            print(f"   [SUCCESS] Saved batch of {len(batch)} invoices")
+
+        if invoice_ids is None and checkpoint:
+            for (_, image_path), image_hash in zip(batch, hashes):
+                mark_failed(image_path, image_hash, "database error")
+
+        for _ in batch:
+            inflight.release()
+        batch = []
+        hashes = []
+        _report_progress(stats, lock)
+
+
+def _report_progress(stats, lock):
+    with lock:
+        finished = stats["saved"] + stats["failed"]
+        if finished == stats["last_reported"]:
+            return
+        stats["last_reported"] = finished
+    print(format_progress(finished, stats["total"], time.perf_counter() - stats["started"]))
+
+
+def run_bulk(image_paths, workers=4, max_inflight=16, checkpoint=False):
+    """Process many invoice images concurrently and print a throughput report.
+
+    Args:
+        image_paths: Image files to process
+        workers: Number of concurrent LLM requests
+        max_inflight: Maximum images read into memory but not yet saved
+        checkpoint: Record progress in the ingestion checkpoint manifest
+
+    Returns:
+        Dict with counts, throughput and latency percentiles
+    """
+    workers = max(1, workers)
+    max_inflight = max(workers, max_inflight)
+
+    encoded_q = queue.Queue(maxsize=max_inflight)
+    result_q = queue.Queue(maxsize=max_inflight)
+    inflight = threading.BoundedSemaphore(max_inflight)
+    lock = threading.Lock()
+    started = time.perf_counter()
+    stats = {
+        "saved": 0,
+        "failed": 0,
+        "cache_hits": 0,
+        "qris_hits": 0,
+        "quality_rejected": 0,
+        "total_amount": 0.0,
+        "latencies": [],
+        "total": len(image_paths),
+        "started": started,
+        "last_reported": 0,
+    }
+
+    print(f"Bulk mode: {workers} workers, up to {max_inflight} images in flight")
+
+    writer = threading.Thread(
+        target=_write, args=(result_q, inflight, stats, lock, checkpoint), daemon=True
+    )
+    writer.start()
+    extractors = [
+        threading.Thread(target=_extract, args=(encoded_q, result_q, stats, lock), daemon=True)
+        for _ in range(workers)
+    ]
+    for thread in extractors:
+        thread.start()
+
+    _discover(image_paths, encoded_q, result_q, inflight, stats, lock)
+
+    for _ in extractors:
+        encoded_q.put(_STOP)
+    for thread in extractors:
+        thread.join()
+    result_q.put(_STOP)
+    writer.join()
+
+    elapsed = time.perf_counter() - started
+    latencies = stats["latencies"]
+    report = {
+        "processed": len(image_paths),
+        "saved": stats["saved"],
+        "failed": stats["failed"],
+        "cache_hits": stats["cache_hits"],
+        "qris_hits": stats["qris_hits"],
+        "quality_rejected": stats["quality_rejected"],
+        "total_amount": stats["total_amount"],
+        "elapsed_seconds": elapsed,
+        "images_per_second": len(image_paths) / elapsed if elapsed > 0 else 0.0,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+    }
+
+    print("\nBULK PROCESSING COMPLETE!")
+    print(f"Saved {report['saved']}/{report['processed']} invoices ({report['failed']} failed)")
+    print(f"OCR cache hits: {report['cache_hits']}, read from QRIS codes: {report['qris_hits']}")
+    if report["quality_rejected"]:
+        print(f"Rejected by the quality gate (LLM calls saved): {report['quality_rejected']}")
+    print(f"Total amount: Rp {report['total_amount']:,.2f}")
+    print(f"Elapsed: {elapsed:.1f}s - {report['images_per_second']:.2f} images/s")
+    print(
+        f"LLM latency: p50 {report['latency_p50']:.2f}s, p95 {report['latency_p95']:.2f}s"
+    )
+    tiling = get_tiling_stats()
+    if tiling["receipts"]:
+        report["tiling"] = tiling
+        print(
+            f"Long receipts read in strips: {tiling['receipts']} "
+            f"({tiling['failed_strips']} strips failed, {tiling['partial_merges']} saved with "
+            f"missing strips, {tiling['rejected']} rejected)"
+        )
+    if routing_enabled():
+        report["models"] = get_router_stats()
+        for model, model_stats in report["models"].items():
+            print(
+                f"  {model}: {model_stats['calls']} calls, "
+                f"{model_stats['success_rate']:.0%} accepted, "
+                f"{model_stats['escalation_rate']:.0%} escalated, "
+                f"p50 {model_stats['latency_p50']:.2f}s"
+            )
+    return report
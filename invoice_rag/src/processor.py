@@ -5,18 +5,22 @@ Invoice Processor - Main invoice processing with standardized date/time format
 
 import os
 import json
+import hashlib
+import asyncio
 import base64
-import sqlite3
-import re
+import inspect
+import time
 from typing import List, Optional
 from pydantic import BaseModel, Field, field_validator
 from enum import Enum
-from groq import Groq
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Bump whenever the extraction prompt changes so cached results are not reused
+PROMPT_VERSION = "v1"
+
 
 class TransactionType(str, Enum):
     """Transaction type enum for validation."""
@@ -59,35 +63,9 @@ class RobustInvoice(BaseModel):
         if not v:
             return None
 
-        # Common date patterns
-        patterns = [
-            r"(\d{4})-(\d{2})-(\d{2})",  # YYYY-MM-DD
-            r"(\d{2})-(\d{2})-(\d{4})",  # DD-MM-YYYY
-            r"(\d{2})/(\d{2})/(\d{4})",  # DD/MM/YYYY
-            r"(\d{4})/(\d{2})/(\d{2})",  # YYYY/MM/DD
-            r"(\d{2})\.(\d{2})\.(\d{4})",  # DD.MM.YYYY
-        ]
+        from .dates import normalize_date_string
 
-        for pattern in patterns:
-            match = re.search(pattern, str(v))
-            if match:
-                parts = match.groups()
-                if len(parts) == 3:
-                    # Determine if it's YYYY-MM-DD or DD-MM-YYYY format
-                    if len(parts[0]) == 4:  # YYYY-MM-DD or YYYY/MM/DD
-                        year, month, day = parts
-                    else:  # DD-MM-YYYY, DD/MM/YYYY, DD.MM.YYYY
-                        day, month, year = parts
-
-                    # Validate and format
-                    try:
-                        year, month, day = int(year), int(month), int(day)
-                        if 1 <= month <= 12 and 1 <= day <= 31:
-                            return f"{year:04d}-{month:02d}-{day:02d}"
-                    except ValueError:
-                        pass
-
-        return v  # Return original if no pattern matches
+        return normalize_date_string(str(v))
 
     @field_validator("transaction_type", mode="before")
     @classmethod
@@ -125,12 +103,73 @@ class RobustInvoice(BaseModel):
         return TransactionType.RETAIL
 
 
+def get_ocr_model():
+    """Get the OCR model from the environment."""
+    return os.environ.get("OCR_MODEL", "meta-llama/llama-4-scout-17b-16e-instruct")
+
+
+def get_cache_model():
+    """Model label used in OCR cache keys (the whole route when routing is on)."""
+    from .model_router import get_route_key, routing_enabled
+
+    return get_route_key() if routing_enabled() else get_ocr_model()
+
+
+def get_output_format():
+    """Get the extraction output schema: "verbose" (default) or "compact"."""
+    output_format = os.environ.get("OCR_OUTPUT_FORMAT", "verbose").lower()
+    return output_format if output_format in ("verbose", "compact") else "verbose"
+
+
+def get_prompt_version():
+    """Prompt version of an extraction (differs per output schema)."""
+    if get_output_format() == "compact":
+        return f"{PROMPT_VERSION}-compact"
+    return PROMPT_VERSION
+
+
+def get_cache_version():
+    """Version used in OCR cache keys: the prompt version plus a hash of the
+    preprocessing and tiling settings, which change what the model sees."""
+    from .image_preprocess import get_preprocess_config
+    from .tiling import get_tiling_config
+
+    settings = json.dumps([get_preprocess_config(), get_tiling_config()], sort_keys=True)
+    return f"{get_prompt_version()}-{hashlib.sha256(settings.encode()).hexdigest()[:8]}"
+
+
 def encode_image(image_path):
     """Encode image to base64."""
     with open(image_path, "rb") as image_file:
         return base64.b64encode(image_file.read()).decode("utf-8")
 
 
+def prepare_image(image_bytes):
+    """Downscale/re-encode raw image bytes and return (base64, mime_type)."""
+    from .image_preprocess import preprocess_image_bytes
+
+    image_bytes, mime_type = preprocess_image_bytes(image_bytes)
+    return base64.b64encode(image_bytes).decode("utf-8"), mime_type
+
+
+def prepare_image_tiles(image_bytes):
+    """Like prepare_image, but very tall receipts are split into strips.
+
+    Returns:
+        List of (base64, mime_type), top to bottom (a single entry when the
+        image is extracted whole)
+    """
+    from .tiling import split_receipt
+
+    tiles = split_receipt(image_bytes)
+    if len(tiles) > 1:
+        print(f"   [TILES] Long receipt - extracting {len(tiles)} strips concurrently")
+    return [
+        (base64.b64encode(tile_bytes).decode("utf-8"), mime_type)
+        for tile_bytes, mime_type in tiles
+    ]
+
+
 def parse_indonesian_currency(value_str):
     """Parse Indonesian currency format to float.
 
@@ -144,180 +183,14 @@ def parse_indonesian_currency(value_str):
 
     NOTE: Rejects invalid range formats like "-20000-60000"
     """
-    if not value_str:
-        return 0.0
-
-    # Convert to string and clean
-    value_str = str(value_str).strip()
-
-    # Handle edge cases that might cause errors
-    if not value_str or value_str.lower() in ["null", "none", "-", ""]:
-        return 0.0
-
-    # VALIDATION: Reject obvious invalid formats
-    original_value = value_str
-
-    # Remove currency symbols more thoroughly
-    # First remove common currency patterns
-    value_str = re.sub(r"\b[Rp]+\b", "", value_str, flags=re.IGNORECASE)
-    value_str = re.sub(r"\s+", "", value_str)  # Remove all spaces
-
-    # STRICT VALIDATION: Check for suspicious range patterns
-    # Count dashes and numbers to detect invalid ranges
-    if "-" in value_str:
-        dash_count = value_str.count("-")
-        # If multiple dashes or complex patterns, it might be invalid
-        parts = [p for p in value_str.split("-") if p and p.strip()]
-
-        # If we have multiple numeric parts separated by dashes, this is suspicious
-        if len(parts) > 2:
-            print(
-                f"[WARNING] Suspicious range format detected: '{original_value}' - rejecting"
-            )
-            return 0.0
+    from .currency import parse_currency
 
-        # If we have exactly 2 parts and both are purely numeric (no dots/commas)
-        # this is likely an invalid range format
-        if len(parts) == 2 and all(p.isdigit() for p in parts):
-            print(
-                f"[WARNING] Invalid range format detected: '{original_value}' - rejecting"
-            )
-            return 0.0
+    return parse_currency(value_str)
 
-        # Handle legitimate cases like negative numbers
-        if dash_count >= 2 or (
-            dash_count == 1
-            and not (value_str.startswith("-") and len(value_str.split("-")) == 2)
-        ):
-            # This might be a range, take the last number only if it's reasonable
-            if len(parts) > 1:
-                value_str = parts[-1]  # Take the last non-empty part
-
-    # Remove any remaining non-numeric characters except dots and commas
-    value_str = re.sub(
-        r"[^\d.,]", "", value_str
-    )  # Remove the \- from regex since we handled ranges
-
-    if not value_str:
-        return 0.0
-
-    # Check if it has both dots and comma (Indonesian full format)
-    if "." in value_str and "," in value_str:
-        # Determine which is decimal separator
-        # In Indonesian: dots for thousands, comma for decimal
-        # But also handle English format: comma for thousands, dot for decimal
-
-        # Find last dot and comma positions
-        last_dot = value_str.rfind(".")
-        last_comma = value_str.rfind(",")
-
-        if last_comma > last_dot:
-            # Comma comes after dot: "59.385,50" (Indonesian format)
-            parts = value_str.split(",")
-            integer_part = parts[0].replace(".", "")  # Remove thousand separators
-            decimal_part = parts[1] if len(parts) > 1 else "0"
-            try:
-                return float(f"{integer_part}.{decimal_part}")
-            except ValueError:
-                return 0.0
-        else:
-            # Dot comes after comma: "500,000.00" (English format)
-            parts = value_str.split(".")
-            integer_part = parts[0].replace(",", "")  # Remove thousand separators
-            decimal_part = parts[1] if len(parts) > 1 else "0"
-            try:
-                return float(f"{integer_part}.{decimal_part}")
-            except ValueError:
-                return 0.0
-
-    # Check if it only has comma (could be decimal or thousands)
-    elif "," in value_str and value_str.count(",") == 1:
-        # Could be decimal or thousands separator
-        parts = value_str.split(",")
-        if len(parts) == 2:
-            # If the part after comma has 3 digits, it's thousands
-            if len(parts[1]) == 3 and parts[1].isdigit():
-                try:
-                    return float(value_str.replace(",", ""))
-                except ValueError:
-                    return 0.0
-            # Otherwise it's decimal
-            else:
-                try:
-                    return float(value_str.replace(",", "."))
-                except ValueError:
-                    return 0.0
-
-    # Check if it only has dots
-    elif "." in value_str:
-        dot_count = value_str.count(".")
-        if dot_count > 1:
-            # Multiple dots = thousands separators, e.g., "6.000.000"
-            try:
-                return float(value_str.replace(".", ""))
-            except ValueError:
-                return 0.0
-        else:
-            # Single dot - check context to determine if thousands or decimal
-            parts = value_str.split(".")
-            if len(parts) == 2:
-                # If last part has exactly 3 digits, likely thousands separator
-                if len(parts[1]) == 3 and parts[1].isdigit() and len(parts[0]) <= 3:
-                    try:
-                        return float(value_str.replace(".", ""))
-                    except ValueError:
-                        return 0.0
-                else:
-                    # Otherwise treat as decimal separator
-                    try:
-                        return float(value_str)
-                    except ValueError:
-                        return 0.0
-
-    # No special characters, just convert
-    try:
-        return float(value_str)
-    except ValueError:
-        return 0.0
 
-
-def process_invoice_with_llm(image_path):
-    """Process invoice using Groq LLM with enhanced prompting."""
-
-    # Get API key
-    groq_api_key = os.environ.get("GROQ_API_KEY")
-    if not groq_api_key:
-        print("Please set the GROQ_API_KEY environment variable")
-        return None
-
-    client = Groq(api_key=groq_api_key)
-    
-    # Get OCR model from environment
-    ocr_model = os.environ.get("OCR_MODEL", "meta-llama/llama-4-scout-17b-16e-instruct")
-
-    try:
-        # Encode image
-        base64_image = encode_image(image_path)
-
-        # Enhanced prompt for consistent formatting
-        prompt = """Extract invoice data from this image and return ONLY a JSON object with this exact structure:
-
-{
-  "shop_name": "name of the shop/store",
-  "invoice_date": "date in YYYY-MM-DD format (e.g., 2024-12-25)",
-  "total_amount": "SINGLE FINAL AMOUNT ONLY - the main total to pay",
-  "transaction_type": "bank|retail|e-commerce (optional, will be auto-determined)",
-  "items": [
-    {
-      "name": "item name",
-      "quantity": 1,
-      "unit_price": "unit price for this item",
-      "total_price": "total price for this item"
-    }
-  ]
-}
-
-CRITICAL FORMATTING RULES:
+# Enhanced prompt for consistent formatting; the rules are shared by the
+# verbose and compact output schemas
+EXTRACTION_RULES = """CRITICAL FORMATTING RULES:
 - dates: ALWAYS use YYYY-MM-DD format (e.g., 2025-01-15)
 - MONEY VALUES: Keep the EXACT format as written on the invoice
   * If invoice shows "59.385" -> use "59.385" (Indonesian format with dots as thousands)
@@ -338,100 +211,590 @@ CRITICAL FORMATTING RULES:
 
 Return ONLY the JSON, no explanations."""
 
-        response = client.chat.completions.create(
-            model=ocr_model,
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": prompt},
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}"
-                            },
-                        },
-                    ],
-                }
-            ],
-            temperature=0.1,
-            max_completion_tokens=2000,
+EXTRACTION_PROMPT = """Extract invoice data from this image and return ONLY a JSON object with this exact structure:
+
+{
+  "shop_name": "name of the shop/store",
+  "invoice_date": "date in YYYY-MM-DD format (e.g., 2024-12-25)",
+  "total_amount": "SINGLE FINAL AMOUNT ONLY - the main total to pay",
+  "transaction_type": "bank|retail|e-commerce (optional, will be auto-determined)",
+  "items": [
+    {
+      "name": "item name",
+      "quantity": 1,
+      "unit_price": "unit price for this item",
+      "total_price": "total price for this item"
+    }
+  ]
+}
+
+""" + EXTRACTION_RULES
+
+# Compact schema: short keys and one positional array per item, so long
+# receipts need far fewer completion tokens (see expand_compact_invoice)
+COMPACT_EXTRACTION_PROMPT = """Extract invoice data from this image and return ONLY a compact JSON object with this exact structure:
+
+{"s":"shop name","d":"YYYY-MM-DD","t":"final total","y":"bank|retail|e-commerce","i":[["item name",1,"unit price","total price"]]}
+
+KEYS: s=shop_name, d=invoice_date, t=total_amount, y=transaction_type (optional), i=items
+- Each item is a positional array: [name, quantity, unit_price, total_price]
+- Write the JSON on a single line without extra spaces
+
+""" + EXTRACTION_RULES
+
+
+def build_extraction_request(
+    base64_image, mime_type, model, output_format="verbose", prompt_note=None, vendor_profile=None
+):
+    """Build the chat completion arguments for an extraction request.
+
+    ``prompt_note`` is appended to the prompt (e.g. the strip position for
+    tiled extraction, see tiling.py). A ``vendor_profile`` (not marked as
+    holdout) replaces the generic prompt with the vendor's specialized one
+    and its smaller completion budget (see vendor_profiles.py).
+    """
+    prompt = COMPACT_EXTRACTION_PROMPT if output_format == "compact" else EXTRACTION_PROMPT
+    max_completion_tokens = 2000
+    if vendor_profile and not vendor_profile.get("holdout"):
+        from .vendor_profiles import vendor_max_tokens, vendor_prompt
+
+        prompt = vendor_prompt(vendor_profile, output_format)
+        max_completion_tokens = vendor_max_tokens(vendor_profile, output_format)
+    if prompt_note:
+        prompt += prompt_note
+    return {
+        "model": model,
+        "messages": [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt},
+                    {
+                        "type": "image_url",
+                        "image_url": {"url": f"data:{mime_type};base64,{base64_image}"},
+                    },
+                ],
+            }
+        ],
+        "temperature": 0.1,
+        "max_completion_tokens": max_completion_tokens,
+    }
+
+
+def expand_compact_invoice(data):
+    """Expand compact short-key output into the verbose invoice layout.
+
+    Raises:
+        ValueError: If the data does not have the compact shape
+    """
+    if not isinstance(data, dict):
+        raise ValueError("compact output is not a JSON object")
+    if "shop_name" in data:
+        return data  # model answered in the verbose schema anyway
+
+    items = []
+    for row in data.get("i") or []:
+        if not isinstance(row, (list, tuple)) or not row:
+            raise ValueError(f"invalid compact item: {row!r}")
+        name, quantity, unit_price, total_price = (list(row) + [None] * 4)[:4]
+        items.append(
+            {
+                "name": name,
+                "quantity": 1 if quantity is None else quantity,
+                "unit_price": unit_price,
+                "total_price": total_price,
+            }
         )
 
-        content = response.choices[0].message.content
-        if content is None:
-            raise ValueError("LLM returned empty response")
+    invoice_data = {
+        "shop_name": data.get("s"),
+        "invoice_date": data.get("d"),
+        "total_amount": data.get("t"),
+        "items": items,
+    }
+    if "y" in data:
+        invoice_data["transaction_type"] = data["y"]
+    return invoice_data
 
-        content = content.strip()
-        print(f"LLM Response: {content[:200]}...")
 
-        # Clean the response
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0].strip()
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0].strip()
+def _strip_code_fence(content):
+    """Return the JSON text from a completion that may wrap it in a code fence."""
+    if "```json" in content:
+        return content.split("```json")[1].split("```")[0].strip()
+    if "```" in content:
+        return content.split("```")[1].split("```")[0].strip()
+    return content
 
-        # Parse JSON
-        try:
-            invoice_data = json.loads(content)
-
-            # Log suspicious values before processing
-            currency_fields = ["total_amount"]
-            for field in currency_fields:
-                if field in invoice_data and invoice_data[field] is not None:
-                    original_value = invoice_data[field]
-                    if isinstance(original_value, str) and "-" in original_value:
-                        parts = [
-                            p for p in original_value.split("-") if p and p.strip()
-                        ]
-                        if len(parts) >= 2 and all(
-                            p.replace(".", "").replace(",", "").isdigit() for p in parts
-                        ):
-                            print(
-                                f"[SUSPICIOUS] LLM returned range format for {field}: '{original_value}'"
-                            )
-                            print(
-                                "[INFO] This suggests LLM misread the invoice. Check image quality or add more specific instructions."
-                            )
-
-            # Convert Indonesian currency formats to float for total_amount
-            if (
-                "total_amount" in invoice_data
-                and invoice_data["total_amount"] is not None
-            ):
-                original_value = invoice_data["total_amount"]
-                parsed_value = parse_indonesian_currency(original_value)
-                invoice_data["total_amount"] = parsed_value
-
-                # Log if parsing returned 0 due to validation
-                if parsed_value == 0.0 and original_value:
-                    print(
-                        f"[VALIDATION] Rejected invalid total_amount value: '{original_value}' -> 0.0"
-                    )
 
-            # Convert item prices
-            if "items" in invoice_data and isinstance(invoice_data["items"], list):
-                for item in invoice_data["items"]:
-                    if "unit_price" in item and item["unit_price"] is not None:
-                        item["unit_price"] = parse_indonesian_currency(
-                            item["unit_price"]
-                        )
-                    if "total_price" in item and item["total_price"] is not None:
-                        item["total_price"] = parse_indonesian_currency(
-                            item["total_price"]
-                        )
+def parse_invoice_response(content, output_format="verbose", allow_missing=False):
+    """Parse the raw LLM completion into a validated invoice dict (or None).
 
-            # Validate with Pydantic
+    With ``allow_missing`` a missing shop name or total does not fail
+    validation; they are left as "" and 0.0 for a follow-up request to fill
+    (see complete_missing_fields(), which still fails the extraction if they
+    cannot be recovered).
+    """
+    content = content.strip()
+    print(f"LLM Response: {content[:200]}...")
+
+    # Clean the response
+    content = _strip_code_fence(content)
+
+    # Parse JSON
+    try:
+        invoice_data = json.loads(content)
+
+        if output_format == "compact":
             try:
-                validated_invoice = RobustInvoice(**invoice_data)
-                return validated_invoice.model_dump()
-            except Exception as e:
-                print(f"[ERROR] Pydantic validation error: {e}")
+                invoice_data = expand_compact_invoice(invoice_data)
+            except ValueError as e:
+                print(f"[ERROR] Could not decode compact output: {e}")
                 return None
-        except json.JSONDecodeError:
-            print("[ERROR] No JSON found in response")
-            print(f"Response content: {content}")
+
+        # Log suspicious values before processing
+        currency_fields = ["total_amount"]
+        for field in currency_fields:
+            if field in invoice_data and invoice_data[field] is not None:
+                original_value = invoice_data[field]
+                if isinstance(original_value, str) and "-" in original_value:
+                    parts = [
+                        p for p in original_value.split("-") if p and p.strip()
+                    ]
+                    if len(parts) >= 2 and all(
+                        p.replace(".", "").replace(",", "").isdigit() for p in parts
+                    ):
+                        print(
+                            f"[SUSPICIOUS] LLM returned range format for {field}: '{original_value}'"
+                        )
+                        print(
+                            "[INFO] This suggests LLM misread the invoice. Check image quality or add more specific instructions."
+                        )
+
+        # Convert Indonesian currency formats to float for total_amount
+        if (
+            "total_amount" in invoice_data
+            and invoice_data["total_amount"] is not None
+        ):
+            original_value = invoice_data["total_amount"]
+            parsed_value = parse_indonesian_currency(original_value)
+            invoice_data["total_amount"] = parsed_value
+
+            # Log if parsing returned 0 due to validation
+            if parsed_value == 0.0 and original_value:
+                print(
+                    f"[VALIDATION] Rejected invalid total_amount value: '{original_value}' -> 0.0"
+                )
+
+        # Convert item prices
+        if "items" in invoice_data and isinstance(invoice_data["items"], list):
+            from .currency import parse_currency_batch
+
+            price_slots = [
+                (item, field)
+                for item in invoice_data["items"]
+                for field in ("unit_price", "total_price")
+                if field in item and item[field] is not None
+            ]
+            parsed_prices = parse_currency_batch(
+                [item[field] for item, field in price_slots]
+            )
+            for (item, field), price in zip(price_slots, parsed_prices):
+                item[field] = price
+
+        if allow_missing:
+            if not invoice_data.get("shop_name"):
+                invoice_data["shop_name"] = ""
+            if invoice_data.get("total_amount") is None:
+                invoice_data["total_amount"] = 0.0
+
+        # Validate with Pydantic
+        try:
+            validated_invoice = RobustInvoice(**invoice_data)
+            return validated_invoice.model_dump()
+        except Exception as e:
+            print(f"[ERROR] Pydantic validation error: {e}")
             return None
+    except json.JSONDecodeError:
+        print("[ERROR] No JSON found in response")
+        print(f"Response content: {content}")
+        return None
+
+
+# Fields that can be re-read with a short follow-up request, and how they are
+# described to the model
+FOLLOW_UP_FIELDS = {
+    "shop_name": '"shop_name": "name of the shop/store"',
+    "invoice_date": '"invoice_date": "date in YYYY-MM-DD format (e.g., 2024-12-25)"',
+    "total_amount": '"total_amount": "SINGLE FINAL AMOUNT ONLY - the main total to pay"',
+}
+
+FOLLOW_UP_PROMPT = """Look at this invoice image again and return ONLY a JSON object with these fields:
+
+{{
+  {fields}
+}}
+
+- dates: YYYY-MM-DD format
+- money values: keep the EXACT format as written on the invoice, a single value, never a range
+- use null if the field is really not on the invoice
+
+Return ONLY the JSON, no explanations."""
+
+
+def follow_up_enabled():
+    """Whether missing/invalid fields are re-read with a follow-up request."""
+    return os.environ.get("OCR_FOLLOW_UP_ENABLED", "true").lower() == "true"
+
+
+def follow_up_date_enabled():
+    """Whether a missing date alone is worth a follow-up request."""
+    return os.environ.get("OCR_FOLLOW_UP_DATE", "false").lower() == "true"
+
+
+def missing_fields(invoice_data):
+    """Return the FOLLOW_UP_FIELDS that are missing or were rejected as invalid.
+
+    Many receipts have no printed date, so a missing date is only re-read
+    together with another field unless OCR_FOLLOW_UP_DATE is set.
+    """
+    shop_missing = not invoice_data.get("shop_name")
+    # Absent, or rejected by the currency parser
+    total_missing = not invoice_data.get("total_amount")
+    date_missing = not invoice_data.get("invoice_date") and (
+        shop_missing or total_missing or follow_up_date_enabled()
+    )
+    return [
+        field
+        for field, missing in (
+            ("shop_name", shop_missing),
+            ("invoice_date", date_missing),
+            ("total_amount", total_missing),
+        )
+        if missing
+    ]
+
+
+def build_follow_up_request(base64_image, mime_type, model, fields):
+    """Build a short completion request that asks only for ``fields``."""
+    prompt = FOLLOW_UP_PROMPT.format(fields=",\n  ".join(FOLLOW_UP_FIELDS[f] for f in fields))
+    return {
+        "model": model,
+        "messages": [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt},
+                    {
+                        "type": "image_url",
+                        "image_url": {"url": f"data:{mime_type};base64,{base64_image}"},
+                    },
+                ],
+            }
+        ],
+        "temperature": 0.1,
+        "max_completion_tokens": int(os.environ.get("OCR_FOLLOW_UP_MAX_TOKENS", "150")),
+    }
+
+
+def merge_follow_up(invoice_data, content, fields):
+    """Merge a follow-up answer for ``fields`` into a validated extraction.
+
+    Returns:
+        The validated merged invoice dict, or None if the shop name or the
+        total is still missing
+    """
+    try:
+        answer = json.loads(_strip_code_fence(content.strip()))
+    except json.JSONDecodeError:
+        answer = {}
+    if not isinstance(answer, dict):
+        answer = {}
+
+    merged = dict(invoice_data)
+    recovered = []
+    shop_name = answer.get("shop_name")
+    if "shop_name" in fields and isinstance(shop_name, str) and shop_name.strip():
+        merged["shop_name"] = shop_name.strip()
+        # The type was auto-detected from the empty name; detect it again
+        merged["transaction_type"] = None
+        recovered.append("shop_name")
+    if "invoice_date" in fields and answer.get("invoice_date"):
+        merged["invoice_date"] = str(answer["invoice_date"])
+        recovered.append("invoice_date")
+    if "total_amount" in fields and answer.get("total_amount") is not None:
+        total_amount = parse_indonesian_currency(answer["total_amount"])
+        if total_amount > 0:
+            merged["total_amount"] = total_amount
+            recovered.append("total_amount")
+
+    if recovered:
+        print(f"   [FOLLOW-UP] Recovered {', '.join(recovered)}")
+    if not merged["shop_name"]:
+        print("[ERROR] Shop name missing after follow-up request")
+        return None
+    if not merged["total_amount"]:
+        # Never save a placeholder 0 as if it were the receipt's total
+        print("[ERROR] Total amount missing after follow-up request")
+        return None
+    return RobustInvoice(**merged).model_dump()
+
+
+def complete_missing_fields(invoice_data, base64_image, mime_type, model, responses=None):
+    """Re-read missing or invalid fields with one short follow-up request.
+
+    The answer is appended to ``responses`` (if given) for the archive.
+
+    Returns:
+        The merged invoice dict, or None if the shop name or the total could
+        not be read at all
+    """
+    from .llm_gateway import chat_completion
+
+    fields = missing_fields(invoice_data)
+    if not fields:
+        return invoice_data
+    print(f"   [FOLLOW-UP] Re-reading {', '.join(fields)}")
+    try:
+        response = chat_completion(**build_follow_up_request(base64_image, mime_type, model, fields))
+        content = response.choices[0].message.content or ""
+    except Exception as e:
+        print(f"[WARNING] Follow-up request failed: {e}")
+        content = ""
+    if responses is not None:
+        responses.append({"role": "follow_up", "fields": fields, "content": content})
+    return merge_follow_up(invoice_data, content, fields)
+
+
+async def async_complete_missing_fields(
+    invoice_data, base64_image, mime_type, model, responses=None
+):
+    """Async counterpart of complete_missing_fields."""
+    from .llm_gateway import async_chat_completion
+
+    fields = missing_fields(invoice_data)
+    if not fields:
+        return invoice_data
+    print(f"   [FOLLOW-UP] Re-reading {', '.join(fields)}")
+    try:
+        response = await async_chat_completion(
+            **build_follow_up_request(base64_image, mime_type, model, fields)
+        )
+        content = response.choices[0].message.content or ""
+    except Exception as e:
+        print(f"[WARNING] Follow-up request failed: {e}")
+        content = ""
+    if responses is not None:
+        responses.append({"role": "follow_up", "fields": fields, "content": content})
+    return merge_follow_up(invoice_data, content, fields)
+
+
+def _extraction_response(output_format, content, vendor_profile=None):
+    """Archive entry for an extraction answer (noting a vendor-specialized prompt)."""
+    response = {"role": "extraction", "output_format": output_format, "content": content}
+    if vendor_profile and not vendor_profile.get("holdout"):
+        response["vendor"] = vendor_profile["vendor"]
+    return response
+
+
+def _record_vendor_request(vendor_profile, elapsed, invoice_data):
+    """Time the first request of an identified vendor's receipt.
+
+    Returns:
+        True if the request used the vendor's specialized prompt
+    """
+    if not vendor_profile:
+        return False
+    from .vendor_profiles import record_vendor_extraction
+
+    specialized = not vendor_profile.get("holdout")
+    record_vendor_extraction(
+        "specialized" if specialized else "holdout", elapsed, invoice_data is not None
+    )
+    return specialized
+
+
+def _attach_responses(invoice_data, model, follow_up, responses, latency):
+    """Attach the raw completions to a result under "_llm" for the response archive."""
+    if invoice_data:
+        invoice_data["_llm"] = {
+            "model": model,
+            "prompt_version": get_prompt_version(),
+            "latency": round(latency, 3),
+            "follow_up": follow_up,
+            "responses": responses,
+        }
+    return invoice_data
+
+
+# Top-level keys reported while a completion is still streaming
+PARTIAL_FIELDS = {
+    "verbose": {
+        "shop_name": "shop_name",
+        "invoice_date": "invoice_date",
+        "total_amount": "total_amount",
+        "items": "items",
+    },
+    "compact": {"s": "shop_name", "d": "invoice_date", "t": "total_amount", "i": "items"},
+}
+
+
+def partial_invoice(parser, output_format="verbose"):
+    """Build a progress snapshot (shop, date, total, items so far) from a stream parser."""
+    partial = {}
+    for key, field in PARTIAL_FIELDS[output_format].items():
+        if field == "items":
+            if key in parser.element_counts:
+                partial["items_so_far"] = parser.element_counts[key]
+        elif key in parser.fields and parser.fields[key] is not None:
+            partial[field] = parser.fields[key]
+    if "total_amount" in partial:
+        partial["total_amount"] = parse_indonesian_currency(partial["total_amount"])
+    return partial
+
+
+def _chunk_text(chunk):
+    if not chunk.choices:
+        return ""
+    return chunk.choices[0].delta.content or ""
+
+
+def _collect_stream(stream, output_format, on_partial):
+    """Join a streamed completion, reporting partial fields as they complete."""
+    from .stream_parser import IncrementalJSONParser
+
+    parser = IncrementalJSONParser()
+    parts = []
+    for chunk in stream:
+        text = _chunk_text(chunk)
+        parts.append(text)
+        if parser.feed(text) and on_partial is not None:
+            on_partial(partial_invoice(parser, output_format))
+    return "".join(parts)
+
+
+async def _async_collect_stream(stream, output_format, on_partial):
+    """Async counterpart of _collect_stream; on_partial may be a coroutine function."""
+    from .stream_parser import IncrementalJSONParser
+
+    parser = IncrementalJSONParser()
+    parts = []
+    async for chunk in stream:
+        text = _chunk_text(chunk)
+        parts.append(text)
+        if parser.feed(text) and on_partial is not None:
+            result = on_partial(partial_invoice(parser, output_format))
+            if inspect.isawaitable(result):
+                await result
+    return "".join(parts)
+
+
+def process_invoice_with_llm(
+    image,
+    base64_image=None,
+    mime_type="image/jpeg",
+    stream=False,
+    on_partial=None,
+    model=None,
+    prompt_note=None,
+    follow_up=True,
+    vendor_profile=None,
+    allow_missing=None,
+):
+    """Process invoice using Groq LLM with enhanced prompting.
+
+    ``image`` may be a file path, raw bytes or a readable buffer.
+    ``base64_image``/``mime_type`` let callers that already prepared the
+    image (e.g. the bulk pipeline) skip reading and encoding it again.
+    With ``stream=True`` the completion is streamed and ``on_partial`` is
+    called with shop name, date, total and item count as they arrive.
+    ``model`` overrides OCR_MODEL; when it is not given and OCR_ROUTING_ENABLED
+    is set, the model router picks it (fast model first, see model_router).
+    ``prompt_note`` is appended to the extraction prompt. With ``follow_up``
+    (and OCR_FOLLOW_UP_ENABLED), a missing or invalid shop name or total
+    (plus the date, see missing_fields()) is re-read with a short follow-up
+    request instead of failing.
+    ``vendor_profile`` (from select_vendor_profile()) switches to the
+    vendor's specialized prompt, falling back to the generic one if its
+    answer does not parse. ``allow_missing`` lets a missing shop name or
+    total pass validation without a follow-up (used for the strips of a
+    long receipt); it defaults to whether follow-up is on.
+    """
+
+    # Get API key
+    groq_api_key = os.environ.get("GROQ_API_KEY")
+    if not groq_api_key:
+        print("Please set the GROQ_API_KEY environment variable")
+        return None
+
+    from .llm_gateway import chat_completion
+    from .model_router import route_extraction, routing_enabled
+
+    if model is None and routing_enabled():
+        return route_extraction(
+            process_invoice_with_llm,
+            image,
+            base64_image=base64_image,
+            mime_type=mime_type,
+            stream=stream,
+            on_partial=on_partial,
+            prompt_note=prompt_note,
+            follow_up=follow_up,
+            vendor_profile=vendor_profile,
+            allow_missing=allow_missing,
+        )
+
+    ocr_model = model or get_ocr_model()
+    output_format = get_output_format()
+    follow_up = follow_up and follow_up_enabled()
+    if allow_missing is None:
+        allow_missing = follow_up
+
+    try:
+        started = time.perf_counter()
+        # Encode image
+        if base64_image is None:
+            base64_image, mime_type = prepare_image(read_image_bytes(image))
+
+        request = build_extraction_request(
+            base64_image, mime_type, ocr_model, output_format, prompt_note, vendor_profile
+        )
+        request_started = time.perf_counter()
+        if stream:
+            content = _collect_stream(
+                chat_completion(**request, stream=True), output_format, on_partial
+            )
+        else:
+            content = chat_completion(**request).choices[0].message.content
+        if not content:
+            raise ValueError("LLM returned empty response")
+
+        responses = [_extraction_response(output_format, content, vendor_profile)]
+        invoice_data = parse_invoice_response(content, output_format, allow_missing=allow_missing)
+        specialized = _record_vendor_request(
+            vendor_profile, time.perf_counter() - request_started, invoice_data
+        )
+        if invoice_data is None and (output_format == "compact" or specialized):
+            failed = "Vendor prompt" if specialized else "Compact output"
+            print(f"[WARNING] {failed} failed - retrying with the generic verbose format")
+            response = chat_completion(
+                **build_extraction_request(
+                    base64_image, mime_type, ocr_model, prompt_note=prompt_note
+                )
+            )
+            content = response.choices[0].message.content
+            if content is None:
+                raise ValueError("LLM returned empty response")
+            responses.append({"role": "extraction", "output_format": "verbose", "content": content})
+            invoice_data = parse_invoice_response(content, allow_missing=allow_missing)
+
+        if invoice_data and follow_up:
+            invoice_data = complete_missing_fields(
+                invoice_data, base64_image, mime_type, ocr_model, responses
+            )
+
+        return _attach_responses(
+            invoice_data, ocr_model, follow_up, responses, time.perf_counter() - started
+        )
 
     except Exception as e:
         print(f"[ERROR] Error calling LLM: {e}")
@@ -442,9 +805,10 @@ def create_tables():
     """Create database tables if they don't exist."""
     # Import the centralized database path function
     from .database import get_default_db_path
+    from .db_config import connect_sqlite
 
     db_path = get_default_db_path()
-    conn = sqlite3.connect(db_path)
+    conn = connect_sqlite(db_path)
     cursor = conn.cursor()
 
     # Create simplified invoices table
@@ -477,56 +841,92 @@ def create_tables():
     """
     )
 
+    # Raw LLM responses for offline re-parsing (see response_archive.py)
+    from .response_archive import ARCHIVE_TABLE_SQL
+
+    cursor.execute(ARCHIVE_TABLE_SQL)
+
+    # Per-vendor extraction profiles (see vendor_profiles.py)
+    from .vendor_profiles import PROFILE_TABLE_SQL
+
+    cursor.execute(PROFILE_TABLE_SQL)
+
     conn.commit()
     conn.close()
 
 
-def save_to_database_robust(invoice_data, image_path):
-    """Save invoice data to database with robust error handling."""
-    try:
-        create_tables()
-        # Import the centralized database path function
-        from .database import get_default_db_path
+def _insert_invoice(cursor, invoice_data, image_path):
+    """Insert one invoice and its items using an open cursor."""
+    cursor.execute(
+        """
+        INSERT INTO invoices (
+            shop_name, invoice_date, total_amount, transaction_type, image_path
+        ) VALUES (?, ?, ?, ?, ?)
+    """,
+        (
+            invoice_data.get("shop_name"),
+            invoice_data.get("invoice_date"),
+            invoice_data.get("total_amount", 0),
+            invoice_data.get("transaction_type"),
+            image_path,
+        ),
+    )
 
-        db_path = get_default_db_path()
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+    invoice_id = cursor.lastrowid
+    insert_invoice_items(cursor, invoice_id, invoice_data.get("items", []))
+
+    if invoice_data.get("_llm"):
+        from .response_archive import archive_enabled, archive_response
+
+        if archive_enabled():
+            archive_response(cursor, invoice_id, invoice_data["_llm"])
 
-        # Insert simplified invoice
+        from .vendor_profiles import update_vendor_profile, vendor_prompts_enabled
+
+        if vendor_prompts_enabled():
+            update_vendor_profile(cursor, invoice_data)
+
+    return invoice_id
+
+
+def insert_invoice_items(cursor, invoice_id, items):
+    """Insert the item rows of one invoice using an open cursor."""
+    for item in items:
         cursor.execute(
             """
-            INSERT INTO invoices (
-                shop_name, invoice_date, total_amount, transaction_type, image_path
-            ) VALUES (?, ?, ?, ?, ?)
+            INSERT INTO invoice_items (invoice_id, item_name, quantity, unit_price, total_price)
+            VALUES (?, ?, ?, ?, ?)
         """,
             (
-                invoice_data.get("shop_name"),
-                invoice_data.get("invoice_date"),
-                invoice_data.get("total_amount", 0),
-                invoice_data.get("transaction_type"),
-                image_path,
+                invoice_id,
+                item.get("name"),
+                item.get("quantity", 1),
+                item.get("unit_price"),
+                item.get("total_price", 0),
             ),
         )
 
-        invoice_id = cursor.lastrowid
-
-        # Insert items
-        items = invoice_data.get("items", [])
-        for item in items:
-            cursor.execute(
-                """
-                INSERT INTO invoice_items (invoice_id, item_name, quantity, unit_price, total_price)
-                VALUES (?, ?, ?, ?, ?)
-            """,
-                (
-                    invoice_id,
-                    item.get("name"),
-                    item.get("quantity", 1),
-                    item.get("unit_price"),
-                    item.get("total_price", 0),
-                ),
-            )
 
+def save_to_database_robust(invoice_data, image_path, content_hash=None):
+    """Save invoice data to database with robust error handling.
+
+    When ``content_hash`` is given the image is also marked done in the
+    ingestion checkpoint manifest, in the same transaction.
+    """
+    try:
+        create_tables()
+        # Import the centralized database path function
+        from .database import get_default_db_path
+        from .db_config import connect_sqlite
+
+        db_path = get_default_db_path()
+        conn = connect_sqlite(db_path)
+        cursor = conn.cursor()
+        invoice_id = _insert_invoice(cursor, invoice_data, image_path)
+        if content_hash:
+            from .checkpoint import mark_done
+
+            mark_done(cursor, image_path, content_hash, invoice_id)
         conn.commit()
         conn.close()
         return invoice_id
@@ -536,17 +936,269 @@ def save_to_database_robust(invoice_data, image_path):
         return None
 
 
-def process_invoice(image_path):
-    """Process a single invoice image."""
-    print(f"\nProcessing: {os.path.basename(image_path)}")
+def save_many_to_database(records, content_hashes=None):
+    """Save a batch of (invoice_data, image_path) pairs in one transaction.
+
+    ``content_hashes`` (aligned with ``records``) marks each image done in
+    the ingestion checkpoint manifest as part of the same transaction.
+
+    Returns the list of new invoice IDs in the same order, or None for the
+    whole batch if the transaction had to be rolled back.
+    """
+    if not records:
+        return []
+
+    try:
+        create_tables()
+        from .database import get_default_db_path
+        from .db_config import connect_sqlite
+
+        conn = connect_sqlite(get_default_db_path())
+        try:
+            cursor = conn.cursor()
+            invoice_ids = [
+                _insert_invoice(cursor, invoice_data, image_path)
+                for invoice_data, image_path in records
+            ]
+            if content_hashes:
+                from .checkpoint import mark_done
+
+                for (_, image_path), content_hash, invoice_id in zip(
+                    records, content_hashes, invoice_ids
+                ):
+                    mark_done(cursor, image_path, content_hash, invoice_id)
+            conn.commit()
+            return invoice_ids
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    except Exception as e:
+        print(f"[ERROR] Database batch error: {e}")
+        return None
+
+
+def read_image_bytes(image):
+    """Return the raw bytes of an image given as a path, bytes or a readable buffer."""
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return bytes(image)
+    if hasattr(image, "read"):
+        if hasattr(image, "seek"):
+            image.seek(0)
+        return image.read()
+    with open(image, "rb") as image_file:
+        return image_file.read()
+
 
-    if not os.path.exists(image_path):
-        print(f"[ERROR] File not found: {image_path}")
+def describe_image(image):
+    """Short label for log messages: the file name, or the size of an in-memory image."""
+    if isinstance(image, (str, os.PathLike)):
+        return os.path.basename(image)
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return f"in-memory image ({len(image):,} bytes)"
+    return "in-memory image"
+
+
+def archive_image(image_bytes, extension="jpg"):
+    """Write image bytes to the content-addressed archive, if one is configured.
+
+    The archive lives in INVOICE_ARCHIVE_DIR as ``<sha256[:2]>/<sha256>.<ext>``,
+    so re-sent photos are only stored once.
+
+    Returns:
+        The archived file path, or None when archiving is disabled or fails
+    """
+    archive_dir = os.environ.get("INVOICE_ARCHIVE_DIR")
+    if not archive_dir:
         return None
 
-    # Process with LLM
-    invoice_data = process_invoice_with_llm(image_path)
+    from .ocr_cache import hash_image_bytes
 
+    image_hash = hash_image_bytes(image_bytes)
+    target_dir = os.path.join(archive_dir, image_hash[:2])
+    target_path = os.path.join(target_dir, f"{image_hash}.{extension}")
+
+    try:
+        if not os.path.exists(target_path):
+            os.makedirs(target_dir, exist_ok=True)
+            tmp_path = f"{target_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as archive_file:
+                archive_file.write(image_bytes)
+            os.replace(tmp_path, target_path)
+        return target_path
+    except OSError as e:
+        print(f"[WARNING] Could not archive image: {e}")
+        return None
+
+
+def _cached_extraction(image_bytes):
+    """Return (cache_key, cached invoice or None) for raw image bytes."""
+    from .ocr_cache import get_cached_invoice, hash_image_bytes
+
+    cache_key = (hash_image_bytes(image_bytes), get_cache_model(), get_cache_version())
+    invoice_data = get_cached_invoice(*cache_key)
+    if invoice_data:
+        print("   [CACHE] Reusing previous extraction for identical image")
+        invoice_data = validate_cached_invoice(invoice_data)
+    return cache_key, invoice_data
+
+
+def validate_cached_invoice(invoice_data):
+    """Re-validate a cached extraction, keeping its archived raw responses."""
+    validated = RobustInvoice(**invoice_data).model_dump()
+    if "_llm" in invoice_data:
+        validated["_llm"] = invoice_data["_llm"]
+    return validated
+
+
+def qris_fast_path(image_bytes):
+    """Read the receipt's QRIS code.
+
+    Returns:
+        (validated invoice or None, vendor profile or None) - a static QRIS
+        carries no amount but still names the merchant, whose profile (see
+        vendor_profiles.py) selects a specialized prompt for the LLM call
+    """
+    from .qris import qris_enabled, scan_qris
+
+    if not qris_enabled():
+        return None, None
+    invoice_data, merchant = scan_qris(image_bytes)
+    if invoice_data:
+        print("   [QRIS] Merchant and amount read from the QR code - skipping the LLM")
+        return RobustInvoice(**invoice_data).model_dump(), None
+    if not merchant:
+        return None, None
+
+    from .vendor_profiles import select_vendor_profile
+
+    try:
+        vendor_profile = select_vendor_profile(merchant)
+    except Exception as e:
+        print(f"[WARNING] Vendor profile lookup failed: {e}")
+        return None, None
+    if vendor_profile:
+        mode = "generic prompt (holdout)" if vendor_profile["holdout"] else "specialized prompt"
+        print(f"   [VENDOR] {vendor_profile['shop_name']} identified from the QR code - {mode}")
+    return None, vendor_profile
+
+
+def _tile_model():
+    """Model for strips: the router would escalate every strip without a total."""
+    from .model_router import get_route, routing_enabled
+
+    return get_route()[-1] if routing_enabled() else get_ocr_model()
+
+
+def _merge_tiles(results, model, latency):
+    """Merge strip extractions; None unless the shop name and total were read."""
+    from .tiling import merge_tile_invoices, record_tile_merge
+
+    failed = sum(1 for result in results if not result)
+    if failed:
+        print(f"[WARNING] {failed} of {len(results)} strips failed - their items are missing")
+
+    merged = merge_tile_invoices(results)
+    if merged is None or not merged["shop_name"] or not merged["total_amount"]:
+        if merged is not None:
+            missing = "shop name" if not merged["shop_name"] else "total"
+            print(f"[ERROR] No strip contained the {missing} - receipt not saved")
+        record_tile_merge(len(results), failed, merged=False)
+        return None
+    record_tile_merge(len(results), failed, merged=True)
+
+    invoice_data = RobustInvoice(**merged).model_dump()
+    invoice_data["_llm"] = {
+        "model": model,
+        "prompt_version": get_prompt_version(),
+        "latency": round(latency, 3),
+        "tiles": [result.get("_llm") if result else None for result in results],
+        "failed_tiles": failed,
+    }
+    return invoice_data
+
+
+def process_tiles_with_llm(tiles):
+    """Extract the strips of a long receipt concurrently and merge them.
+
+    Args:
+        tiles: List of (base64, mime_type) from prepare_image_tiles()
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    from .tiling import tile_prompt_note
+
+    model = _tile_model()
+    started = time.perf_counter()
+
+    def extract(index):
+        base64_image, mime_type = tiles[index]
+        return process_invoice_with_llm(
+            None,
+            base64_image=base64_image,
+            mime_type=mime_type,
+            model=model,
+            prompt_note=tile_prompt_note(index + 1, len(tiles)),
+            follow_up=False,
+            allow_missing=True,
+        )
+
+    with ThreadPoolExecutor(max_workers=len(tiles)) as executor:
+        results = list(executor.map(extract, range(len(tiles))))
+    return _merge_tiles(results, model, time.perf_counter() - started)
+
+
+async def async_process_tiles_with_llm(tiles):
+    """Async counterpart of process_tiles_with_llm."""
+    from .tiling import tile_prompt_note
+
+    model = _tile_model()
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(
+            async_process_invoice_with_llm(
+                None,
+                base64_image=base64_image,
+                mime_type=mime_type,
+                model=model,
+                prompt_note=tile_prompt_note(index, len(tiles)),
+                follow_up=False,
+                allow_missing=True,
+            )
+            for index, (base64_image, mime_type) in enumerate(tiles, 1)
+        )
+    )
+    return _merge_tiles(results, model, time.perf_counter() - started)
+
+
+def quality_gate(image_bytes):
+    """Run the local image quality check.
+
+    Returns:
+        List of rejection reasons (empty when the photo is usable or the gate
+        is disabled)
+    """
+    from .image_quality import check_image_quality
+
+    try:
+        quality = check_image_quality(image_bytes)
+    except Exception as e:
+        print(f"[WARNING] Image quality check failed: {e}")
+        return []
+    if quality is None or quality["ok"]:
+        return []
+    print(
+        f"   [QUALITY] Rejected ({', '.join(quality['reasons'])}): "
+        f"sharpness {quality['sharpness']:.0f}, brightness {quality['brightness']:.0f}, "
+        f"{quality['width']}x{quality['height']} - skipping the LLM"
+    )
+    return quality["reasons"]
+
+
+def _report_extraction(invoice_data):
+    """Log the outcome of an extraction and return the data (or None)."""
     if invoice_data:
         print(
             f"   [SUCCESS] Extracted: {invoice_data.get('shop_name', 'Unknown')} - Rp {invoice_data.get('total_amount', 0):,.2f}"
@@ -557,93 +1209,211 @@ def process_invoice(image_path):
         return None
 
 
-def main():
-    """Main function to process invoices."""
+def process_invoice(image, check_quality=True):
+    """Process a single invoice image.
 
-    print("INVOICE PROCESSOR")
-    print("=" * 50)
-    print("Processing invoice images with robust date/time formatting...")
+    Args:
+        image: File path, raw image bytes, or a readable buffer (e.g. BytesIO)
+        check_quality: Reject blurry, dark or tiny photos before the LLM call
+    """
+    print(f"\nProcessing: {describe_image(image)}")
 
-    # Check for API key
-    if not os.environ.get("GROQ_API_KEY"):
-        print("[ERROR] GROQ_API_KEY not found in environment variables")
-        print("Please set up your .env file with GROQ_API_KEY=your_key_here")
-        return
+    if isinstance(image, (str, os.PathLike)) and not os.path.exists(image):
+        print(f"[ERROR] File not found: {image}")
+        return None
 
-    # Get image paths - check multiple locations
-    print(f"Current working directory: {os.getcwd()}")
+    from .ocr_cache import store_invoice
 
-    # Try invoices subdirectory first
-    image_paths = []
-    image_dir = "invoices"
-    print(f"Looking for images in: {image_dir}")
+    image_bytes = read_image_bytes(image)
 
-    if os.path.exists(image_dir):
-        image_paths = [
-            os.path.join(image_dir, f)
-            for f in os.listdir(image_dir)
-            if f.lower().endswith((".jpg", ".jpeg", ".png"))
-        ]
-        print(f"Found in invoices/: {image_paths}")
+    # Check the OCR cache and the receipt's QR code before paying for
+    # encoding and an LLM call
+    cache_key, invoice_data = _cached_extraction(image_bytes)
+    vendor_profile = None
+    if not invoice_data:
+        invoice_data, vendor_profile = qris_fast_path(image_bytes)
 
-    # If no images in invoices/, check root directory
-    if not image_paths:
-        root_images = [
-            f for f in os.listdir(".") if f.lower().endswith((".jpg", ".jpeg", ".png"))
-        ]
-        if root_images:
-            image_paths = root_images
-            print(f"Found in root: {image_paths}")
+    if not invoice_data and check_quality and quality_gate(image_bytes):
+        return None
 
-    # If still no images, check parent directory
-    if not image_paths:
-        try:
-            parent_images = [
-                f
-                for f in os.listdir("..")
-                if f.lower().endswith((".jpg", ".jpeg", ".png"))
-            ]
-            if parent_images:
-                image_paths = [os.path.join("..", f) for f in parent_images]
-                print(f"Found in parent: {image_paths}")
-        except Exception:
-            pass
-
-    if not image_paths:
-        print("[ERROR] No image files found!")
-        print("Checked: invoices/, current directory, and parent directory")
-        return
-
-    print(f"Found {len(image_paths)} images to process")
-
-    # Process each image
-    successful_count = 0
-    total_amount = 0
-
-    for image_path in image_paths:
-        invoice_data = process_invoice(image_path)
-        if invoice_data:
-            invoice_id = save_to_database_robust(invoice_data, image_path)
-            if invoice_id:
-                print(f"   [SUCCESS] Saved to database with ID: {invoice_id}")
-                total_amount += invoice_data.get("total_amount", 0)
-                successful_count += 1
-            else:
-                print("   [ERROR] Failed to save to database")
+    if not invoice_data:
+        # Process with LLM
+        tiles = prepare_image_tiles(image_bytes)
+        if len(tiles) > 1:
+            invoice_data = process_tiles_with_llm(tiles)
         else:
-            print(f"[ERROR] Failed to extract data from {os.path.basename(image_path)}")
+            base64_image, mime_type = tiles[0]
+            invoice_data = process_invoice_with_llm(
+                image_bytes,
+                base64_image=base64_image,
+                mime_type=mime_type,
+                vendor_profile=vendor_profile,
+            )
+        store_invoice(*cache_key, invoice_data)
+
+    return _report_extraction(invoice_data)
+
+
+async def async_process_invoice_with_llm(
+    image,
+    base64_image=None,
+    mime_type="image/jpeg",
+    stream=False,
+    on_partial=None,
+    model=None,
+    prompt_note=None,
+    follow_up=True,
+    vendor_profile=None,
+    allow_missing=None,
+):
+    """Async counterpart of process_invoice_with_llm built on AsyncGroq.
+
+    Reading and preprocessing run in worker threads, so the event loop stays
+    free while many extractions are in flight. Cancelling the awaiting task
+    aborts the HTTP request. ``on_partial`` (used with ``stream=True``) may
+    be a plain function or a coroutine function.
+    """
+    groq_api_key = os.environ.get("GROQ_API_KEY")
+    if not groq_api_key:
+        print("Please set the GROQ_API_KEY environment variable")
+        return None
+
+    from .llm_gateway import async_chat_completion
+    from .model_router import async_route_extraction, routing_enabled
+
+    if model is None and routing_enabled():
+        return await async_route_extraction(
+            async_process_invoice_with_llm,
+            image,
+            base64_image=base64_image,
+            mime_type=mime_type,
+            stream=stream,
+            on_partial=on_partial,
+            prompt_note=prompt_note,
+            follow_up=follow_up,
+            vendor_profile=vendor_profile,
+            allow_missing=allow_missing,
+        )
+
+    ocr_model = model or get_ocr_model()
+    output_format = get_output_format()
+    follow_up = follow_up and follow_up_enabled()
+    if allow_missing is None:
+        allow_missing = follow_up
+
+    try:
+        started = time.perf_counter()
+        if base64_image is None:
+            image_bytes = await asyncio.to_thread(read_image_bytes, image)
+            base64_image, mime_type = await asyncio.to_thread(prepare_image, image_bytes)
+
+        request = build_extraction_request(
+            base64_image, mime_type, ocr_model, output_format, prompt_note, vendor_profile
+        )
+        request_started = time.perf_counter()
+        if stream:
+            content = await _async_collect_stream(
+                await async_chat_completion(**request, stream=True), output_format, on_partial
+            )
+        else:
+            content = (await async_chat_completion(**request)).choices[0].message.content
+        if not content:
+            raise ValueError("LLM returned empty response")
+
+        responses = [_extraction_response(output_format, content, vendor_profile)]
+        invoice_data = parse_invoice_response(content, output_format, allow_missing=allow_missing)
+        specialized = _record_vendor_request(
+            vendor_profile, time.perf_counter() - request_started, invoice_data
+        )
+        if invoice_data is None and (output_format == "compact" or specialized):
+            failed = "Vendor prompt" if specialized else "Compact output"
+            print(f"[WARNING] {failed} failed - retrying with the generic verbose format")
+            response = await async_chat_completion(
+                **build_extraction_request(
+                    base64_image, mime_type, ocr_model, prompt_note=prompt_note
+                )
+            )
+            content = response.choices[0].message.content
+            if content is None:
+                raise ValueError("LLM returned empty response")
+            responses.append({"role": "extraction", "output_format": "verbose", "content": content})
+            invoice_data = parse_invoice_response(content, allow_missing=allow_missing)
+
+        if invoice_data and follow_up:
+            invoice_data = await async_complete_missing_fields(
+                invoice_data, base64_image, mime_type, ocr_model, responses
+            )
 
-    print("\nPROCESSING COMPLETE!")
-    print(f"Processed {successful_count}/{len(image_paths)} invoices successfully")
-    print(f"Total amount: Rp {total_amount:,.2f}")
-    print("All dates standardized to YYYY-MM-DD format")
-    print("All times standardized to HH:MM format")
+        return _attach_responses(
+            invoice_data, ocr_model, follow_up, responses, time.perf_counter() - started
+        )
 
-    if successful_count > 0:
-        print("\nView results: python view_database.py")
+    except Exception as e:
+        print(f"[ERROR] Error calling LLM: {e}")
+        return None
+
+
+async def async_process_invoice(image, timeout=None, on_partial=None, check_quality=True):
+    """Async counterpart of process_invoice.
+
+    Args:
+        image: File path, raw image bytes, or a readable buffer
+        timeout: Optional seconds after which the extraction is cancelled
+        on_partial: Optional callback; when given the completion is streamed
+            and it receives partial results (see partial_invoice())
+        check_quality: Reject blurry, dark or tiny photos before the LLM call
+
+    Returns:
+        Invoice dict, or None on failure or timeout
+    """
+    print(f"\nProcessing: {describe_image(image)}")
+
+    if isinstance(image, (str, os.PathLike)) and not os.path.exists(image):
+        print(f"[ERROR] File not found: {image}")
+        return None
+
+    from .ocr_cache import store_invoice
+
+    try:
+        async with asyncio.timeout(timeout):
+            image_bytes = await asyncio.to_thread(read_image_bytes, image)
+            cache_key, invoice_data = await asyncio.to_thread(_cached_extraction, image_bytes)
+            vendor_profile = None
+            if not invoice_data:
+                invoice_data, vendor_profile = await asyncio.to_thread(
+                    qris_fast_path, image_bytes
+                )
+
+            if not invoice_data and check_quality:
+                if await asyncio.to_thread(quality_gate, image_bytes):
+                    return None
+
+            if not invoice_data:
+                tiles = await asyncio.to_thread(prepare_image_tiles, image_bytes)
+                if len(tiles) > 1:
+                    invoice_data = await async_process_tiles_with_llm(tiles)
+                else:
+                    base64_image, mime_type = tiles[0]
+                    invoice_data = await async_process_invoice_with_llm(
+                        image_bytes,
+                        base64_image=base64_image,
+                        mime_type=mime_type,
+                        stream=on_partial is not None,
+                        on_partial=on_partial,
+                        vendor_profile=vendor_profile,
+                    )
+                await asyncio.to_thread(store_invoice, *cache_key, invoice_data)
+    except TimeoutError:
+        print(f"   [ERROR] Extraction timed out after {timeout}s")
+        return None
+
+    return _report_extraction(invoice_data)
 
 
 if __name__ == "__main__":
-    print("Starting invoice processor...")
+    # Kept for "python -m src.processor": the CLI in src.cli works on the
+    # imported src.processor module, so nothing defined in this __main__
+    # copy is used
+    from src.cli import main
+
     main()
-    print("Processor finished.")
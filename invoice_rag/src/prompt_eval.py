@@ -0,0 +1,262 @@
+"""
+Prompt Evaluation - measure extraction prompts and models on a labeled corpus
+
+Runs every receipt of a labeled corpus through each prompt variant x model
+and reports prompt/completion tokens, latency percentiles and per-field
+accuracy (total, date, item count), so prompt changes can be justified by
+numbers instead of impressions.
+
+Corpus layout: a folder of receipt images plus labels.json:
+
+    {"indomaret_01.jpg": {"total_amount": 59385, "invoice_date": "2025-01-15", "item_count": 4}}
+
+Completions come from one of two backends:
+- openai_backend(): any OpenAI-compatible /chat/completions endpoint (a
+  local stand-in server, or Groq's https://api.groq.com/openai/v1)
+- replay_backend(): a recorded-response store (JSON lines), so a run can be
+  repeated offline and in tests; record_backend() writes one while running live
+
+The command line entry point is benchmarks/eval_prompts.py.
+"""
+
+import contextlib
+import hashlib
+import io
+import json
+import os
+import time
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def get_prompt_variants(prompt_files=None):
+    """
+    Return {name: (prompt_text, output_format)} for the built-in prompts plus
+    extra prompt files.
+
+    Args:
+        prompt_files: Optional {name: (path, output_format)} where
+            output_format is "verbose" or "compact"
+    """
+    from src.processor import COMPACT_EXTRACTION_PROMPT, EXTRACTION_PROMPT
+
+    variants = {
+        "verbose": (EXTRACTION_PROMPT, "verbose"),
+        "compact": (COMPACT_EXTRACTION_PROMPT, "compact"),
+    }
+    for name, (path, output_format) in (prompt_files or {}).items():
+        with open(path, encoding="utf-8") as prompt_file:
+            variants[name] = (prompt_file.read(), output_format)
+    return variants
+
+
+def load_corpus(corpus_dir):
+    """
+    Load a labeled corpus.
+
+    Returns:
+        List of {"path", "labels"} for every labeled image
+    """
+    with open(os.path.join(corpus_dir, "labels.json"), encoding="utf-8") as labels_file:
+        labels = json.load(labels_file)
+
+    corpus = []
+    for name in sorted(labels):
+        path = os.path.join(corpus_dir, name)
+        if not name.lower().endswith(IMAGE_EXTENSIONS) or not os.path.exists(path):
+            print(f"[WARNING] Skipping label without image: {name}")
+            continue
+        corpus.append({"path": path, "labels": labels[name]})
+    return corpus
+
+
+def recording_key(request):
+    """
+    Key of a recorded response: a hash of the whole request as sent.
+
+    It covers the model, the prompt text, the sampling settings and the
+    preprocessed image, so a change to the prompt or to the preprocessing
+    or crop settings misses the recordings instead of replaying stale answers.
+    """
+    payload = json.dumps(request, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def openai_backend(base_url, api_key=None, timeout=60.0):
+    """
+    Completion function for an OpenAI-compatible /chat/completions endpoint.
+
+    Returns:
+        complete(request, key) -> {"content", "prompt_tokens", "completion_tokens", "latency"}
+    """
+    import httpx
+
+    headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+    client = httpx.Client(base_url=base_url.rstrip("/"), headers=headers, timeout=timeout)
+
+    def complete(request, key):
+        started = time.perf_counter()
+        response = client.post("/chat/completions", json=request)
+        response.raise_for_status()
+        latency = time.perf_counter() - started
+        body = response.json()
+        usage = body.get("usage") or {}
+        return {
+            "content": body["choices"][0]["message"]["content"] or "",
+            "prompt_tokens": usage.get("prompt_tokens", 0),
+            "completion_tokens": usage.get("completion_tokens", 0),
+            "latency": latency,
+        }
+
+    return complete
+
+
+def load_recordings(path):
+    """Read a recorded-response store (JSON lines) into {key: response}."""
+    recordings = {}
+    with open(path, encoding="utf-8") as store:
+        for line in store:
+            if line.strip():
+                record = json.loads(line)
+                recordings[record.pop("key")] = record
+    return recordings
+
+
+def replay_backend(recordings):
+    """Completion function answering from recorded responses."""
+
+    def complete(request, key):
+        if key not in recordings:
+            raise KeyError(
+                f"no recorded response for {request['model']} ({key}); "
+                "the prompt, model or preprocessed image changed since recording"
+            )
+        return recordings[key]
+
+    return complete
+
+
+def record_backend(complete, path):
+    """Wrap a completion function so every response is appended to a store."""
+
+    def recording(request, key):
+        response = complete(request, key)
+        with open(path, "a", encoding="utf-8") as store:
+            store.write(json.dumps({"key": key, **response}, ensure_ascii=False) + "\n")
+        return response
+
+    return recording
+
+
+def score(invoice_data, labels):
+    """Per-field correctness of one extraction against its labels."""
+    if not invoice_data:
+        return {"parsed": False, "total": False, "date": False, "item_count": False}
+    return {
+        "parsed": True,
+        "total": "total_amount" in labels
+        and abs((invoice_data.get("total_amount") or 0) - float(labels["total_amount"])) < 1,
+        "date": "invoice_date" in labels and invoice_data.get("invoice_date") == labels["invoice_date"],
+        "item_count": "item_count" in labels
+        and len(invoice_data.get("items") or []) == int(labels["item_count"]),
+    }
+
+
+def run_eval(corpus, variants, models, complete):
+    """
+    Run every corpus image through each variant x model.
+
+    Args:
+        corpus: load_corpus() result
+        variants: get_prompt_variants() result (or a subset)
+        models: Model names
+        complete: Completion function (openai_backend / replay_backend)
+
+    Returns:
+        List of per-call result dicts (variant, model, image, tokens,
+        latency, field scores, error)
+    """
+    from src.processor import build_extraction_request, parse_invoice_response, prepare_image
+
+    results = []
+    for entry in corpus:
+        with open(entry["path"], "rb") as image_file:
+            base64_image, mime_type = prepare_image(image_file.read())
+        for variant, (prompt, output_format) in variants.items():
+            for model in models:
+                request = build_extraction_request(base64_image, mime_type, model, output_format)
+                request["messages"][0]["content"][0]["text"] = prompt
+                result = {"variant": variant, "model": model, "image": os.path.basename(entry["path"])}
+                try:
+                    response = complete(request, recording_key(request))
+                except Exception as e:
+                    print(f"[ERROR] {variant}/{model} on {result['image']}: {e}")
+                    results.append(dict(result, error=str(e), **score(None, entry["labels"])))
+                    continue
+                with contextlib.redirect_stdout(io.StringIO()):
+                    invoice_data = parse_invoice_response(response["content"], output_format)
+                results.append(
+                    dict(
+                        result,
+                        error=None,
+                        prompt_tokens=response["prompt_tokens"],
+                        completion_tokens=response["completion_tokens"],
+                        latency=response["latency"],
+                        **score(invoice_data, entry["labels"]),
+                    )
+                )
+    return results
+
+
+def summarize(results):
+    """Aggregate run_eval() results per (variant, model)."""
+    from src.metrics import percentile
+
+    groups = {}
+    for result in results:
+        groups.setdefault((result["variant"], result["model"]), []).append(result)
+
+    summary = []
+    for (variant, model), runs in groups.items():
+        answered = [run for run in runs if run["error"] is None]
+        latencies = [run["latency"] for run in answered]
+        completion_tokens = [run["completion_tokens"] for run in answered]
+        summary.append(
+            {
+                "variant": variant,
+                "model": model,
+                "runs": len(runs),
+                "errors": len(runs) - len(answered),
+                "prompt_tokens_mean": (
+                    sum(run["prompt_tokens"] for run in answered) / len(answered) if answered else 0.0
+                ),
+                "completion_tokens_p50": percentile(completion_tokens, 50),
+                "completion_tokens_p95": percentile(completion_tokens, 95),
+                "latency_p50": percentile(latencies, 50),
+                "latency_p95": percentile(latencies, 95),
+                **{
+                    f"{field}_accuracy": sum(run[field] for run in runs) / len(runs)
+                    for field in ("parsed", "total", "date", "item_count")
+                },
+            }
+        )
+    return summary
+
+
+def format_report(summary):
+    """Render summarize() output as a fixed-width table."""
+    header = (
+        f"{'variant':<12} {'model':<44} {'runs':>4} {'err':>3} {'prompt':>7} "
+        f"{'compl p50':>9} {'p95':>5} {'lat p50':>8} {'p95':>6} "
+        f"{'parsed':>6} {'total':>6} {'date':>6} {'items':>6}"
+    )
+    lines = [header, "-" * len(header)]
+    for row in summary:
+        lines.append(
+            f"{row['variant']:<12} {row['model'][:44]:<44} {row['runs']:>4} {row['errors']:>3} "
+            f"{row['prompt_tokens_mean']:>7.0f} {row['completion_tokens_p50']:>9.0f} "
+            f"{row['completion_tokens_p95']:>5.0f} {row['latency_p50']:>7.2f}s {row['latency_p95']:>5.2f}s "
+            f"{row['parsed_accuracy']:>6.0%} {row['total_accuracy']:>6.0%} "
+            f"{row['date_accuracy']:>6.0%} {row['item_count_accuracy']:>6.0%}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,182 @@
+"""
+QRIS Fast Path - read merchant and amount from a receipt's QR code
+
+Many Indonesian receipts and transfer slips print a QRIS code, which is an
+EMVCo merchant-presented payload: a sequence of tag/length/value fields
+where tag 59 is the merchant name, 60 the city and 54 the transaction amount,
+ending with a CRC-16 (tag 63). When a receipt's QR code carries both the
+merchant and the amount, the invoice can be filled from it directly and the
+vision model is not needed at all. A static QRIS (merchant only, no amount)
+still identifies the vendor, which selects a vendor-specialized prompt
+(see vendor_profiles.py).
+
+Configuration (environment variables):
+    QRIS_FAST_PATH_ENABLED  (default: true)
+"""
+
+import os
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Scanning larger images only costs time; QR modules stay readable at this size
+QR_SCAN_MAX_EDGE = 1600
+
+_stats_lock = threading.Lock()
+_stats = {"scanned": 0, "qr_found": 0, "hits": 0, "merchant_only": 0}
+
+
+def qris_enabled():
+    """Whether receipts are checked for a QRIS payload before the LLM call."""
+    return os.getenv("QRIS_FAST_PATH_ENABLED", "true").lower() == "true"
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def decode_qr_payloads(image_bytes):
+    """Return the text of every QR code found in an image (may be empty)."""
+    import cv2
+    import numpy as np
+
+    image = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        return []
+
+    scale = QR_SCAN_MAX_EDGE / max(image.shape)
+    if scale < 1:
+        image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    found, payloads, _, _ = cv2.QRCodeDetector().detectAndDecodeMulti(image)
+    if not found:
+        return []
+    return [payload for payload in payloads if payload]
+
+
+def crc16_ccitt(data):
+    """CRC-16/CCITT-FALSE as used by EMVCo QR payloads."""
+    crc = 0xFFFF
+    for byte in data.encode("utf-8"):
+        crc ^= byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else crc << 1
+            crc &= 0xFFFF
+    return crc
+
+
+def parse_emv_tlv(payload):
+    """
+    Split an EMV QR payload into {tag: value}.
+
+    Returns:
+        Dict of top-level tags, or None if the payload is not well-formed TLV
+    """
+    fields = {}
+    position = 0
+    while position < len(payload):
+        tag = payload[position:position + 2]
+        length = payload[position + 2:position + 4]
+        if len(tag) < 2 or not length.isdigit():
+            return None
+        start = position + 4
+        end = start + int(length)
+        if end > len(payload):
+            return None
+        fields[tag] = payload[start:end]
+        position = end
+    return fields
+
+
+def qris_fields(payload):
+    """
+    Parse and verify a QRIS payload.
+
+    Returns:
+        Dict of top-level tags, or None if the payload is not an EMV QR code
+        with a valid CRC
+    """
+    fields = parse_emv_tlv(payload)
+    if not fields or fields.get("00") != "01":
+        return None
+
+    # The CRC covers everything up to and including the "6304" tag header
+    crc = fields.get("63")
+    if crc is None or not payload.endswith(crc):
+        return None
+    if f"{crc16_ccitt(payload[:-4]):04X}" != crc.upper():
+        return None
+    return fields
+
+
+def invoice_from_qris(payload):
+    """
+    Build invoice data from a QRIS payload.
+
+    Returns:
+        Invoice dict with shop_name and total_amount, or None if the payload
+        is not a valid QRIS carrying both a merchant name and an amount
+    """
+    fields = qris_fields(payload)
+    if not fields:
+        return None
+
+    merchant = fields.get("59", "").strip()
+    amount = fields.get("54", "").strip()
+    if not merchant or not amount:
+        return None  # static QRIS: no amount, the LLM has to read the receipt
+    try:
+        total_amount = float(amount)
+    except ValueError:
+        return None
+    if total_amount <= 0:
+        return None
+
+    return {
+        "shop_name": merchant,
+        "invoice_date": None,
+        "total_amount": total_amount,
+        "transaction_type": None,  # auto-determined from the merchant name
+        "items": [],
+    }
+
+
+def scan_qris(image_bytes):
+    """
+    Read the QRIS codes in an image.
+
+    Returns:
+        (invoice dict or None, merchant name or None) - the merchant is set
+        for any valid QRIS, including static codes that carry no amount
+    """
+    _count("scanned")
+    try:
+        payloads = decode_qr_payloads(image_bytes)
+    except Exception as e:
+        print(f"[WARNING] QR scan failed: {e}")
+        return None, None
+
+    if payloads:
+        _count("qr_found")
+    merchant = None
+    for payload in payloads:
+        invoice_data = invoice_from_qris(payload)
+        if invoice_data:
+            _count("hits")
+            return invoice_data, invoice_data["shop_name"]
+        fields = qris_fields(payload)
+        if fields and fields.get("59", "").strip():
+            merchant = merchant or fields["59"].strip()
+    if merchant:
+        _count("merchant_only")
+    return None, merchant
+
+
+def get_qris_stats():
+    """Return how many images were scanned, had a QR code, skipped the LLM, or
+    only identified the merchant."""
+    with _stats_lock:
+        return dict(_stats)
@@ -0,0 +1,235 @@
+"""
+LLM Response Archive - keep raw completions so old receipts can be re-parsed
+
+Every extraction saved to the invoices database also stores what the model
+actually answered: the raw completion text (plus the compact-format fallback,
+follow-up answers, or per-strip answers for tiled receipts), the model,
+prompt version and latency. The record is zlib-compressed JSON in the
+llm_responses table, keyed by invoice id.
+
+When parse_indonesian_currency, the date normalizer or the validators are
+fixed, reparse_archive() re-runs parsing and validation over the archive in
+parallel worker processes and updates only the invoices whose result changed,
+without any new LLM calls:
+
+    python -m src.cli --reparse [--dry-run] [--workers N]
+
+Configuration (environment variables):
+    LLM_ARCHIVE_ENABLED  (default: true)
+"""
+
+import io
+import json
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+
+from src.db_config import connect_sqlite
+
+ARCHIVE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS llm_responses (
+        invoice_id INTEGER PRIMARY KEY,
+        model TEXT,
+        prompt_version TEXT,
+        latency_seconds REAL,
+        payload BLOB NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (invoice_id) REFERENCES invoices (id)
+    )
+"""
+
+
+def archive_enabled():
+    """Whether raw LLM responses are stored with each invoice."""
+    return os.getenv("LLM_ARCHIVE_ENABLED", "true").lower() == "true"
+
+
+def compress_record(record):
+    """Serialize an archive record to zlib-compressed JSON."""
+    return zlib.compress(json.dumps(record, ensure_ascii=False).encode("utf-8"))
+
+
+def decompress_record(payload):
+    """Inverse of compress_record."""
+    return json.loads(zlib.decompress(payload).decode("utf-8"))
+
+
+def archive_response(cursor, invoice_id, record):
+    """Store the archive record for an invoice using an open cursor."""
+    cursor.execute(
+        """
+        INSERT OR REPLACE INTO llm_responses (
+            invoice_id, model, prompt_version, latency_seconds, payload
+        ) VALUES (?, ?, ?, ?, ?)
+    """,
+        (
+            invoice_id,
+            record.get("model"),
+            record.get("prompt_version"),
+            record.get("latency"),
+            compress_record(record),
+        ),
+    )
+
+
+def reparse_record(record, allow_missing=None):
+    """
+    Rebuild an invoice from an archive record with the current parsers.
+
+    Mirrors the live extraction: the first extraction answer that parses is
+    used, fields that are still missing are filled from the archived
+    follow-up answer, and tiled receipts are merged strip by strip (strips
+    may lack the shop name or total; the merge may not).
+
+    Returns:
+        Validated invoice dict, or None if it no longer parses
+    """
+    from src.processor import (
+        RobustInvoice,
+        merge_follow_up,
+        missing_fields,
+        parse_invoice_response,
+    )
+
+    if "tiles" in record:
+        from src.tiling import merge_tile_invoices
+
+        merged = merge_tile_invoices(
+            [reparse_record(tile, allow_missing=True) if tile else None for tile in record["tiles"]]
+        )
+        if not merged or not merged["shop_name"] or not merged["total_amount"]:
+            return None
+        return RobustInvoice(**merged).model_dump()
+
+    follow_up = record.get("follow_up", False)
+    if allow_missing is None:
+        allow_missing = follow_up
+    invoice_data = None
+    for response in record["responses"]:
+        if response["role"] == "extraction":
+            invoice_data = parse_invoice_response(
+                response["content"], response["output_format"], allow_missing=allow_missing
+            )
+            if invoice_data:
+                break
+
+    if invoice_data and follow_up:
+        # Re-read fields are taken from the archive, as they were asked live
+        answers = [r for r in record["responses"] if r["role"] == "follow_up"]
+        if answers:
+            invoice_data = merge_follow_up(invoice_data, answers[-1]["content"], answers[-1]["fields"])
+        elif missing_fields(invoice_data):
+            invoice_data = merge_follow_up(invoice_data, "", missing_fields(invoice_data))
+    return invoice_data
+
+
+def _reparse_payload(payload):
+    """Worker entry point: decompress and re-parse one record quietly."""
+    with redirect_stdout(io.StringIO()):
+        try:
+            return reparse_record(decompress_record(payload))
+        except Exception:
+            return None
+
+
+def _value(value):
+    return getattr(value, "value", value)  # TransactionType -> "retail"
+
+
+def _invoice_row(invoice_data):
+    return (
+        invoice_data.get("shop_name"),
+        invoice_data.get("invoice_date"),
+        invoice_data.get("total_amount", 0),
+        _value(invoice_data.get("transaction_type")),
+    )
+
+
+def _item_rows(items):
+    return [
+        (item.get("name"), item.get("quantity", 1), item.get("unit_price"), item.get("total_price", 0))
+        for item in items
+    ]
+
+
+def reparse_archive(workers=None, db_path=None, dry_run=False):
+    """
+    Re-parse every archived response and update invoices that changed.
+
+    Args:
+        workers: Worker processes (defaults to the CPU count)
+        db_path: Invoices database (defaults to the configured one)
+        dry_run: Only report what would change
+
+    Returns:
+        Dict with checked, changed, unchanged and failed counts
+    """
+    from src.processor import create_tables, insert_invoice_items
+
+    if db_path is None:
+        from src.database import get_default_db_path
+
+        db_path = get_default_db_path()
+        create_tables()
+
+    conn = connect_sqlite(db_path)
+    try:
+        conn.execute(ARCHIVE_TABLE_SQL)
+        archived = conn.execute(
+            "SELECT invoice_id, payload FROM llm_responses ORDER BY invoice_id"
+        ).fetchall()
+        invoice_ids = [invoice_id for invoice_id, _ in archived]
+        print(f"Re-parsing {len(archived)} archived responses...")
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(
+                executor.map(_reparse_payload, [payload for _, payload in archived], chunksize=64)
+            )
+
+        report = {"checked": len(archived), "changed": 0, "unchanged": 0, "failed": 0}
+        cursor = conn.cursor()
+        for invoice_id, invoice_data in zip(invoice_ids, results):
+            current = cursor.execute(
+                "SELECT shop_name, invoice_date, total_amount, transaction_type FROM invoices WHERE id = ?",
+                (invoice_id,),
+            ).fetchone()
+            if current is None:
+                continue  # invoice was deleted
+            if invoice_data is None:
+                report["failed"] += 1
+                continue
+
+            current_items = cursor.execute(
+                "SELECT item_name, quantity, unit_price, total_price FROM invoice_items "
+                "WHERE invoice_id = ? ORDER BY id",
+                (invoice_id,),
+            ).fetchall()
+            new_row = _invoice_row(invoice_data)
+            new_items = _item_rows(invoice_data.get("items", []))
+            if tuple(current) == new_row and current_items == new_items:
+                report["unchanged"] += 1
+                continue
+
+            report["changed"] += 1
+            print(f"   [REPARSE] Invoice {invoice_id}: {tuple(current)} -> {new_row}")
+            if dry_run:
+                continue
+            cursor.execute(
+                "UPDATE invoices SET shop_name = ?, invoice_date = ?, total_amount = ?, "
+                "transaction_type = ? WHERE id = ?",
+                (*new_row, invoice_id),
+            )
+            if current_items != new_items:
+                cursor.execute("DELETE FROM invoice_items WHERE invoice_id = ?", (invoice_id,))
+                insert_invoice_items(cursor, invoice_id, invoice_data.get("items", []))
+        conn.commit()
+    finally:
+        conn.close()
+
+    print(
+        f"Re-parse complete: {report['changed']} changed"
+        f"{' (dry run, not saved)' if dry_run else ''}, "
+        f"{report['unchanged']} unchanged, {report['failed']} no longer parse"
+    )
+    return report
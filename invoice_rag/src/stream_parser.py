@@ -0,0 +1,151 @@
+"""
+Incremental JSON Parser - reads top-level fields from a streaming completion
+
+The extraction prompt puts shop name, date and total before the item list, so
+while the model is still streaming items those fields are already complete.
+IncrementalJSONParser is fed raw text chunks (markdown fences and other text
+around the object are skipped) and exposes each top-level scalar as soon as
+its value is closed, plus how many elements of each top-level array/object
+have been completed so far.
+"""
+
+import json
+
+_WHITESPACE = " \t\r\n"
+
+
+class IncrementalJSONParser:
+    """Character-level parser for the top level of one JSON object."""
+
+    def __init__(self):
+        self.fields = {}  # completed top-level scalar values
+        self.element_counts = {}  # completed elements per top-level container
+        self.done = False
+        self._state = "start"  # start, key, colon, value, scalar, string, nested, comma
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key = None
+        self._token = []
+
+    def feed(self, chunk):
+        """
+        Consume a chunk of streamed text.
+
+        Returns:
+            True if a field or element count changed
+        """
+        changed = False
+        for char in chunk:
+            if self.done:
+                break
+            if self._step(char):
+                changed = True
+        return changed
+
+    def _step(self, char):
+        state = self._state
+
+        if state == "start":
+            if char == "{":
+                self._depth = 1
+                self._state = "key"
+            return False
+
+        if state in ("string", "nested") or self._in_string:
+            return self._step_inside(char)
+
+        if state == "key":
+            if char == '"':
+                self._token = [char]
+                self._in_string = True
+            elif char == "}":
+                self.done = True
+            return False
+
+        if state == "colon":
+            if char == ":":
+                self._state = "value"
+            return False
+
+        if state == "value":
+            if char in _WHITESPACE:
+                return False
+            if char == '"':
+                self._token = [char]
+                self._in_string = True
+                self._state = "string"
+            elif char in "{[":
+                self._depth = 2
+                self._state = "nested"
+                self.element_counts.setdefault(self._key, 0)
+            else:
+                self._token = [char]
+                self._state = "scalar"
+            return False
+
+        if state == "scalar":
+            if char in ",}" or char in _WHITESPACE:
+                changed = self._emit("".join(self._token))
+                self._state = "key" if char == "," else "comma"
+                if char == "}":
+                    self.done = True
+                return changed
+            self._token.append(char)
+            return False
+
+        if state == "comma":
+            if char == ",":
+                self._state = "key"
+            elif char == "}":
+                self.done = True
+            return False
+
+        return False
+
+    def _step_inside(self, char):
+        """Handle characters inside strings (keys or values) and nested containers."""
+        if self._state != "nested":
+            self._token.append(char)
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif char == "\\":
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+                return self._close_string()
+            return False
+
+        # Inside a nested container (strings there are tracked above)
+        if char == '"':
+            self._in_string = True
+        elif char in "{[":
+            self._depth += 1
+        elif char in "}]":
+            self._depth -= 1
+            if self._depth == 2:
+                self.element_counts[self._key] += 1
+                return True
+            if self._depth == 1:
+                self._state = "comma"
+        return False
+
+    def _close_string(self):
+        if self._state == "nested":
+            return False
+        text = "".join(self._token)
+        if self._state == "key":
+            self._key = json.loads(text)
+            self._state = "colon"
+            return False
+        # string value
+        self._state = "comma"
+        return self._emit(text)
+
+    def _emit(self, text):
+        try:
+            self.fields[self._key] = json.loads(text)
+        except ValueError:
+            return False
+        return True
@@ -0,0 +1,233 @@
+"""
+Tiled Extraction - read very long receipts as overlapping strips
+
+A long supermarket receipt squeezed into IMAGE_MAX_EDGE pixels becomes too
+small to read, and its item list can exceed max_completion_tokens in a single
+answer. Receipts whose width would shrink below TILE_MIN_WIDTH pixels in that
+downscale are split into overlapping horizontal strips that keep their full
+resolution; each strip is extracted concurrently and the results are merged:
+- shop name and date come from the first strip that has them (the header)
+- the total comes from the last strip that has one (the footer)
+- item lists are concatenated, dropping runs of rows repeated in the overlap;
+  a lone repeated row may be a genuine repeat (two "AQUA 600ML" lines) and is
+  only dropped when that brings the item sum closer to the total
+
+A merged receipt is only kept when some strip read the shop name and the
+total. Failed strips are counted (get_tiling_stats()), since their items
+are missing from the merged invoice.
+
+Configuration (environment variables):
+    TILING_ENABLED      (default: true)
+    TILE_MIN_WIDTH      receipt width in pixels after the IMAGE_MAX_EDGE downscale
+                        below which text is too small to read (default: 400)
+    TILE_ASPECT         height/width ratio of each strip (default: 1.5)
+    TILE_OVERLAP        share of a strip repeated in the next one (default: 0.15)
+    TILE_MAX_TILES      upper bound on strips per receipt (default: 8)
+"""
+
+import math
+import os
+import re
+import threading
+from difflib import SequenceMatcher
+
+from dotenv import load_dotenv
+
+from src.image_preprocess import (
+    MIME_TYPES,
+    encode_for_upload,
+    finish_preprocess,
+    get_preprocess_config,
+    guess_mime_type,
+    load_receipt_image,
+    preprocess_image_bytes,
+)
+
+load_dotenv()
+
+TILE_PROMPT_NOTE = """
+
+This image is part {index} of {count} of ONE long receipt, cut into overlapping horizontal strips.
+- Extract ONLY the item rows visible in this part
+- Use "" for shop_name if the receipt header is not visible in this part
+- Use 0 for total_amount if the final total is not visible in this part"""
+
+# Item names read twice in the overlap may differ by a character or two
+ITEM_NAME_SIMILARITY = 0.8
+
+# Runs of at least this many rows repeated at a strip boundary are a re-read
+# overlap; a single matching row is ambiguous
+MIN_OVERLAP_ROWS = 2
+
+_stats_lock = threading.Lock()
+_stats = {"receipts": 0, "strips": 0, "failed_strips": 0, "partial_merges": 0, "rejected": 0}
+
+
+def get_tiling_config():
+    """Read the tiling settings from the environment."""
+    return {
+        "enabled": os.getenv("TILING_ENABLED", "true").lower() == "true",
+        "min_width": int(os.getenv("TILE_MIN_WIDTH", "400")),
+        "tile_aspect": float(os.getenv("TILE_ASPECT", "1.5")),
+        "overlap": float(os.getenv("TILE_OVERLAP", "0.15")),
+        "max_tiles": int(os.getenv("TILE_MAX_TILES", "8")),
+    }
+
+
+def tile_prompt_note(index, count):
+    """Prompt addition telling the model it sees one strip of a long receipt."""
+    return TILE_PROMPT_NOTE.format(index=index, count=count)
+
+
+def tile_bounds(width, height, config, max_edge):
+    """
+    Compute the vertical (top, bottom) bounds of each strip.
+
+    Args:
+        width, height: Image size in pixels
+        config: Tiling settings
+        max_edge: Longest edge the whole image would be downscaled to (0 = none)
+
+    Returns:
+        List of bounds, or an empty list when the downscaled receipt stays
+        legible and needs no tiling
+    """
+    scaled_width = width * max_edge / max(width, height) if max_edge > 0 else width
+    if scaled_width >= min(width, config["min_width"]):
+        return []
+
+    tile_height = int(width * config["tile_aspect"])
+    overlap = int(tile_height * config["overlap"])
+    count = math.ceil((height - overlap) / (tile_height - overlap))
+    if count < 2:
+        return []
+    if count > config["max_tiles"]:
+        # Taller strips instead of more of them
+        count = config["max_tiles"]
+        tile_height = math.ceil((height + (count - 1) * overlap) / count)
+
+    step = (height - tile_height) / (count - 1)
+    return [(round(i * step), round(i * step) + tile_height) for i in range(count)]
+
+
+def split_receipt(image_bytes, config=None, preprocess_config=None):
+    """
+    Preprocess an image for upload, splitting it into strips if it is tall.
+
+    Args:
+        image_bytes: Raw image file contents
+        config: Tiling settings (defaults to get_tiling_config())
+        preprocess_config: Encoding settings (defaults to get_preprocess_config())
+
+    Returns:
+        List of (image_bytes, mime_type), top to bottom; a single entry (the
+        preprocess_image_bytes() result) when the image is not tiled
+    """
+    if config is None:
+        config = get_tiling_config()
+    if preprocess_config is None:
+        preprocess_config = get_preprocess_config()
+    if not config["enabled"] or not preprocess_config["enabled"]:
+        return [preprocess_image_bytes(image_bytes, preprocess_config)]
+
+    try:
+        image, transformed = load_receipt_image(image_bytes, preprocess_config)
+    except Exception as e:
+        print(f"[WARNING] Image preprocessing skipped: {e}")
+        return [(image_bytes, guess_mime_type(image_bytes))]
+
+    bounds = tile_bounds(image.width, image.height, config, preprocess_config["max_edge"])
+    if not bounds:
+        return [finish_preprocess(image_bytes, image, transformed, preprocess_config)]
+
+    mime_type = MIME_TYPES[preprocess_config["format"]]
+    return [
+        (encode_for_upload(image.crop((0, top, image.width, bottom)), preprocess_config)[0], mime_type)
+        for top, bottom in bounds
+    ]
+
+
+def _item_name(item):
+    return re.sub(r"[^a-z0-9]", "", str(item.get("name") or "").lower())
+
+
+def same_item(first, second):
+    """Whether two item rows are the same receipt line read twice."""
+    if abs((first.get("total_price") or 0.0) - (second.get("total_price") or 0.0)) > 0.5:
+        return False
+    return SequenceMatcher(None, _item_name(first), _item_name(second)).ratio() >= ITEM_NAME_SIMILARITY
+
+
+def _overlap_length(previous, following):
+    """Longest run of rows ending ``previous`` that also starts ``following``."""
+    for length in range(min(len(previous), len(following)), 0, -1):
+        if all(same_item(a, b) for a, b in zip(previous[-length:], following[:length])):
+            return length
+    return 0
+
+
+def merge_tile_invoices(tiles):
+    """
+    Merge per-strip extractions (top to bottom) into one invoice dict.
+
+    Args:
+        tiles: Invoice dicts per strip; failed strips may be None
+
+    Returns:
+        Merged invoice dict, or None if no strip was extracted
+    """
+    results = [tile for tile in tiles if tile]
+    if not results:
+        return None
+
+    header = next((tile for tile in results if tile.get("shop_name")), results[0])
+    footer = next(
+        (tile for tile in reversed(results) if (tile.get("total_amount") or 0) > 0), results[-1]
+    )
+
+    items = []
+    ambiguous = []
+    previous = []
+    for tile in results:
+        rows = tile.get("items") or []
+        overlap = _overlap_length(previous, rows)
+        if overlap < MIN_OVERLAP_ROWS:
+            if overlap:
+                ambiguous.append(len(items))
+            overlap = 0
+        items.extend(rows[overlap:])
+        previous = rows
+
+    total = footer.get("total_amount") or 0.0
+    if total > 0:
+        for index in reversed(ambiguous):
+            item_sum = sum(row.get("total_price") or 0.0 for row in items)
+            price = items[index].get("total_price") or 0.0
+            if abs(item_sum - price - total) < abs(item_sum - total):
+                del items[index]
+
+    return {
+        "shop_name": header.get("shop_name") or "",
+        "invoice_date": next((tile["invoice_date"] for tile in results if tile.get("invoice_date")), None),
+        "total_amount": total,
+        "transaction_type": header.get("transaction_type"),
+        "items": items,
+    }
+
+
+def record_tile_merge(strips, failed, merged):
+    """Count one tiled receipt, its failed strips and whether it was kept."""
+    with _stats_lock:
+        _stats["receipts"] += 1
+        _stats["strips"] += strips
+        _stats["failed_strips"] += failed
+        if not merged:
+            _stats["rejected"] += 1
+        elif failed:
+            _stats["partial_merges"] += 1
+
+
+def get_tiling_stats():
+    """Return counts of tiled receipts, failed strips and partial or rejected merges."""
+    with _stats_lock:
+        return dict(_stats)
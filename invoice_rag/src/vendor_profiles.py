@@ -0,0 +1,402 @@
+"""
+Vendor Profiles - shorter, specialized prompts for vendors seen before
+
+Most receipts come from the same few dozen vendors (Indomaret, Alfamart,
+Shopee...). Every LLM extraction saved to the invoices database updates a
+profile for its vendor in the vendor_profiles table:
+- the usual spelling of the shop name
+- how many items its receipts usually have
+- its most common item names
+- how amounts and dates are printed (taken from the raw model answers, which
+  keep money values exactly as written)
+
+When a receipt's vendor is identified before the LLM call (today: the
+merchant name of a static QRIS code, see qris.py) and the vendor has enough
+history, the extraction uses vendor_prompt() - a short prompt carrying those
+hints instead of the generic rules - with a max_completion_tokens budget
+sized from the vendor's usual item count. If that answer does not parse, the
+generic prompt is used as before.
+
+A fraction of identified receipts (VENDOR_PROMPT_HOLDOUT) keeps the generic
+prompt, so get_vendor_prompt_stats() can compare the latency of specialized
+and generic extractions of the same vendors.
+
+Profiles are kept up to date as invoices are saved; existing history can be
+loaded with:
+
+    python -m src.cli --build-profiles
+
+Configuration (environment variables):
+    VENDOR_PROMPTS_ENABLED        (default: true)
+    VENDOR_PROFILE_MIN_RECEIPTS   receipts needed before a profile is used (default: 5)
+    VENDOR_PROMPT_HOLDOUT         share of identified receipts kept on the
+                                  generic prompt for comparison (default: 0.1)
+"""
+
+import json
+import math
+import os
+import random
+import re
+import sqlite3
+import threading
+from collections import deque
+
+from dotenv import load_dotenv
+
+from src.db_config import connect_sqlite
+from src.metrics import percentile
+
+load_dotenv()
+
+PROFILE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS vendor_profiles (
+        vendor_key TEXT PRIMARY KEY,
+        receipts INTEGER NOT NULL,
+        stats TEXT NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# Words that do not identify a vendor on their own ("PT", "Toko", "Bank"...)
+GENERIC_WORDS = {
+    "pt", "cv", "ud", "tbk", "toko", "warung", "kedai", "rm", "rumah", "makan",
+    "apotek", "bank", "cafe", "resto", "restoran", "the",
+}
+
+# Profile history kept per vendor
+MAX_ITEM_COUNTS = 50
+MAX_ITEM_NAMES = 200
+
+# max_completion_tokens budget: answer header plus tokens per expected item
+TOKENS_PER_ITEM = {"verbose": 45, "compact": 20}
+HEADER_TOKENS = {"verbose": 80, "compact": 40}
+MIN_COMPLETION_TOKENS = 256
+MAX_COMPLETION_TOKENS = 2000
+
+DATE_FORMATS = [
+    (re.compile(r"^\d{4}-\d{2}-\d{2}$"), "YYYY-MM-DD"),
+    (re.compile(r"^\d{1,2}/\d{1,2}/\d{4}$"), "DD/MM/YYYY"),
+    (re.compile(r"^\d{1,2}/\d{1,2}/\d{2}$"), "DD/MM/YY"),
+    (re.compile(r"^\d{1,2}-\d{1,2}-\d{4}$"), "DD-MM-YYYY"),
+    (re.compile(r"^\d{1,2}\.\d{1,2}\.\d{2,4}$"), "DD.MM.YYYY"),
+    (re.compile(r"^\d{1,2} [A-Za-z]{3,} \d{4}$"), "DD Mon YYYY"),
+]
+
+AMOUNT_FORMATS = [
+    (re.compile(r"^\d{1,3}(\.\d{3})+(,\d{2})?$"), "dot"),
+    (re.compile(r"^\d{1,3}(,\d{3})+(\.\d{2})?$"), "comma"),
+    (re.compile(r"^\d+$"), "plain"),
+]
+
+AMOUNT_HINTS = {
+    "dot": "amounts use dots as thousands separators (e.g. 59.385)",
+    "comma": "amounts use commas as thousands separators (e.g. 25,500)",
+    "plain": "amounts are printed without thousands separators",
+}
+
+VERBOSE_SCHEMA = (
+    '{"shop_name":"shop name","invoice_date":"YYYY-MM-DD","total_amount":"final total",'
+    '"items":[{"name":"item name","quantity":1,"unit_price":"unit price","total_price":"total price"}]}'
+)
+COMPACT_SCHEMA = (
+    '{"s":"shop name","d":"YYYY-MM-DD","t":"final total","i":[["item name",1,"unit price","total price"]]}\n'
+    "Each item is [name, quantity, unit_price, total_price]; write the JSON on a single line"
+)
+
+VENDOR_PROMPT = """This is a receipt from {shop_name}. Return ONLY a JSON object:
+
+{schema}
+
+Known {shop_name} layout (from {receipts} earlier receipts):
+{hints}
+- invoice_date as YYYY-MM-DD; money values exactly as printed
+- total_amount is the single final amount to pay
+
+Return ONLY the JSON, no explanations."""
+
+_stats_lock = threading.Lock()
+_prompt_stats = {}
+
+
+def vendor_prompts_enabled():
+    """Whether identified vendors get a specialized prompt."""
+    return os.getenv("VENDOR_PROMPTS_ENABLED", "true").lower() == "true"
+
+
+def vendor_key(name):
+    """
+    Return the identifying word of a shop or merchant name.
+
+    "INDOMARET TAMAN ANGGREK" and "Indomaret" both give "indomaret";
+    generic words such as "PT" or "Toko" are skipped.
+
+    Returns:
+        Lowercase key, or None if the name has no identifying word
+    """
+    for word in re.sub(r"[^a-z0-9]+", " ", (name or "").lower()).split():
+        if len(word) >= 3 and word not in GENERIC_WORDS and not word.isdigit():
+            return word
+    return None
+
+
+def _classify(value, formats):
+    value = str(value or "").strip()
+    value = re.sub(r"^rp\.?\s*", "", value, flags=re.IGNORECASE)
+    for pattern, name in formats:
+        if pattern.match(value):
+            return name
+    return None
+
+
+def raw_answer(record):
+    """
+    Return the first raw extraction answer of an archive record as a verbose dict.
+
+    Returns:
+        Dict of unparsed values, or None (tiled receipts, unparseable answers)
+    """
+    from src.processor import _strip_code_fence, expand_compact_invoice
+
+    for response in (record or {}).get("responses") or []:
+        if response.get("role") != "extraction":
+            continue
+        try:
+            data = json.loads(_strip_code_fence(response["content"].strip()))
+            if response.get("output_format") == "compact":
+                data = expand_compact_invoice(data)
+        except (ValueError, TypeError, KeyError):
+            continue
+        if isinstance(data, dict):
+            return data
+    return None
+
+
+def _bump(counter, key):
+    if key:
+        counter[key] = counter.get(key, 0) + 1
+
+
+def update_vendor_profile(cursor, invoice_data):
+    """Add one saved extraction to its vendor's profile using an open cursor."""
+    key = vendor_key(invoice_data.get("shop_name"))
+    if key is None:
+        return
+
+    row = cursor.execute(
+        "SELECT receipts, stats FROM vendor_profiles WHERE vendor_key = ?", (key,)
+    ).fetchone()
+    receipts, stats = (row[0], json.loads(row[1])) if row else (0, {})
+    for name in ("shop_names", "items", "date_formats", "amount_formats"):
+        stats.setdefault(name, {})
+
+    items = invoice_data.get("items") or []
+    _bump(stats["shop_names"], (invoice_data.get("shop_name") or "").strip())
+    stats["item_counts"] = (stats.get("item_counts", []) + [len(items)])[-MAX_ITEM_COUNTS:]
+    for item in items:
+        _bump(stats["items"], (item.get("name") or "").strip())
+    if len(stats["items"]) > MAX_ITEM_NAMES:
+        kept = sorted(stats["items"].items(), key=lambda entry: -entry[1])[:MAX_ITEM_NAMES]
+        stats["items"] = dict(kept)
+
+    raw = raw_answer(invoice_data.get("_llm"))
+    if raw:
+        _bump(stats["date_formats"], _classify(raw.get("invoice_date"), DATE_FORMATS))
+        _bump(stats["amount_formats"], _classify(raw.get("total_amount"), AMOUNT_FORMATS))
+
+    cursor.execute(
+        "INSERT OR REPLACE INTO vendor_profiles (vendor_key, receipts, stats, updated_at) "
+        "VALUES (?, ?, ?, CURRENT_TIMESTAMP)",
+        (key, receipts + 1, json.dumps(stats, ensure_ascii=False)),
+    )
+
+
+def _dominant(counter, share=0.6):
+    """Most common key if it covers at least ``share`` of the observations."""
+    total = sum(counter.values())
+    if not total:
+        return None
+    key, count = max(counter.items(), key=lambda entry: entry[1])
+    return key if count / total >= share else None
+
+
+def summarize_profile(key, receipts, stats):
+    """Turn stored profile counters into the hints used by vendor_prompt()."""
+    common_items = sorted(
+        (entry for entry in stats.get("items", {}).items() if entry[1] >= 2),
+        key=lambda entry: -entry[1],
+    )
+    return {
+        "vendor": key,
+        "shop_name": max(stats["shop_names"].items(), key=lambda entry: entry[1])[0],
+        "receipts": receipts,
+        "max_items": percentile(stats.get("item_counts", []), 90),
+        "common_items": [name for name, _ in common_items[:6]],
+        "date_format": _dominant(stats.get("date_formats", {})),
+        "amount_format": _dominant(stats.get("amount_formats", {})),
+    }
+
+
+def find_vendor_profile(merchant, db_path=None):
+    """
+    Look up the profile of an identified vendor.
+
+    Returns:
+        summarize_profile() dict, or None if the vendor is unknown or has
+        fewer than VENDOR_PROFILE_MIN_RECEIPTS receipts
+    """
+    key = vendor_key(merchant)
+    if key is None:
+        return None
+    if db_path is None:
+        from src.database import get_default_db_path
+
+        db_path = get_default_db_path()
+
+    conn = connect_sqlite(db_path)
+    try:
+        row = conn.execute(
+            "SELECT receipts, stats FROM vendor_profiles WHERE vendor_key = ?", (key,)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return None  # no profiles yet
+    finally:
+        conn.close()
+
+    min_receipts = int(os.getenv("VENDOR_PROFILE_MIN_RECEIPTS", "5"))
+    if row is None or row[0] < min_receipts:
+        return None
+    return summarize_profile(key, row[0], json.loads(row[1]))
+
+
+def select_vendor_profile(merchant, db_path=None):
+    """
+    Return the profile to extract an identified vendor's receipt with.
+
+    A VENDOR_PROMPT_HOLDOUT share of the profiles is marked ``holdout``: the
+    extraction keeps the generic prompt and is only timed for comparison.
+    """
+    if not merchant or not vendor_prompts_enabled():
+        return None
+    profile = find_vendor_profile(merchant, db_path)
+    if profile is not None:
+        profile["holdout"] = random.random() < float(os.getenv("VENDOR_PROMPT_HOLDOUT", "0.1"))
+    return profile
+
+
+def vendor_prompt(profile, output_format="verbose"):
+    """Build the specialized extraction prompt for a vendor profile."""
+    hints = []
+    if profile["max_items"]:
+        hints.append(f"- usually up to {profile['max_items']} items")
+    if profile["common_items"]:
+        hints.append("- item names look like: " + ", ".join(profile["common_items"]))
+    if profile["amount_format"]:
+        hints.append("- " + AMOUNT_HINTS[profile["amount_format"]])
+    if profile["date_format"] and profile["date_format"] != "YYYY-MM-DD":
+        hints.append(f"- dates are printed as {profile['date_format']}")
+    return VENDOR_PROMPT.format(
+        shop_name=profile["shop_name"],
+        schema=COMPACT_SCHEMA if output_format == "compact" else VERBOSE_SCHEMA,
+        receipts=profile["receipts"],
+        hints="\n".join(hints),
+    )
+
+
+def vendor_max_tokens(profile, output_format="verbose"):
+    """Completion budget for a vendor: its usual item count with 50% headroom."""
+    expected_items = math.ceil(profile["max_items"] * 1.5) + 2
+    budget = HEADER_TOKENS[output_format] + TOKENS_PER_ITEM[output_format] * expected_items
+    return max(MIN_COMPLETION_TOKENS, min(MAX_COMPLETION_TOKENS, budget))
+
+
+def record_vendor_extraction(mode, elapsed, ok):
+    """Record the first extraction request of an identified vendor's receipt.
+
+    Args:
+        mode: "specialized" or "holdout" (generic prompt)
+        elapsed: Seconds the request took
+        ok: Whether its answer parsed
+    """
+    with _stats_lock:
+        stats = _prompt_stats.setdefault(
+            mode, {"calls": 0, "failures": 0, "latencies": deque(maxlen=1000)}
+        )
+        stats["calls"] += 1
+        stats["latencies"].append(elapsed)
+        if not ok:
+            stats["failures"] += 1
+
+
+def get_vendor_prompt_stats():
+    """Return calls, failure rate and latency percentiles per prompt mode.
+
+    ``latency_p50_saving`` is the holdout (generic) median minus the
+    specialized median; it is only reported once both modes have calls.
+    """
+    with _stats_lock:
+        snapshot = {mode: (dict(stats), list(stats["latencies"])) for mode, stats in _prompt_stats.items()}
+
+    report = {}
+    for mode, (stats, latencies) in snapshot.items():
+        report[mode] = {
+            "calls": stats["calls"],
+            "failure_rate": stats["failures"] / stats["calls"] if stats["calls"] else 0.0,
+            "latency_p50": percentile(latencies, 50),
+            "latency_p95": percentile(latencies, 95),
+        }
+    if "specialized" in report and "holdout" in report:
+        report["latency_p50_saving"] = (
+            report["holdout"]["latency_p50"] - report["specialized"]["latency_p50"]
+        )
+    return report
+
+
+def rebuild_vendor_profiles(db_path=None):
+    """
+    Rebuild every vendor profile from the invoices already saved.
+
+    Like the live save path, only invoices with an archived LLM extraction
+    are profiled; QRIS fast-path invoices have no items to learn from.
+
+    Returns:
+        Number of vendors with a profile
+    """
+    from src.response_archive import ARCHIVE_TABLE_SQL, decompress_record
+
+    if db_path is None:
+        from src.database import get_default_db_path
+        from src.processor import create_tables
+
+        db_path = get_default_db_path()
+        create_tables()
+
+    conn = connect_sqlite(db_path)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(PROFILE_TABLE_SQL)
+        cursor.execute(ARCHIVE_TABLE_SQL)
+        cursor.execute("DELETE FROM vendor_profiles")
+        invoices = cursor.execute(
+            "SELECT i.id, i.shop_name, r.payload FROM invoices i "
+            "JOIN llm_responses r ON r.invoice_id = i.id ORDER BY i.id"
+        ).fetchall()
+        for invoice_id, shop_name, payload in invoices:
+            items = cursor.execute(
+                "SELECT item_name FROM invoice_items WHERE invoice_id = ? ORDER BY id", (invoice_id,)
+            ).fetchall()
+            update_vendor_profile(
+                cursor,
+                {
+                    "shop_name": shop_name,
+                    "items": [{"name": name} for (name,) in items],
+                    "_llm": decompress_record(payload),
+                },
+            )
+        vendors = cursor.execute("SELECT COUNT(*) FROM vendor_profiles").fetchone()[0]
+        conn.commit()
+    finally:
+        conn.close()
+
+    print(f"Built profiles for {vendors} vendors from {len(invoices)} invoices")
+    return vendors
@@ -0,0 +1,213 @@
+"""
+Directory Watch Ingestion - long-running processing of new receipt images
+
+Polls a folder (e.g. the scanner share behind invoices/) with os.scandir,
+comparing each file's mtime and size with what was seen before. A new or
+changed file is only queued once its signature has stayed the same for the
+debounce period, so half-copied scans are not picked up. Queued files are
+handled by a fixed pool of worker threads through a bounded queue; when the
+queue is full, ready files simply wait for the next poll.
+
+Scans are streamed entry by entry and only a small (mtime, size) record is
+kept per file, so memory stays flat with tens of thousands of files. The
+checkpoint manifest (src/checkpoint.py) decides whether a file's content was
+already saved, which also makes restarts safe.
+"""
+
+import os
+import queue
+import threading
+import time
+
+from src.checkpoint import mark_failed, plan_pending
+from src.processor import process_invoice, save_to_database_robust
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+_STOP = object()
+
+
+def scan_images(directory):
+    """Yield (path, mtime_ns, size) for every image under directory."""
+    stack = [directory]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                            info = entry.stat()
+                            yield entry.path, info.st_mtime_ns, info.st_size
+                    except OSError:
+                        continue  # removed while scanning
+        except OSError as e:
+            if current == directory:
+                raise
+            print(f"[WARNING] Could not scan {current}: {e}")
+
+
+def poll_once(directory, state, debounce, limit, now=None):
+    """
+    Scan the directory once and return files that are ready to process.
+
+    Args:
+        directory: Folder to scan
+        state: Dict with "seen", "pending" and "generation" (see new_watch_state())
+        debounce: Seconds a file's mtime/size must stay unchanged
+        limit: Maximum number of files to return
+        now: Current monotonic time (for tests)
+
+    Returns:
+        List of (path, signature) tuples; call mark_queued() for each one
+        actually handed to a worker
+    """
+    if now is None:
+        now = time.monotonic()
+    seen, pending = state["seen"], state["pending"]
+    state["generation"] += 1
+    generation = state["generation"]
+    ready = []
+
+    for path, mtime_ns, size in scan_images(directory):
+        signature = (mtime_ns, size)
+        known = seen.get(path)
+        if known is not None and known[0] == signature:
+            seen[path] = (signature, generation)
+            continue
+
+        waiting = pending.get(path)
+        if waiting is None or waiting[0] != signature:
+            pending[path] = (signature, now, generation)
+        else:
+            pending[path] = (signature, waiting[1], generation)
+            if now - waiting[1] >= debounce and len(ready) < limit:
+                ready.append((path, signature))
+
+    # Forget files that disappeared since the previous scan
+    for records in (seen, pending):
+        for path in [p for p, record in records.items() if record[-1] != generation]:
+            del records[path]
+
+    return ready
+
+
+def new_watch_state():
+    """Return an empty scanner state for poll_once()."""
+    return {"seen": {}, "pending": {}, "generation": 0}
+
+
+def mark_queued(state, path, signature):
+    """Remember a file as handled at this signature."""
+    state["pending"].pop(path, None)
+    state["seen"][path] = (signature, state["generation"])
+
+
+def _ingest(image_path, stats, lock, retry_failed=False):
+    """Process one image unless the manifest says its content is already saved."""
+    to_process, _ = plan_pending([image_path], retry_failed=retry_failed)
+    if image_path not in to_process:
+        with lock:
+            stats["skipped"] += 1
+        return
+    content_hash = to_process[image_path]
+
+    invoice_data = process_invoice(image_path)
+    invoice_id = None
+    if invoice_data:
+        invoice_id = save_to_database_robust(invoice_data, image_path, content_hash)
+        if invoice_id:
+            print(f"   [SUCCESS] Saved {os.path.basename(image_path)} with ID: {invoice_id}")
+        else:
+            mark_failed(image_path, content_hash, "database error")
+    else:
+        print(f"[ERROR] Failed to extract data from {os.path.basename(image_path)}")
+        mark_failed(image_path, content_hash, "extraction failed")
+
+    with lock:
+        stats["saved" if invoice_id else "failed"] += 1
+
+
+def _work(work_q, stats, lock, retry_failed):
+    while True:
+        image_path = work_q.get()
+        if image_path is _STOP:
+            break
+        try:
+            _ingest(image_path, stats, lock, retry_failed)
+        except Exception as e:
+            print(f"[ERROR] Unexpected error processing {image_path}: {e}")
+            with lock:
+                stats["failed"] += 1
+
+
+def run_watch(
+    directory="invoices",
+    workers=4,
+    poll_interval=2.0,
+    debounce=3.0,
+    retry_failed=False,
+    stop_event=None,
+):
+    """Watch a folder and ingest new or changed images until stopped.
+
+    Args:
+        directory: Folder to watch (scanned recursively)
+        workers: Number of images processed concurrently
+        poll_interval: Seconds between scans
+        debounce: Seconds a file must stay unchanged before it is processed
+        retry_failed: Reprocess files whose earlier attempts failed
+        stop_event: threading.Event that ends the loop (Ctrl+C also stops it)
+
+    Returns:
+        Dict with saved, failed and skipped counts
+    """
+    workers = max(1, workers)
+    if stop_event is None:
+        stop_event = threading.Event()
+
+    work_q = queue.Queue(maxsize=workers * 2)
+    lock = threading.Lock()
+    stats = {"saved": 0, "failed": 0, "skipped": 0}
+    state = new_watch_state()
+
+    threads = [
+        threading.Thread(target=_work, args=(work_q, stats, lock, retry_failed), daemon=True)
+        for _ in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    print(f"Watching {os.path.abspath(directory)} (every {poll_interval:g}s, "
+          f"debounce {debounce:g}s, {workers} workers) - press Ctrl+C to stop")
+
+    try:
+        while not stop_event.is_set():
+            try:
+                ready = poll_once(directory, state, debounce, limit=work_q.maxsize - work_q.qsize())
+            except OSError as e:
+                print(f"[WARNING] Could not scan {directory}: {e}")
+                ready = []
+
+            for path, signature in ready:
+                try:
+                    work_q.put_nowait(path)
+                except queue.Full:
+                    break  # still pending; picked up on a later poll
+                mark_queued(state, path, signature)
+                print(f"[WATCH] Queued {os.path.basename(path)}")
+
+            stop_event.wait(poll_interval)
+    except KeyboardInterrupt:
+        print("\nStopping watcher...")
+    finally:
+        for _ in threads:
+            work_q.put(_STOP)
+        for thread in threads:
+            thread.join()
+
+    print(f"Watcher stopped: {stats['saved']} saved, {stats['failed']} failed, "
+          f"{stats['skipped']} already processed")
+    return stats
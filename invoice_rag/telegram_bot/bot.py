@@ -21,8 +21,9 @@ logger = logging.getLogger(__name__)
 project_root = Path(__file__).parent.parent.parent
 sys.path.append(str(project_root))
 
-from src.processor import process_invoice  # noqa: E402
-from src.database import get_db_session, Invoice  # noqa: E402
+from src.processor import process_invoice, async_process_invoice, quality_gate  # noqa: E402
+from src.image_quality import retake_message  # noqa: E402
+from src.database import init_db, Invoice, session_scope  # noqa: E402
 from src.chatbot import run_conversation  # noqa: E402
 from src.analysis import analyze_invoices, calculate_weekly_averages, analyze_spending_trends  # noqa: E402
 from telegram_bot.spending_limits import (  # noqa: E402
@@ -32,6 +33,12 @@ from telegram_bot.spending_limits import (  # noqa: E402
     check_spending_limit,
 )
 from telegram_bot.visualizations import get_visualization  # noqa: E402
+from src.image_hash import (  # noqa: E402
+    DEDUP_MODE,
+    compute_phash,
+    find_near_duplicate,
+    record_image_hash,
+)
 from telegram_bot.premium import (  # noqa: E402
     check_premium_access,
     claim_token,
@@ -41,7 +48,8 @@ from src.database import get_or_create_user, is_user_premium  # noqa: E402
 # Ensure imports are recognized by Pylance
 __all__ = [
     'process_invoice',
-    'get_db_session', 
+    'async_process_invoice',
+    'session_scope',
     'Invoice',
     'run_conversation',
     'analyze_invoices',
@@ -76,12 +84,9 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     user = update.effective_user
     user_record = None
     if user:
-        session = get_db_session()
-        try:
+        with session_scope() as session:
             user_record = get_or_create_user(session, str(user.id))
             logger.info(f"User {user.id} started bot - DB ID: {user_record.id}")
-        finally:
-            session.close()
 
     keyboard = [
         ['/set_limit', '/check_limit'],
@@ -93,12 +98,9 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     # Check if user has premium
     premium_status = ""
     if user and user_record:
-        session = get_db_session()
-        try:
+        with session_scope() as session:
             if is_user_premium(session, str(user.id)):
                 premium_status = "✨ Premium Active ✨\n\n"
-        finally:
-            session.close()
     
     welcome_text = (
         f"👋 Hello! I'm your friendly Invoice Helper Bot!\n\n"
@@ -150,6 +152,42 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     )
     await update.message.reply_text(help_text)
 
+# Minimum seconds between edits of the "Processing..." message (Telegram rate-limits edits)
+PROGRESS_EDIT_INTERVAL = 1.0
+
+
+def format_partial_invoice(partial):
+    """Render streamed partial extraction results for the status message."""
+    lines = ["Processing your invoice... Please wait.", ""]
+    if partial.get('shop_name'):
+        lines.append(f"🏢 Vendor: {partial['shop_name']}")
+    if partial.get('invoice_date'):
+        lines.append(f"📅 Date: {partial['invoice_date']}")
+    if partial.get('total_amount'):
+        lines.append(f"💰 Total Amount: Rp {partial['total_amount']:,.2f}")
+    if partial.get('items_so_far'):
+        lines.append(f"📝 Reading items... {partial['items_so_far']} so far")
+    return "\n".join(lines)
+
+
+def make_progress_updater(status_message):
+    """Return an on_partial callback that edits the status message, throttled."""
+    state = {'last_edit': 0.0, 'last_text': status_message.text}
+
+    async def update_progress(partial):
+        text = format_partial_invoice(partial)
+        now = asyncio.get_running_loop().time()
+        if text == state['last_text'] or now - state['last_edit'] < PROGRESS_EDIT_INTERVAL:
+            return
+        state['last_edit'], state['last_text'] = now, text
+        try:
+            await status_message.edit_text(text)
+        except Exception as e:
+            logger.debug(f"Could not update progress message: {e}")
+
+    return update_progress
+
+
 async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle invoice photos sent by users."""
     if not update.message or not update.effective_user:
@@ -158,24 +196,57 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     # Get the largest photo (best quality)
     photo = update.message.photo[-1]
     
-    # Download the photo
-    file = await context.bot.get_file(photo.file_id)
-    temp_path = f"temp_{update.effective_user.id}.jpg"
-    await file.download_to_drive(temp_path)
-    
     try:
-        # Process the invoice
-        await update.message.reply_text("Processing your invoice... Please wait.")
-        invoice_data = process_invoice(temp_path)
+        # Download the photo straight into memory (no temp files to collide or clean up)
+        file = await context.bot.get_file(photo.file_id)
+        image_buffer = BytesIO()
+        await file.download_to_memory(image_buffer)
+        image_bytes = image_buffer.getvalue()
+
+        # Ask for a retake right away if the photo is too blurry, dark or small to read
+        rejected = await asyncio.to_thread(quality_gate, image_bytes)
+        if rejected:
+            await update.message.reply_text(
+                f"📷 I can't read this photo well enough:\n{retake_message(rejected)}\n\n"
+                "Please send a new photo of the receipt."
+            )
+            return
+
+        # Near-duplicate check (same receipt photographed twice) before paying for OCR
+        user_id = update.effective_user.id
+        phash = await asyncio.to_thread(compute_phash, image_bytes)
+        duplicate = await asyncio.to_thread(find_near_duplicate, user_id, phash)
+        if duplicate:
+            duplicate_note = (
+                f"This looks like the same receipt as invoice #{duplicate['invoice_id']} "
+                f"(uploaded {duplicate['created_at']} UTC)."
+            )
+            if DEDUP_MODE == "skip":
+                await update.message.reply_text(
+                    f"♻️ {duplicate_note}\n\nIt was not saved again, so your spending is not double-counted."
+                )
+                return
+            await update.message.reply_text(f"⚠️ {duplicate_note} Saving it anyway.")
+
+        # Process the invoice without blocking other users on the event loop,
+        # showing fields in the status message as soon as they are read
+        status_message = await update.message.reply_text("Processing your invoice... Please wait.")
+        invoice_data = await async_process_invoice(
+            image_bytes, on_partial=make_progress_updater(status_message), check_quality=False
+        )
         
         if invoice_data:
-            # Use the processor's database saving function
-            from src.processor import save_to_database_robust
-            save_to_database_robust(invoice_data, temp_path)
+            # Use the processor's database saving function; the image path is
+            # only set when a content-addressed archive is configured
+            from src.processor import archive_image, save_to_database_robust
+            image_path = await asyncio.to_thread(archive_image, image_bytes)
+            invoice_id = await asyncio.to_thread(save_to_database_robust, invoice_data, image_path)
+            if invoice_id:
+                await asyncio.to_thread(record_image_hash, user_id, phash, invoice_id)
             
             # Check spending limit
             amount = invoice_data.get('total_amount', 0)
-            status = check_spending_limit(update.effective_user.id, amount)
+            status = check_spending_limit(user_id, amount)
             
             # Send response
             response = (
@@ -207,11 +278,6 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         
     except Exception as e:
         await update.message.reply_text(f"❌ Error processing invoice: {str(e)}")
-    
-    finally:
-        # Cleanup
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
 
 async def analysis_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Show invoice summary and analysis, then send visualization. (Premium feature)"""
@@ -221,21 +287,18 @@ async def analysis_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     user_id = str(update.effective_user.id)
     
     # Check premium access
-    session = get_db_session()
-    try:
+    with session_scope() as session:
         premium_info = check_premium_access(session, user_id)
-        if not premium_info['is_premium']:
-            keyboard = [[InlineKeyboardButton("🎫 Get Premium", callback_data="claim_token")]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            await update.message.reply_text(
-                "💎 Premium Feature\n\n"
-                "Advanced analytics requires premium access!\n\n"
-                "Click below to unlock:",
-                reply_markup=reply_markup
-            )
-            return
-    finally:
-        session.close()
+    if not premium_info['is_premium']:
+        keyboard = [[InlineKeyboardButton("🎫 Get Premium", callback_data="claim_token")]]
+        reply_markup = InlineKeyboardMarkup(keyboard)
+        await update.message.reply_text(
+            "💎 Premium Feature\n\n"
+            "Advanced analytics requires premium access!\n\n"
+            "Click below to unlock:",
+            reply_markup=reply_markup
+        )
+        return
         
     try:
         # Send text summary first
@@ -282,21 +345,21 @@ async def recent_invoices(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         return
         
     try:
-        session = get_db_session()
-        invoices = session.query(Invoice).order_by(Invoice.processed_at.desc()).limit(5).all()
-        
-        if not invoices:
-            await update.message.reply_text("No invoices found in the database.")
-            return
+        with session_scope() as session:
+            invoices = session.query(Invoice).order_by(Invoice.processed_at.desc()).limit(5).all()
             
-        response = "🧾 Your Recent Invoices:\n\n"
-        for inv in invoices:
-            response += (
-                f"📅 {inv.invoice_date or 'Unknown date'}\n"
-                f"🏢 {inv.shop_name}\n"
-                f"💰 Rp {inv.total_amount:,.2f}\n"
-                "───────────────\n"
-            )
+            if not invoices:
+                await update.message.reply_text("No invoices found in the database.")
+                return
+                
+            response = "🧾 Your Recent Invoices:\n\n"
+            for inv in invoices:
+                response += (
+                    f"📅 {inv.invoice_date or 'Unknown date'}\n"
+                    f"🏢 {inv.shop_name}\n"
+                    f"💰 Rp {inv.total_amount:,.2f}\n"
+                    "───────────────\n"
+                )
         
         await update.message.reply_text(response)
         
@@ -357,7 +420,9 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
     # Get chatbot response
     sent_message = await message.reply_text("🤔 Typing...", parse_mode='Markdown')
-    response_text = run_conversation(user_message, chat_history)
+    # The chatbot makes blocking LLM calls; keep them off the event loop, where
+    # they would wait for LLM slots held by this loop's own extractions
+    response_text = await asyncio.to_thread(run_conversation, user_message, chat_history)
     
     # Update the "Typing..." message with the actual response
     if sent_message and sent_message.message_id:
@@ -552,8 +617,8 @@ async def chat_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     # Show typing indicator
     sent_message = await update.message.reply_text("🤔 Thinking...", parse_mode='Markdown')
     
-    # Get chatbot response
-    response_text = run_conversation(user_message, chat_history)
+    # Get chatbot response (blocking LLM calls run in a worker thread)
+    response_text = await asyncio.to_thread(run_conversation, user_message, chat_history)
     
     # Update the typing message with actual response
     if sent_message and sent_message.message_id:
@@ -585,9 +650,17 @@ async def export_to_excel(user_id: int, weeks_back: int = 8) -> BytesIO:
     trends = analyze_spending_trends(weeks_back=weeks_back)
     
     # Get recent invoices
-    session = get_db_session()
-    invoices = session.query(Invoice).order_by(Invoice.processed_at.desc()).limit(50).all()
-    session.close()
+    with session_scope() as session:
+        invoices_data = [
+            {
+                'Date': inv.invoice_date,
+                'Vendor': inv.shop_name,
+                'Amount (Rp)': inv.total_amount,
+                'Transaction Type': inv.transaction_type,
+                'Processed At': inv.processed_at
+            }
+            for inv in session.query(Invoice).order_by(Invoice.processed_at.desc()).limit(50).all()
+        ]
     
     # Create Excel file in memory
     output = BytesIO()
@@ -632,16 +705,7 @@ async def export_to_excel(user_id: int, weeks_back: int = 8) -> BytesIO:
         weekly_df.to_excel(writer, sheet_name='Weekly Breakdown', index=False)
         
         # All Invoices sheet
-        if invoices:
-            invoices_data = []
-            for inv in invoices:
-                invoices_data.append({
-                    'Date': inv.invoice_date,
-                    'Vendor': inv.shop_name,
-                    'Amount (Rp)': inv.total_amount,
-                    'Transaction Type': inv.transaction_type,
-                    'Processed At': inv.processed_at
-                })
+        if invoices_data:
             invoices_df = pd.DataFrame(invoices_data)
             invoices_df.to_excel(writer, sheet_name='All Invoices', index=False)
     
@@ -884,16 +948,14 @@ async def premium_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     user_id = str(update.effective_user.id)
     
     # Check current premium status
-    session = get_db_session()
-    try:
-        if is_user_premium(session, user_id):
-            await update.message.reply_text(
-                "✨ You already have Premium access! ✨\n\n"
-                "Enjoy your advanced analytics features! 📊"
-            )
-            return
-    finally:
-        session.close()
+    with session_scope() as session:
+        already_premium = is_user_premium(session, user_id)
+    if already_premium:
+        await update.message.reply_text(
+            "✨ You already have Premium access! ✨\n\n"
+            "Enjoy your advanced analytics features! 📊"
+        )
+        return
     
     # Show claim token option
     keyboard = [
@@ -950,23 +1012,20 @@ async def handle_token_claim(update: Update, context: ContextTypes.DEFAULT_TYPE)
     context.user_data['waiting_for_token'] = False
     
     # Attempt to claim the token
-    session = get_db_session()
-    try:
+    with session_scope() as session:
         result = claim_token(session, user_id, token)
-        
-        if result['success']:
-            await update.message.reply_text(
-                f"✅ {result['message']}\n\n"
-                "🎉 Premium activated successfully!\n"
-                "You now have access to advanced analytics. Try /analysis!"
-            )
-        else:
-            await update.message.reply_text(
-                f"❌ {result['message']}\n\n"
-                "Please check your token and try again with /premium"
-            )
-    finally:
-        session.close()
+    
+    if result['success']:
+        await update.message.reply_text(
+            f"✅ {result['message']}\n\n"
+            "🎉 Premium activated successfully!\n"
+            "You now have access to advanced analytics. Try /analysis!"
+        )
+    else:
+        await update.message.reply_text(
+            f"❌ {result['message']}\n\n"
+            "Please check your token and try again with /premium"
+        )
 
 async def main() -> None:
     """Start the bot."""
@@ -997,6 +1056,9 @@ async def main() -> None:
         logger.error(error_msg)
         return
     
+    # Create the ORM tables once, before any handler opens a session
+    init_db()
+
     # Initialize spending limits table
     init_spending_limits_table()
         
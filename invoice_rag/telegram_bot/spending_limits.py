@@ -1,4 +1,5 @@
 import sqlite3
+from contextlib import closing
 import os
 from typing import Optional, Dict, Any
 from src.analysis import analyze_invoices
@@ -9,12 +10,12 @@ def get_db_path():
     return os.path.join(current_dir, 'database', 'invoices.db')
 
 def get_db_connection():
-    """Get database connection - supports both SQLite and Supabase"""
+    """Borrow a pooled database connection (context manager) - supports both SQLite and Supabase"""
     try:
-        from src.db_config import get_raw_connection
-        return get_raw_connection()
+        from src.db_config import raw_connection
+        return raw_connection()
     except ImportError:
-        return sqlite3.connect(get_db_path())
+        return closing(sqlite3.connect(get_db_path()))
 
 def get_placeholder():
     """Get SQL parameter placeholder for current database"""
@@ -37,8 +38,7 @@ def init_spending_limits_table():
     
     # Only initialize for SQLite
     print("ℹ️  Initializing spending_limits table for SQLite...")
-    conn = get_db_connection()
-    try:
+    with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS spending_limits (
@@ -49,58 +49,51 @@ def init_spending_limits_table():
             )
         ''')
         conn.commit()
-    finally:
-        conn.close()
 
 def set_monthly_limit(user_id: int, limit_amount: float) -> bool:
     """Set or update monthly spending limit for a user."""
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor()
-        placeholder = get_placeholder()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            placeholder = get_placeholder()
         
-        # Use appropriate UPSERT syntax
-        try:
-            from src.db_config import USE_SUPABASE
-            is_postgres = USE_SUPABASE
-        except ImportError:
-            is_postgres = False
+            # Use appropriate UPSERT syntax
+            try:
+                from src.db_config import USE_SUPABASE
+                is_postgres = USE_SUPABASE
+            except ImportError:
+                is_postgres = False
         
-        if is_postgres:
-            cursor.execute(f'''
-                INSERT INTO spending_limits (user_id, monthly_limit, updated_at)
-                VALUES ({placeholder}, {placeholder}, CURRENT_TIMESTAMP)
-                ON CONFLICT(user_id) DO UPDATE SET
-                    monthly_limit = EXCLUDED.monthly_limit,
-                    updated_at = CURRENT_TIMESTAMP
-            ''', (user_id, limit_amount))
-        else:
-            cursor.execute(f'''
-                INSERT INTO spending_limits (user_id, monthly_limit, updated_at)
-                VALUES ({placeholder}, {placeholder}, CURRENT_TIMESTAMP)
-                ON CONFLICT(user_id) DO UPDATE SET
-                    monthly_limit = excluded.monthly_limit,
-                    updated_at = CURRENT_TIMESTAMP
-            ''', (user_id, limit_amount))
+            if is_postgres:
+                cursor.execute(f'''
+                    INSERT INTO spending_limits (user_id, monthly_limit, updated_at)
+                    VALUES ({placeholder}, {placeholder}, CURRENT_TIMESTAMP)
+                    ON CONFLICT(user_id) DO UPDATE SET
+                        monthly_limit = EXCLUDED.monthly_limit,
+                        updated_at = CURRENT_TIMESTAMP
+                ''', (user_id, limit_amount))
+            else:
+                cursor.execute(f'''
+                    INSERT INTO spending_limits (user_id, monthly_limit, updated_at)
+                    VALUES ({placeholder}, {placeholder}, CURRENT_TIMESTAMP)
+                    ON CONFLICT(user_id) DO UPDATE SET
+                        monthly_limit = excluded.monthly_limit,
+                        updated_at = CURRENT_TIMESTAMP
+                ''', (user_id, limit_amount))
         
-        conn.commit()
-        return True
+            conn.commit()
+            return True
     except Exception:
         return False
-    finally:
-        conn.close()
 
 def get_monthly_limit(user_id: int) -> Optional[float]:
     """Get the monthly spending limit for a user."""
-    conn = get_db_connection()
-    try:
+    with get_db_connection() as conn:
         cursor = conn.cursor()
         placeholder = get_placeholder()
         cursor.execute(f'SELECT monthly_limit FROM spending_limits WHERE user_id = {placeholder}', (user_id,))
         result = cursor.fetchone()
         return result[0] if result else None
-    finally:
-        conn.close()
 
 def get_current_month_spending(user_id: int) -> float:
     """Get the total spending using the same calculation as view_summary."""
@@ -278,18 +278,17 @@ def create_comprehensive_dashboard(weeks_back: int = 8, user_id: Optional[int] =
     transaction_types = analyze_transaction_types(weeks_back=weeks_back)
     
     # Get recent invoices for the transactions table
-    from src.database import get_db_session, Invoice
+    from src.database import session_scope, Invoice
     # Get the 5 most recent invoices from the database (not filtered by time)
-    session = get_db_session()
-    recent_invoices_query = session.query(Invoice).order_by(Invoice.processed_at.desc()).limit(5).all()
-    recent_invoices = []
-    for inv in recent_invoices_query:
-        recent_invoices.append({
-            'shop_name': inv.shop_name,
-            'invoice_date': inv.invoice_date,
-            'total_amount': inv.total_amount
-        })
-    session.close()
+    with session_scope() as session:
+        recent_invoices_query = session.query(Invoice).order_by(Invoice.processed_at.desc()).limit(5).all()
+        recent_invoices = []
+        for inv in recent_invoices_query:
+            recent_invoices.append({
+                'shop_name': inv.shop_name,
+                'invoice_date': inv.invoice_date,
+                'total_amount': inv.total_amount
+            })
     
     # Set up the figure with a clean style
     plt.style.use('default')
@@ -3,12 +3,50 @@ pytest configuration file for the test suite.
 
 This configuration ensures that the src/ module can be properly imported
 in all test files without needing to modify sys.path in each test file.
+It also holds the QRIS payload and receipt image builders shared by tests.
 """
 
 import sys
+from io import BytesIO
 from pathlib import Path
 
+import cv2
+import numpy as np
+from PIL import Image
+
 # Add the parent directory (invoice_rag/) to the Python path
 # This allows imports like 'from src.database import ...'
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
+
+from src.qris import crc16_ccitt  # noqa: E402
+
+
+def tlv(tag, value):
+    return f"{tag}{len(value):02d}{value}"
+
+
+def qris_payload(merchant="TOKO MAJU JAYA", amount="59385.00"):
+    body = (
+        tlv("00", "01")
+        + tlv("01", "12")
+        + tlv("26", tlv("00", "ID.CO.QRIS.WWW") + tlv("01", "936000140000000001"))
+        + tlv("52", "5411")
+        + tlv("53", "360")
+        + (tlv("54", amount) if amount else "")
+        + tlv("58", "ID")
+        + tlv("59", merchant)
+        + tlv("60", "JAKARTA")
+        + "6304"
+    )
+    return body + f"{crc16_ccitt(body):04X}"
+
+
+def receipt_with_qr(payload):
+    code = cv2.QRCodeEncoder.create().encode(payload)
+    code = cv2.resize(code, None, fx=6, fy=6, interpolation=cv2.INTER_NEAREST)
+    page = np.full((1200, 800), 245, dtype=np.uint8)
+    page[700:700 + code.shape[0], 200:200 + code.shape[1]] = code
+    buffer = BytesIO()
+    Image.fromarray(page).save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
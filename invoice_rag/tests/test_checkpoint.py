@@ -0,0 +1,62 @@
+"""
+Tests for the resumable ingestion checkpoint manifest.
+The LLM stage is replaced; invoices are written to a temporary SQLite file.
+"""
+
+import sqlite3
+
+from src import database, pipeline
+from src.checkpoint import plan_pending
+
+
+def test_bulk_run_resumes_from_manifest(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "invoices.db")
+    monkeypatch.setattr(database, "get_default_db_path", lambda: db_path)
+    monkeypatch.setattr(pipeline, "get_cached_invoice", lambda *args: None)
+    monkeypatch.setattr(pipeline, "store_invoice", lambda *args: None)
+
+    image_paths = []
+    for i in range(6):
+        image_path = tmp_path / f"receipt_{i}.jpg"
+        image_path.write_bytes(b"fake image %d" % i)
+        image_paths.append(str(image_path))
+
+    calls = []
+
+    def fake_llm(image_path, base64_image=None, mime_type="image/jpeg", vendor_profile=None):
+        calls.append(image_path)
+        if image_path.endswith("receipt_2.jpg"):
+            return None
+        return {"shop_name": "Indomaret", "total_amount": 1000.0, "items": []}
+
+    monkeypatch.setattr(pipeline, "process_invoice_with_llm", fake_llm)
+
+    pending, counts = plan_pending(image_paths)
+    assert counts == {"pending": 6, "done": 0, "failed": 0}
+    report = pipeline.run_bulk(list(pending), workers=2, checkpoint=True)
+    assert report["saved"] == 5 and report["failed"] == 1
+
+    # A rerun skips saved images; failed ones only come back on request
+    pending, counts = plan_pending(image_paths)
+    assert pending == {} and counts == {"pending": 0, "done": 5, "failed": 1}
+    pending, _ = plan_pending(image_paths, retry_failed=True)
+    assert list(pending) == [image_paths[2]]
+
+    # Changed content under the same path is new work
+    (tmp_path / "receipt_0.jpg").write_bytes(b"rescanned receipt")
+    pending, _ = plan_pending(image_paths)
+    assert list(pending) == [image_paths[0]]
+
+    conn = sqlite3.connect(db_path)
+    invoice_count = conn.execute("SELECT COUNT(*) FROM invoices").fetchone()[0]
+    attempts = conn.execute(
+        "SELECT attempts, last_error FROM ingest_manifest WHERE status = 'failed'"
+    ).fetchone()
+    linked = conn.execute(
+        "SELECT COUNT(*) FROM ingest_manifest m JOIN invoices i ON i.id = m.invoice_id"
+    ).fetchone()[0]
+    conn.close()
+
+    assert invoice_count == 5 and linked == 5
+    assert attempts == (1, "extraction failed")
+    assert len(calls) == 6
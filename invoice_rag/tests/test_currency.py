@@ -0,0 +1,41 @@
+"""
+Tests for the currency normalization engine.
+The golden corpus was generated from the original regex parser
+(benchmarks/bench_currency.py --write-golden).
+"""
+
+import json
+from pathlib import Path
+
+from src.currency import parse_currency, parse_currency_batch
+from src.processor import parse_indonesian_currency
+
+GOLDEN_PATH = Path(__file__).parent / "data" / "currency_golden.json"
+
+
+def load_golden():
+    with open(GOLDEN_PATH, encoding="utf-8") as golden_file:
+        return json.load(golden_file)
+
+
+def test_matches_golden_corpus():
+    cases = load_golden()
+    values = [value for value, _ in cases]
+    expected = [result for _, result in cases]
+
+    assert len(cases) > 4000
+    assert parse_currency_batch(values) == expected
+    assert [parse_indonesian_currency(value) for value in values] == expected
+
+
+def test_examples_and_range_warnings(capsys):
+    assert parse_currency("59.385") == 59385.0
+    assert parse_currency("59.385,50") == 59385.5
+    assert parse_currency("RP 500,000.00") == 500000.0
+    assert parse_currency("Rp136.000") == 136000.0
+
+    assert parse_currency("20000-60000") == 0.0
+    assert parse_currency("1-2-3") == 0.0
+    output = capsys.readouterr().out
+    assert "Invalid range format detected: '20000-60000'" in output
+    assert "Suspicious range format detected: '1-2-3'" in output
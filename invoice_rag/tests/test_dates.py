@@ -0,0 +1,54 @@
+"""
+Tests for the shared date normalization module.
+parse_date() must agree with the strptime formats analysis used to try in turn.
+"""
+
+import itertools
+from datetime import date, datetime
+
+from src.dates import normalize_date_string, parse_date
+
+STRPTIME_FORMATS = ["%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%Y-%m-%d", "%d/%m/%y", "%d-%m-%y"]
+
+
+def strptime_reference(value):
+    for fmt in STRPTIME_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def test_parse_date_matches_strptime():
+    fields = ["1", "01", "5", " 5", "12", "13", "29", "30", "31", "32", "00", "24", "69", "2024", "1999", "20245"]
+    values = [
+        sep.join(parts)
+        for sep in "/-."
+        for parts in itertools.product(fields, repeat=3)
+    ]
+    values += ["", "2024-01-05", "2024-02-30", "2024-1-5", "2023-02-29", "31/02/2024", "not a date", "2024-01-05 "]
+
+    for value in values:
+        assert parse_date(value) == strptime_reference(value), value
+
+
+def test_parse_date_accepts_date_objects():
+    assert parse_date(None) is None
+    assert parse_date(date(2024, 3, 1)) == datetime(2024, 3, 1)
+    assert parse_date(datetime(2024, 3, 1, 10, 30)) == datetime(2024, 3, 1, 10, 30)
+
+
+def test_normalize_date_string():
+    assert normalize_date_string("2024-12-25") == "2024-12-25"
+    assert normalize_date_string("25/12/2024") == "2024-12-25"
+    assert normalize_date_string("Tanggal: 25.12.2024 10:31") == "2024-12-25"
+    assert normalize_date_string("2024/12/25") == "2024-12-25"
+    assert normalize_date_string("2024-13-45") == "2024-13-45"
+    assert normalize_date_string("kemarin") == "kemarin"
+
+
+def test_normalize_date_string_keeps_malformed_iso_shapes():
+    # Ten characters with dashes at 4 and 7 but not three digit groups
+    for value in ("2024-12-1-", "2024-1--05", "2024--1-05", "-024-12-05", "2024-12-+5", "2024-1 -05"):
+        assert normalize_date_string(value) == value
@@ -0,0 +1,60 @@
+"""
+Tests for the process-wide engine registry and session helpers.
+"""
+
+import threading
+
+import pytest
+
+from src import database, db_config
+from src.database import Invoice, get_db_session, get_scoped_db_session, session_scope
+
+
+def test_sessions_share_one_engine_and_create_schema_once(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "invoices.db")
+    create_all_calls = []
+    original_create_all = database.Base.metadata.create_all
+    monkeypatch.setattr(
+        database.Base.metadata,
+        "create_all",
+        lambda engine: create_all_calls.append(engine) or original_create_all(engine),
+    )
+
+    first, second = get_db_session(db_path), get_db_session(db_path)
+    try:
+        assert first is not second
+        assert first.get_bind() is second.get_bind() is db_config.get_engine(f"sqlite:///{db_path}")
+        assert len(create_all_calls) == 1
+    finally:
+        first.close()
+        second.close()
+
+
+def test_session_scope_commits_or_rolls_back(tmp_path):
+    db_path = str(tmp_path / "invoices.db")
+
+    with session_scope(db_path) as session:
+        session.add(Invoice(shop_name="Indomaret", total_amount=59385.0))
+
+    with pytest.raises(RuntimeError):
+        with session_scope(db_path) as session:
+            session.add(Invoice(shop_name="Alfamart", total_amount=25500.0))
+            session.flush()
+            raise RuntimeError("handler failed")
+
+    with session_scope(db_path) as session:
+        assert [invoice.shop_name for invoice in session.query(Invoice)] == ["Indomaret"]
+
+
+def test_scoped_session_is_per_thread(tmp_path):
+    sessions = get_scoped_db_session(str(tmp_path / "invoices.db"))
+    other = []
+    thread = threading.Thread(target=lambda: other.append(sessions()) or sessions.remove())
+    thread.start()
+    thread.join()
+
+    try:
+        assert sessions() is sessions()
+        assert other[0] is not sessions()
+    finally:
+        sessions.remove()
@@ -0,0 +1,65 @@
+"""
+Tests for perceptual-hash near-duplicate detection.
+"""
+
+from io import BytesIO
+
+from PIL import Image, ImageDraw
+
+from src.image_hash import (
+    DEDUP_MAX_DISTANCE,
+    compute_phash,
+    find_near_duplicate,
+    hamming_distance,
+    record_image_hash,
+)
+
+LINES = [200, 120, 250, 90, 180, 240, 60, 210, 150, 100]
+
+
+def receipt_photo(lines, size=(600, 900), quality=90):
+    image = Image.new("RGB", size, (90, 70, 60))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((150, 50, 450, 850), fill=(240, 240, 235))
+    for row, width in enumerate(lines):
+        draw.rectangle((170, 80 + row * 40, 170 + width, 100 + row * 40), fill=(30, 30, 30))
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def recompress(image_bytes, quality):
+    buffer = BytesIO()
+    Image.open(BytesIO(image_bytes)).save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def test_resent_photo_is_near_duplicate():
+    photo = receipt_photo(LINES)
+    original = compute_phash(photo)
+
+    assert hamming_distance(original, compute_phash(recompress(photo, 60))) <= DEDUP_MAX_DISTANCE
+    assert hamming_distance(original, compute_phash(receipt_photo(LINES, quality=40))) <= DEDUP_MAX_DISTANCE
+    assert compute_phash(b"not an image") is None
+
+
+def test_same_layout_receipts_are_not_duplicates():
+    # Same photo size, same paper and row layout, different line contents
+    original = compute_phash(receipt_photo(LINES))
+    reordered = compute_phash(receipt_photo(list(reversed(LINES))))
+    swapped = compute_phash(receipt_photo(LINES[:3] + [LINES[4], LINES[3]] + LINES[5:]))
+
+    assert hamming_distance(original, reordered) > DEDUP_MAX_DISTANCE
+    assert hamming_distance(original, swapped) > DEDUP_MAX_DISTANCE
+
+
+def test_lookup_is_scoped_to_user(tmp_path):
+    db_path = str(tmp_path / "invoices.db")
+    record_image_hash("user-1", 0b1011, invoice_id=7, db_path=db_path)
+    record_image_hash("user-1", (1 << 256) - 1, invoice_id=8, db_path=db_path)
+
+    match = find_near_duplicate("user-1", 0b1001, db_path=db_path)
+    assert match["invoice_id"] == 7 and match["distance"] == 1
+    assert find_near_duplicate("user-1", (1 << 256) - 2, db_path=db_path)["invoice_id"] == 8
+    assert find_near_duplicate("user-2", 0b1011, db_path=db_path) is None
+
@@ -0,0 +1,52 @@
+"""
+Tests for the image downscale/recompress stage.
+"""
+
+from io import BytesIO
+
+from PIL import Image
+
+from src.image_preprocess import get_preprocess_config, preprocess_image_bytes
+
+
+def make_jpeg(width, height, exif=None):
+    buffer = BytesIO()
+    image = Image.new("RGB", (width, height), (200, 180, 160))
+    if exif is not None:
+        image.save(buffer, format="JPEG", quality=95, exif=exif)
+    else:
+        image.save(buffer, format="JPEG", quality=95)
+    return buffer.getvalue()
+
+
+def test_caps_longest_edge_and_byte_budget():
+    config = dict(get_preprocess_config(), enabled=True, max_edge=1000, max_bytes=50_000)
+    prepared, mime_type = preprocess_image_bytes(make_jpeg(3000, 4000), config)
+
+    image = Image.open(BytesIO(prepared))
+    assert max(image.size) == 1000
+    assert len(prepared) <= 50_000
+    assert mime_type == "image/jpeg"
+
+
+def test_exif_orientation_and_webp_grayscale():
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotated 90 degrees
+    config = dict(
+        get_preprocess_config(), enabled=True, max_edge=2000, grayscale=True, format="WEBP"
+    )
+    prepared, mime_type = preprocess_image_bytes(make_jpeg(400, 200, exif), config)
+
+    image = Image.open(BytesIO(prepared))
+    assert image.size == (200, 400)
+    red, green, blue = image.convert("RGB").getpixel((100, 200))
+    assert red == green == blue
+    assert mime_type == "image/webp"
+
+
+def test_undecodable_or_disabled_returns_original():
+    config = dict(get_preprocess_config(), enabled=True)
+    assert preprocess_image_bytes(b"not an image", config) == (b"not an image", "image/jpeg")
+
+    raw = make_jpeg(3000, 4000)
+    assert preprocess_image_bytes(raw, dict(config, enabled=False))[0] is raw
@@ -0,0 +1,56 @@
+"""
+Tests for the local image quality gate that runs before the LLM call.
+"""
+
+from io import BytesIO
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from src import processor
+from src.image_quality import assess_image_quality, get_quality_stats
+
+
+def receipt_photo(size=(1200, 800), background=235, ink=30, blur=0):
+    page = np.full(size, background, dtype=np.uint8)
+    for row, y in enumerate(range(60, size[0] - 60, 40)):
+        cv2.putText(page, f"ITEM {row:02d}   2 x 12.500   25.000", (40, y),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, ink, 2)
+    if blur:
+        page = cv2.GaussianBlur(page, (0, 0), blur)
+    buffer = BytesIO()
+    Image.fromarray(page).save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def test_sharp_receipt_passes():
+    quality = assess_image_quality(receipt_photo())
+    assert quality["ok"], quality
+    assert quality["reasons"] == []
+
+
+def test_rejects_blurry_dark_and_small_photos():
+    assert assess_image_quality(receipt_photo(blur=6))["reasons"] == ["blurry"]
+    assert "too_dark" in assess_image_quality(receipt_photo(background=20, ink=5))["reasons"]
+    assert "too_small" in assess_image_quality(receipt_photo(size=(240, 160)))["reasons"]
+    assert assess_image_quality(b"not an image") is None  # left to preprocessing
+
+
+def test_thresholds_come_from_environment(monkeypatch):
+    image_bytes = receipt_photo(blur=6)
+    monkeypatch.setenv("QUALITY_MIN_SHARPNESS", "0")
+    assert assess_image_quality(image_bytes)["ok"]
+
+
+def test_process_invoice_skips_llm_for_rejected_photo(tmp_path, monkeypatch):
+    monkeypatch.setenv("OCR_CACHE_PATH", str(tmp_path / "cache.db"))
+
+    def fail_llm(*args, **kwargs):
+        raise AssertionError("LLM should not be called for a rejected photo")
+
+    monkeypatch.setattr(processor, "process_invoice_with_llm", fail_llm)
+    before = get_quality_stats()["llm_calls_saved"]
+
+    assert processor.process_invoice(receipt_photo(blur=6)) is None
+    assert get_quality_stats()["llm_calls_saved"] == before + 1
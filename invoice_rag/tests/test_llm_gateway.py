@@ -0,0 +1,151 @@
+"""
+Tests for the shared LLM gateway (retry, backoff and counters) using a fake client.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from groq import BadRequestError, InternalServerError, RateLimitError
+
+from src import llm_gateway
+
+
+def api_error(error_class, status_code):
+    request = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+    response = httpx.Response(status_code, request=request, headers={"retry-after": "0"})
+    return error_class("error", response=response, body=None)
+
+
+def fake_client(outcomes, is_async=False):
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    async def async_create(**kwargs):
+        return create(**kwargs)
+
+    completions = SimpleNamespace(create=async_create if is_async else create)
+    return SimpleNamespace(chat=SimpleNamespace(completions=completions)), calls
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(llm_gateway, "LLM_BACKOFF_BASE", 0.0)
+    monkeypatch.setattr(llm_gateway, "LLM_MAX_RETRIES", 2)
+
+
+def test_retries_rate_limit_then_succeeds(monkeypatch):
+    client, calls = fake_client([api_error(RateLimitError, 429), "ok"])
+    monkeypatch.setattr(llm_gateway, "_sync_client", client)
+    before = llm_gateway.get_gateway_stats()
+
+    assert llm_gateway.chat_completion(model="m", messages=[]) == "ok"
+
+    after = llm_gateway.get_gateway_stats()
+    assert len(calls) == 2
+    assert after["retries"] - before["retries"] == 1
+    assert after["status_counts"]["rate_limited"] >= 1
+    assert after["in_flight"] == 0
+
+
+def test_client_errors_are_not_retried(monkeypatch):
+    client, calls = fake_client([api_error(BadRequestError, 400)])
+    monkeypatch.setattr(llm_gateway, "_sync_client", client)
+
+    with pytest.raises(BadRequestError):
+        llm_gateway.chat_completion(model="m", messages=[])
+    assert len(calls) == 1
+
+
+def test_async_gives_up_after_max_retries(monkeypatch):
+    errors = [api_error(InternalServerError, 503) for _ in range(3)]
+    client, calls = fake_client(errors, is_async=True)
+    monkeypatch.setattr(llm_gateway, "get_async_client", lambda: client)
+
+    with pytest.raises(InternalServerError):
+        asyncio.run(llm_gateway.async_chat_completion(model="m", messages=[]))
+    assert len(calls) == 3
+
+
+def test_stream_holds_its_slot_until_consumed(monkeypatch):
+    monkeypatch.setattr(llm_gateway, "_slots", llm_gateway._SlotPool(1))
+    client, _ = fake_client([iter(["a", "b"]), iter(["c", "d"])])
+    monkeypatch.setattr(llm_gateway, "_sync_client", client)
+    before = llm_gateway.get_gateway_stats()
+
+    stream = llm_gateway.chat_completion(model="m", messages=[], stream=True)
+    assert llm_gateway.get_gateway_stats()["in_flight"] == before["in_flight"] + 1
+    assert list(stream) == ["a", "b"]
+    assert llm_gateway.get_gateway_stats()["calls"] == before["calls"] + 1
+
+    # Closing early also gives the slot back (the pool has only one)
+    llm_gateway.chat_completion(model="m", messages=[], stream=True).close()
+    assert llm_gateway.get_gateway_stats()["in_flight"] == before["in_flight"]
+
+
+def test_async_slots_are_granted_in_order_and_survive_cancellation(monkeypatch):
+    slots = llm_gateway._SlotPool(1)
+    order = []
+
+    async def waiter(name):
+        await slots.acquire_async()
+        order.append(name)
+        await asyncio.sleep(0)
+        slots.release()
+
+    async def main():
+        await slots.acquire_async()
+        tasks = [asyncio.create_task(waiter(name)) for name in ("first", "cancelled", "last")]
+        await asyncio.sleep(0)
+        tasks[1].cancel()
+        slots.release()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run(main())
+    assert order == ["first", "last"]
+    assert slots._free == 1 and not slots._waiters
+
+
+def test_each_event_loop_gets_its_own_async_client(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+
+    async def clients():
+        return llm_gateway.get_async_client(), llm_gateway.get_async_client()
+
+    first, again = asyncio.run(clients())
+    second, _ = asyncio.run(clients())
+    assert first is again
+    assert first is not second
+
+
+def test_async_stream_holds_its_slot_until_consumed(monkeypatch):
+    monkeypatch.setattr(llm_gateway, "_slots", llm_gateway._SlotPool(1))
+
+    async def chunks():
+        for chunk in ("a", "b"):
+            yield chunk
+
+    client, _ = fake_client([chunks()], is_async=True)
+    monkeypatch.setattr(llm_gateway, "get_async_client", lambda: client)
+
+    async def consume():
+        stream = await llm_gateway.async_chat_completion(model="m", messages=[], stream=True)
+        held = llm_gateway._slots._free
+        return held, [chunk async for chunk in stream], llm_gateway._slots._free
+
+    assert asyncio.run(consume()) == (0, ["a", "b"], 1)
+
+
+def test_async_stream_rejects_sync_context_manager():
+    stream = llm_gateway._AsyncHeldStream(iter([]), 0.0)
+    stream._held = False  # not backed by a real slot
+    with pytest.raises(TypeError):
+        with stream:
+            pass
@@ -0,0 +1,80 @@
+"""
+Tests for validation-driven OCR model routing.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from src import model_router, processor
+
+
+def test_escalation_reasons():
+    good = {"total_amount": 30000.0, "items": [{"total_price": 12000.0}, {"total_price": 15000.0}]}
+    assert model_router.escalation_reason(good) is None  # within tax/discount tolerance
+    assert model_router.escalation_reason(None) == "validation_failed"
+    assert model_router.escalation_reason({"total_amount": 0.0, "items": []}) == "total_rejected"
+    assert (
+        model_router.escalation_reason({"total_amount": 30000.0, "items": [{"total_price": 3000.0}]})
+        == "item_sum_mismatch"
+    )
+
+
+def test_routing_escalates_only_rejected_results(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    monkeypatch.setenv("OCR_ROUTING_ENABLED", "true")
+    monkeypatch.setenv("OCR_FAST_MODEL", "fast-test-model")
+    monkeypatch.setenv("OCR_STRONG_MODEL", "strong-test-model")
+    monkeypatch.setenv("OCR_FOLLOW_UP_ENABLED", "false")  # only routing calls below
+    monkeypatch.setattr(model_router, "_model_stats", {})
+    replies = {
+        "fast-test-model": ['{"shop_name": "Indomaret", "total_amount": "20000-60000"}',
+                            '{"shop_name": "Indomaret", "total_amount": "59.385"}'],
+        "strong-test-model": ['{"shop_name": "Indomaret", "total_amount": "45.000"}'],
+    }
+    calls = []
+
+    def completion(**kwargs):
+        calls.append(kwargs["model"])
+        message = SimpleNamespace(content=replies[kwargs["model"]].pop(0))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    from src import llm_gateway
+
+    monkeypatch.setattr(llm_gateway, "chat_completion", completion)
+
+    escalated = processor.process_invoice_with_llm(b"photo", base64_image="x")
+    accepted = processor.process_invoice_with_llm(b"photo", base64_image="x")
+
+    assert escalated["total_amount"] == 45000.0 and accepted["total_amount"] == 59385.0
+    assert calls == ["fast-test-model", "strong-test-model", "fast-test-model"]
+    assert processor.get_cache_model() == "route:fast-test-model>strong-test-model"
+
+    stats = model_router.get_router_stats()
+    assert stats["fast-test-model"]["calls"] == 2
+    assert stats["fast-test-model"]["escalation_rate"] == 0.5
+    assert stats["fast-test-model"]["rejection_reasons"] == {"total_rejected": 1}
+    assert stats["strong-test-model"]["success_rate"] == 1.0
+
+
+def test_failed_escalation_keeps_the_fast_result(monkeypatch):
+    monkeypatch.setenv("OCR_FAST_MODEL", "fast-test-model")
+    monkeypatch.setenv("OCR_STRONG_MODEL", "strong-test-model")
+    monkeypatch.setattr(model_router, "_model_stats", {})
+    flagged = {"shop_name": "Indomaret", "total_amount": 30000.0, "items": [{"total_price": 3000.0}]}
+    results = {"fast-test-model": flagged, "strong-test-model": None}  # e.g. 429s or a timeout
+    calls = []
+
+    def extract(image, model):
+        calls.append(model)
+        return results[model]
+
+    assert model_router.route_extraction(extract, b"photo") is flagged
+    assert calls == ["fast-test-model", "strong-test-model"]
+
+    async def async_extract(image, model):
+        return results[model]
+
+    assert asyncio.run(model_router.async_route_extraction(async_extract, b"photo")) is flagged
+
+    results["fast-test-model"] = None
+    assert model_router.route_extraction(extract, b"photo") is None
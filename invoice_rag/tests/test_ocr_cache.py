@@ -0,0 +1,72 @@
+"""
+Tests for the content-addressed OCR result cache.
+"""
+
+import time
+
+from src import ocr_cache, processor
+
+INVOICE = {
+    "shop_name": "Alfamart",
+    "invoice_date": "2025-01-15",
+    "total_amount": 25500.0,
+    "transaction_type": "retail",
+    "items": [{"name": "Teh Botol", "quantity": 1, "unit_price": 25500.0, "total_price": 25500.0}],
+}
+
+
+def test_cache_roundtrip_keyed_by_hash_model_and_prompt(tmp_path, monkeypatch):
+    monkeypatch.setenv("OCR_CACHE_PATH", str(tmp_path / "cache.db"))
+    image_hash = ocr_cache.hash_image_bytes(b"receipt bytes")
+    before = ocr_cache.get_cache_stats()
+
+    assert ocr_cache.get_cached_invoice(image_hash, "model-a", "v1") is None
+    ocr_cache.store_invoice(image_hash, "model-a", "v1", INVOICE)
+
+    assert ocr_cache.get_cached_invoice(image_hash, "model-a", "v1") == INVOICE
+    assert ocr_cache.get_cached_invoice(image_hash, "model-b", "v1") is None
+    assert ocr_cache.get_cached_invoice(image_hash, "model-a", "v2") is None
+
+    after = ocr_cache.get_cache_stats()
+    assert after["hits"] - before["hits"] == 1
+    assert after["misses"] - before["misses"] == 3
+    assert after["entries"] == 1
+
+
+def test_cache_evicts_least_recently_used(tmp_path, monkeypatch):
+    monkeypatch.setenv("OCR_CACHE_PATH", str(tmp_path / "cache.db"))
+    monkeypatch.setenv("OCR_CACHE_MAX_ENTRIES", "2")
+
+    ocr_cache.store_invoice("a", "m", "v1", INVOICE)
+    time.sleep(0.01)
+    ocr_cache.store_invoice("b", "m", "v1", INVOICE)
+    time.sleep(0.01)
+    assert ocr_cache.get_cached_invoice("a", "m", "v1") == INVOICE  # "b" is now LRU
+    time.sleep(0.01)
+    ocr_cache.store_invoice("c", "m", "v1", INVOICE)
+
+    assert ocr_cache.get_cached_invoice("a", "m", "v1") == INVOICE
+    assert ocr_cache.get_cached_invoice("b", "m", "v1") is None
+    assert ocr_cache.get_cached_invoice("c", "m", "v1") == INVOICE
+
+
+def test_cache_expires_old_entries(tmp_path, monkeypatch):
+    monkeypatch.setenv("OCR_CACHE_PATH", str(tmp_path / "cache.db"))
+    monkeypatch.setenv("OCR_CACHE_TTL_DAYS", "0")
+
+    ocr_cache.store_invoice("a", "m", "v1", INVOICE)
+    time.sleep(0.01)
+    assert ocr_cache.get_cached_invoice("a", "m", "v1") is None
+
+
+def test_cache_version_follows_image_settings(monkeypatch):
+    monkeypatch.setenv("IMAGE_MAX_EDGE", "1600")
+    version = processor.get_cache_version()
+    assert version.startswith(processor.get_prompt_version())
+    assert processor.get_cache_version() == version
+
+    monkeypatch.setenv("IMAGE_MAX_EDGE", "2048")
+    assert processor.get_cache_version() != version
+    monkeypatch.setenv("IMAGE_MAX_EDGE", "1600")
+    monkeypatch.setenv("TILE_MIN_WIDTH", "500")
+    assert processor.get_cache_version() != version
@@ -0,0 +1,82 @@
+"""
+Tests for the concurrent bulk ingestion pipeline.
+The LLM and database stages are replaced so no API key or DB writes are needed.
+"""
+
+from src import pipeline
+from src.metrics import percentile
+
+
+def test_percentile():
+    values = [0.1 * i for i in range(1, 101)]
+    assert percentile([], 50) == 0.0
+    assert round(percentile(values, 50), 2) == 5.0
+    assert round(percentile(values, 95), 2) == 9.5
+
+
+def test_run_bulk_saves_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setenv("OCR_CACHE_PATH", str(tmp_path / "ocr_cache.db"))
+    image_paths = []
+    for i in range(10):
+        image_path = tmp_path / f"receipt_{i}.jpg"
+        image_path.write_bytes(b"fake image %d" % i)
+        image_paths.append(str(image_path))
+    image_paths.append(str(tmp_path / "missing.jpg"))
+
+    def fake_llm(image_path, base64_image=None, mime_type="image/jpeg", vendor_profile=None):
+        if image_path.endswith("receipt_3.jpg"):
+            return None
+        return {"shop_name": "Indomaret", "total_amount": 1000.0, "items": []}
+
+    saved_batches = []
+
+    def fake_save(records):
+        saved_batches.append(records)
+        return list(range(len(records)))
+
+    monkeypatch.setattr(pipeline, "process_invoice_with_llm", fake_llm)
+    monkeypatch.setattr(pipeline, "save_many_to_database", fake_save)
+
+    report = pipeline.run_bulk(image_paths, workers=3, max_inflight=4)
+
+    assert report["processed"] == 11
+    assert report["saved"] == 9
+    assert report["failed"] == 2
+    assert report["cache_hits"] == 0
+    assert report["total_amount"] == 9000.0
+    assert sum(len(batch) for batch in saved_batches) == 9
+
+
+def test_run_bulk_survives_an_image_that_raises(tmp_path, monkeypatch):
+    monkeypatch.setenv("OCR_CACHE_PATH", str(tmp_path / "ocr_cache.db"))
+    image_paths = []
+    for i in range(12):
+        image_path = tmp_path / f"receipt_{i}.jpg"
+        image_path.write_bytes(b"fake image %d" % i)
+        image_paths.append(str(image_path))
+
+    def fake_llm(image_path, base64_image=None, mime_type="image/jpeg", vendor_profile=None):
+        if image_path.endswith("receipt_5.jpg"):
+            raise ValueError("decode error")
+        return {"shop_name": "Indomaret", "total_amount": 1000.0, "items": []}
+
+    def fake_tiles(image_bytes):
+        if image_bytes == b"fake image 7":
+            raise OSError("truncated image")
+        return [("eA==", "image/jpeg")]
+
+    failed = []
+    monkeypatch.setattr(pipeline, "process_invoice_with_llm", fake_llm)
+    monkeypatch.setattr(pipeline, "prepare_image_tiles", fake_tiles)
+    monkeypatch.setattr(
+        pipeline, "save_many_to_database", lambda records, content_hashes=None: list(range(len(records)))
+    )
+    monkeypatch.setattr(pipeline, "mark_failed", lambda image_path, image_hash, error: failed.append(image_path))
+    monkeypatch.setattr(pipeline, "WRITE_BATCH_TIMEOUT", 0.05)
+
+    # A single slot: a leaked slot would block discovery of the next image
+    report = pipeline.run_bulk(image_paths, workers=1, max_inflight=1, checkpoint=True)
+
+    assert report["saved"] == 10
+    assert report["failed"] == 2
+    assert sorted(failed) == [image_paths[5], image_paths[7]]
@@ -0,0 +1,248 @@
+"""
+Tests for src.processor that do not need a Groq API key.
+"""
+
+import os
+from io import BytesIO
+
+from src import processor
+from src.ocr_cache import hash_image_bytes
+
+INVOICE = {
+    "shop_name": "Indomaret",
+    "invoice_date": "2025-01-15",
+    "total_amount": 59385.0,
+    "items": [],
+}
+
+
+def test_process_invoice_accepts_bytes_and_buffers(tmp_path, monkeypatch):
+    monkeypatch.setenv("OCR_CACHE_PATH", str(tmp_path / "cache.db"))
+    calls = []
+
+    def fake_llm(image, base64_image=None, mime_type="image/jpeg", vendor_profile=None):
+        calls.append(image)
+        return dict(INVOICE)
+
+    monkeypatch.setattr(processor, "process_invoice_with_llm", fake_llm)
+
+    first = processor.process_invoice(b"receipt photo bytes")
+    second = processor.process_invoice(BytesIO(b"receipt photo bytes"))
+
+    assert first["total_amount"] == second["total_amount"] == 59385.0
+    assert len(calls) == 1  # the identical buffer is answered from the OCR cache
+    assert not list(tmp_path.glob("temp_*"))
+
+
+def test_archive_image_is_content_addressed(tmp_path, monkeypatch):
+    monkeypatch.delenv("INVOICE_ARCHIVE_DIR", raising=False)
+    assert processor.archive_image(b"photo") is None
+
+    monkeypatch.setenv("INVOICE_ARCHIVE_DIR", str(tmp_path / "archive"))
+    first = processor.archive_image(b"photo")
+    second = processor.archive_image(b"photo")
+
+    assert first == second
+    assert os.path.basename(first).startswith(hash_image_bytes(b"photo"))
+    with open(first, "rb") as archived:
+        assert archived.read() == b"photo"
+
+
+
+def fake_completion(content):
+    from types import SimpleNamespace
+
+    message = SimpleNamespace(content=content)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def test_async_extractions_run_concurrently(tmp_path, monkeypatch):
+    import asyncio
+    import json
+    import time
+
+    from src import llm_gateway
+
+    monkeypatch.setenv("OCR_CACHE_PATH", str(tmp_path / "cache.db"))
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+
+    async def slow_completion(**kwargs):
+        await asyncio.sleep(0.2)
+        return fake_completion(json.dumps({"shop_name": "Alfamart", "total_amount": "25.500"}))
+
+    monkeypatch.setattr(llm_gateway, "async_chat_completion", slow_completion)
+
+    async def run_many():
+        return await asyncio.gather(
+            *(processor.async_process_invoice(b"photo %d" % i) for i in range(5))
+        )
+
+    started = time.perf_counter()
+    results = asyncio.run(run_many())
+
+    assert time.perf_counter() - started < 0.8
+    assert [r["total_amount"] for r in results] == [25500.0] * 5
+
+
+def test_async_extraction_timeout_cancels(tmp_path, monkeypatch):
+    import asyncio
+
+    from src import llm_gateway
+
+    monkeypatch.setenv("OCR_CACHE_PATH", str(tmp_path / "cache.db"))
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    cancelled = []
+
+    async def hanging_completion(**kwargs):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    monkeypatch.setattr(llm_gateway, "async_chat_completion", hanging_completion)
+
+    assert asyncio.run(processor.async_process_invoice(b"photo", timeout=0.1)) is None
+    assert cancelled == [True]
+
+
+def test_compact_output_decodes_and_falls_back_to_verbose(monkeypatch):
+    import json
+
+    from src import llm_gateway
+
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    monkeypatch.setenv("OCR_OUTPUT_FORMAT", "compact")
+    compact = {"s": "Alfamart", "d": "15/01/2025", "t": "25.500", "i": [["Teh Botol", 2, "12.750", "25.500"]]}
+    verbose = {
+        "shop_name": "Alfamart",
+        "invoice_date": "2025-01-15",
+        "total_amount": "25.500",
+        "items": [{"name": "Teh Botol", "quantity": 2, "unit_price": "12.750", "total_price": "25.500"}],
+    }
+    replies = [json.dumps(compact)]
+    prompts = []
+
+    def completion(**kwargs):
+        prompts.append(kwargs["messages"][0]["content"][0]["text"])
+        return fake_completion(replies.pop(0))
+
+    monkeypatch.setattr(llm_gateway, "chat_completion", completion)
+
+    from_compact = processor.process_invoice_with_llm(b"photo", base64_image="x")
+    assert from_compact.pop("_llm")["responses"][0]["content"] == json.dumps(compact)
+    assert prompts == [processor.COMPACT_EXTRACTION_PROMPT]
+    assert from_compact == processor.parse_invoice_response(json.dumps(verbose))
+    assert processor.get_prompt_version() == f"{processor.PROMPT_VERSION}-compact"
+
+    # Undecodable compact output is retried once with the verbose schema
+    replies[:] = [json.dumps({"s": "Alfamart", "i": "oops"}), json.dumps(verbose)]
+    prompts.clear()
+    from_verbose = processor.process_invoice_with_llm(b"photo", base64_image="x")
+    assert [r["output_format"] for r in from_verbose.pop("_llm")["responses"]] == ["compact", "verbose"]
+    assert from_verbose == from_compact
+    assert prompts == [processor.COMPACT_EXTRACTION_PROMPT, processor.EXTRACTION_PROMPT]
+
+
+def test_streamed_extraction_reports_partial_results(tmp_path, monkeypatch):
+    import asyncio
+    import json
+    from types import SimpleNamespace
+
+    from src import llm_gateway
+
+    monkeypatch.setenv("OCR_CACHE_PATH", str(tmp_path / "cache.db"))
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    content = json.dumps(
+        {
+            "shop_name": "Alfamart",
+            "invoice_date": "2025-01-15",
+            "total_amount": "25.500",
+            "items": [{"name": "Teh Botol", "quantity": 1, "total_price": "25.500"}] * 3,
+        }
+    )
+
+    async def chunks():
+        for start in range(0, len(content), 10):
+            delta = SimpleNamespace(content=content[start:start + 10])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+    async def streaming_completion(**kwargs):
+        assert kwargs["stream"] is True
+        return chunks()
+
+    monkeypatch.setattr(llm_gateway, "async_chat_completion", streaming_completion)
+    partials = []
+
+    async def on_partial(partial):
+        partials.append(partial)
+
+    result = asyncio.run(processor.async_process_invoice(b"streamed photo", on_partial=on_partial))
+
+    assert result["total_amount"] == 25500.0 and len(result["items"]) == 3
+    assert partials[0] == {"shop_name": "Alfamart"}
+    assert {"shop_name": "Alfamart", "invoice_date": "2025-01-15", "total_amount": 25500.0} in partials
+    assert partials[-1]["items_so_far"] == 3
+
+
+def test_missing_fields_are_reread_with_a_short_follow_up(monkeypatch):
+    import json
+
+    from src import llm_gateway
+
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    replies = [
+        json.dumps({"shop_name": "Alfamart", "total_amount": "20000-60000", "items": []}),
+        json.dumps({"invoice_date": "15/01/2025", "total_amount": "25.500"}),
+    ]
+    requests = []
+
+    def completion(**kwargs):
+        requests.append(kwargs)
+        return fake_completion(replies.pop(0))
+
+    monkeypatch.setattr(llm_gateway, "chat_completion", completion)
+
+    invoice = processor.process_invoice_with_llm(b"photo", base64_image="x")
+
+    assert invoice["total_amount"] == 25500.0
+    assert invoice["invoice_date"] == "2025-01-15"
+    follow_up = requests[1]
+    assert follow_up["max_completion_tokens"] < requests[0]["max_completion_tokens"]
+    prompt = follow_up["messages"][0]["content"][0]["text"]
+    assert '"invoice_date"' in prompt and '"total_amount"' in prompt and '"shop_name"' not in prompt
+
+    # A shop name that cannot be recovered still fails the extraction
+    replies[:] = [json.dumps({"total_amount": "25.500"}), json.dumps({"shop_name": None})]
+    assert processor.process_invoice_with_llm(b"photo", base64_image="x") is None
+
+    # So does a total, instead of being saved as 0
+    replies[:] = [json.dumps({"shop_name": "Alfamart"}), json.dumps({"total_amount": None})]
+    assert processor.process_invoice_with_llm(b"photo", base64_image="x") is None
+
+
+def test_missing_date_alone_is_not_followed_up_by_default(monkeypatch):
+    import json
+
+    from src import llm_gateway
+
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    replies = [json.dumps({"shop_name": "Alfamart", "total_amount": "25.500", "items": []})]
+    requests = []
+
+    def completion(**kwargs):
+        requests.append(kwargs)
+        return fake_completion(replies.pop(0))
+
+    monkeypatch.setattr(llm_gateway, "chat_completion", completion)
+
+    invoice = processor.process_invoice_with_llm(b"photo", base64_image="x")
+    assert invoice["invoice_date"] is None and len(requests) == 1
+
+    monkeypatch.setenv("OCR_FOLLOW_UP_DATE", "true")
+    replies[:] = [
+        json.dumps({"shop_name": "Alfamart", "total_amount": "25.500"}),
+        json.dumps({"invoice_date": "2025-01-15"}),
+    ]
+    assert processor.process_invoice_with_llm(b"photo", base64_image="x")["invoice_date"] == "2025-01-15"
+    assert len(requests) == 3
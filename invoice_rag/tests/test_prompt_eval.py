@@ -0,0 +1,85 @@
+"""
+Tests for the prompt evaluation harness (recorded-response backend).
+"""
+
+import json
+
+from PIL import Image
+
+from src.prompt_eval import (
+    get_prompt_variants,
+    load_corpus,
+    load_recordings,
+    record_backend,
+    replay_backend,
+    run_eval,
+    summarize,
+)
+
+ANSWERS = {
+    "verbose": json.dumps({
+        "shop_name": "Indomaret", "invoice_date": "2025-01-15", "total_amount": "59.385",
+        "items": [{"name": "Aqua", "quantity": 1, "unit_price": "3.500", "total_price": "3.500"}],
+    }),
+    "compact": json.dumps({"s": "Indomaret", "d": "15/01/2025", "t": "59.385", "i": []}),
+}
+
+
+def make_corpus(tmp_path):
+    for name in ("a.jpg", "b.jpg"):
+        Image.new("RGB", (300, 600), (240, 240, 240)).save(tmp_path / name)
+    labels = {
+        "a.jpg": {"total_amount": 59385, "invoice_date": "2025-01-15", "item_count": 1},
+        "b.jpg": {"total_amount": 10000, "invoice_date": "2025-01-15", "item_count": 1},
+    }
+    (tmp_path / "labels.json").write_text(json.dumps(labels))
+    return load_corpus(str(tmp_path))
+
+
+def test_record_then_replay_reports_tokens_latency_and_accuracy(tmp_path):
+    corpus = make_corpus(tmp_path)
+    variants = get_prompt_variants()
+    store = str(tmp_path / "runs.jsonl")
+
+    def live(request, key):
+        text = request["messages"][0]["content"][0]["text"]
+        output_format = "compact" if text == variants["compact"][0] else "verbose"
+        return {"content": ANSWERS[output_format], "prompt_tokens": 900 if output_format == "verbose" else 700,
+                "completion_tokens": 120 if output_format == "verbose" else 40, "latency": 1.5}
+
+    recorded = run_eval(corpus, variants, ["test-model"], record_backend(live, store))
+    replayed = run_eval(corpus, variants, ["test-model"], replay_backend(load_recordings(store)))
+    assert recorded == replayed
+
+    summary = {row["variant"]: row for row in summarize(replayed)}
+    verbose, compact = summary["verbose"], summary["compact"]
+    assert verbose["runs"] == 2 and verbose["errors"] == 0
+    assert verbose["completion_tokens_p50"] == 120 and compact["completion_tokens_p50"] == 40
+    assert verbose["total_accuracy"] == 0.5  # b.jpg is labeled with another total
+    assert verbose["date_accuracy"] == compact["date_accuracy"] == 1.0
+    assert verbose["item_count_accuracy"] == 1.0 and compact["item_count_accuracy"] == 0.0
+
+
+def test_missing_recording_counts_as_error(tmp_path):
+    corpus = make_corpus(tmp_path)
+    variants = {"verbose": get_prompt_variants()["verbose"]}
+
+    summary = summarize(run_eval(corpus, variants, ["test-model"], replay_backend({})))
+
+    assert summary[0]["errors"] == 2 and summary[0]["parsed_accuracy"] == 0.0
+
+
+def test_preprocessing_change_misses_recordings(tmp_path, monkeypatch):
+    corpus = make_corpus(tmp_path)
+    variants = {"verbose": get_prompt_variants()["verbose"]}
+    store = str(tmp_path / "runs.jsonl")
+
+    def live(request, key):
+        return {"content": ANSWERS["verbose"], "prompt_tokens": 900, "completion_tokens": 120, "latency": 1.5}
+
+    run_eval(corpus, variants, ["test-model"], record_backend(live, store))
+    monkeypatch.setenv("IMAGE_MAX_EDGE", "400")  # the model would now see a smaller image
+
+    summary = summarize(run_eval(corpus, variants, ["test-model"], replay_backend(load_recordings(store))))
+
+    assert summary[0]["errors"] == 2
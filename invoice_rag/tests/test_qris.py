@@ -0,0 +1,37 @@
+"""
+Tests for the QRIS fast path that fills invoices from a receipt's QR code.
+"""
+
+from src import processor
+from src.qris import invoice_from_qris, scan_qris
+from tests.conftest import qris_payload, receipt_with_qr
+
+
+def test_invoice_from_qris_payload():
+    invoice = invoice_from_qris(qris_payload())
+    assert invoice["shop_name"] == "TOKO MAJU JAYA"
+    assert invoice["total_amount"] == 59385.0
+
+    assert invoice_from_qris(qris_payload(amount=None)) is None  # static QRIS has no amount
+    tampered = qris_payload().replace("59385.00", "99385.00")
+    assert invoice_from_qris(tampered) is None  # CRC mismatch
+    assert invoice_from_qris("https://example.com/receipt/123") is None
+
+
+def test_process_invoice_skips_llm_for_qris_receipt(tmp_path, monkeypatch):
+    monkeypatch.setenv("OCR_CACHE_PATH", str(tmp_path / "cache.db"))
+    image_bytes = receipt_with_qr(qris_payload())
+    invoice, merchant = scan_qris(image_bytes)
+    assert invoice["total_amount"] == 59385.0 and merchant == "TOKO MAJU JAYA"
+    static = scan_qris(receipt_with_qr(qris_payload(merchant="INDOMARET", amount=None)))
+    assert static == (None, "INDOMARET")  # static QRIS names the merchant only
+
+    def fail_llm(*args, **kwargs):
+        raise AssertionError("LLM should not be called for a QRIS receipt")
+
+    monkeypatch.setattr(processor, "process_invoice_with_llm", fail_llm)
+    invoice = processor.process_invoice(image_bytes)
+
+    assert invoice["shop_name"] == "TOKO MAJU JAYA"
+    assert invoice["total_amount"] == 59385.0
+    assert invoice["transaction_type"] == "retail"
@@ -0,0 +1,66 @@
+"""
+Tests for pooled raw connections (SQLite: one reusable connection per thread).
+"""
+
+import threading
+
+import pytest
+
+from src import analysis, database
+from src.db_config import close_raw_connections, execute_query, get_raw_pool_stats, raw_connection
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "invoices.db")
+    monkeypatch.setattr(database, "get_default_db_path", lambda: path)
+    execute_query(
+        "CREATE TABLE invoices (id INTEGER PRIMARY KEY, shop_name TEXT, invoice_date TEXT, "
+        "total_amount REAL, transaction_type TEXT, processed_at TEXT, image_path TEXT)",
+        fetch_all=False,
+    )
+    yield path
+    close_raw_connections()
+
+
+def test_repeated_queries_reuse_one_connection(db_path):
+    before = get_raw_pool_stats()
+    execute_query(
+        "INSERT INTO invoices (shop_name, invoice_date, total_amount) VALUES (?, ?, ?)",
+        ("Indomaret", "2099-01-15", 59385.0),
+        fetch_all=False,
+    )
+    for _ in range(10):
+        assert analysis.analyze_invoices()["total_invoices"] == 1
+
+    after = get_raw_pool_stats()
+    assert after["acquired"] - before["acquired"] == 11
+    assert after["opened"] == before["opened"]
+    assert after["in_use"] == 0 and after["backend"] == "sqlite"
+
+
+def test_uncommitted_work_is_rolled_back_on_release(db_path):
+    with raw_connection() as outer:
+        outer.execute("INSERT INTO invoices (shop_name, total_amount) VALUES ('Alfamart', 1)")
+        with raw_connection() as inner:
+            assert inner is outer
+        # The nested release must not discard the outer block's work
+        assert outer.execute("SELECT COUNT(*) FROM invoices").fetchone()[0] == 1
+
+    assert execute_query("SELECT COUNT(*) FROM invoices", fetch_one=True)[0] == 0
+
+
+def test_threads_get_their_own_connection(db_path):
+    with raw_connection() as conn:
+        mine = conn
+    theirs = []
+
+    def borrow():
+        with raw_connection() as conn:
+            theirs.append(conn)
+        close_raw_connections()
+
+    thread = threading.Thread(target=borrow)
+    thread.start()
+    thread.join()
+    assert theirs[0] is not mine
@@ -0,0 +1,65 @@
+"""
+Tests for the receipt crop and perspective-correction stage.
+"""
+
+from io import BytesIO
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from src.image_preprocess import get_preprocess_config, preprocess_image_bytes
+from src.receipt_crop import crop_receipt, order_corners
+
+
+def photo_of_receipt(corners, size=(3000, 4000)):
+    """A 500x1400 receipt warped onto a noisy dark table at ``corners``."""
+    receipt = np.full((1400, 500), 240, dtype=np.uint8)
+    for row, y in enumerate(range(60, 1360, 45)):
+        cv2.putText(receipt, f"ITEM {row:02d}  12.500", (20, y),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.9, 20, 2)
+
+    rng = np.random.default_rng(0)
+    table = (70 + rng.normal(0, 6, size)).clip(0, 255).astype(np.uint8)
+    source = np.float32([[0, 0], [499, 0], [499, 1399], [0, 1399]])
+    matrix = cv2.getPerspectiveTransform(source, np.float32(corners))
+    warped = cv2.warpPerspective(receipt, matrix, size[::-1])
+    mask = cv2.warpPerspective(np.full_like(receipt, 255), matrix, size[::-1])
+    table[mask > 0] = warped[mask > 0]
+    return Image.fromarray(table).convert("RGB")
+
+
+SKEWED = [[1500, 400], [2500, 500], [2400, 2700], [1400, 2600]]
+
+
+def test_order_corners():
+    ordered = order_corners([[10, 90], [90, 10], [10, 10], [90, 90]])
+    assert ordered.tolist() == [[10, 10], [90, 10], [90, 90], [10, 90]]
+
+
+def test_crops_and_straightens_skewed_receipt():
+    cropped = crop_receipt(photo_of_receipt(SKEWED))
+
+    assert cropped is not None
+    width, height = cropped.size
+    assert 900 < width < 1100 and 2100 < height < 2300
+    # Paper fills the result; the dark table is gone
+    assert np.asarray(cropped.convert("L")).mean() > 200
+
+
+def test_keeps_original_without_confident_quadrilateral():
+    assert crop_receipt(Image.new("RGB", (1000, 1500), (230, 230, 230))) is None
+    full_frame = [[20, 20], [3980, 20], [3980, 2980], [20, 2980]]
+    assert crop_receipt(photo_of_receipt(full_frame)) is None
+
+
+def test_crop_reduces_uploaded_bytes():
+    buffer = BytesIO()
+    photo_of_receipt(SKEWED).save(buffer, format="JPEG", quality=92)
+    config = dict(get_preprocess_config(), enabled=True, max_bytes=10_000_000)
+
+    cropped, _ = preprocess_image_bytes(buffer.getvalue(), dict(config, crop=True))
+    uncropped, _ = preprocess_image_bytes(buffer.getvalue(), dict(config, crop=False))
+
+    assert len(cropped) < len(uncropped)
+    assert Image.open(BytesIO(cropped)).height > Image.open(BytesIO(cropped)).width
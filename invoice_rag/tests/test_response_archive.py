@@ -0,0 +1,87 @@
+"""
+Tests for the raw LLM response archive and the offline re-parse command.
+The LLM is replaced; invoices are written to a temporary SQLite file.
+"""
+
+import json
+import sqlite3
+from types import SimpleNamespace
+
+from src import database, llm_gateway, processor
+from src.response_archive import decompress_record, reparse_archive, reparse_record
+
+RESPONSE = json.dumps({
+    "shop_name": "Alfamart",
+    "invoice_date": "15/01/2025",
+    "total_amount": "Rp 25.500",
+    "items": [{"name": "Teh Botol", "quantity": 2, "unit_price": "12.750", "total_price": "25.500"}],
+})
+
+
+def fake_completion(**kwargs):
+    message = SimpleNamespace(content=RESPONSE)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def test_reparse_updates_only_changed_invoices(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "invoices.db")
+    monkeypatch.setattr(database, "get_default_db_path", lambda: db_path)
+    monkeypatch.setattr(llm_gateway, "chat_completion", fake_completion)
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+
+    invoice_ids = [
+        processor.save_to_database_robust(
+            processor.process_invoice_with_llm(b"photo", base64_image="x"), f"receipt_{i}.jpg"
+        )
+        for i in range(3)
+    ]
+
+    conn = sqlite3.connect(db_path)
+    model, payload = conn.execute(
+        "SELECT model, payload FROM llm_responses WHERE invoice_id = ?", (invoice_ids[0],)
+    ).fetchone()
+    assert model == processor.get_ocr_model()
+    assert decompress_record(payload)["responses"][0]["content"] == RESPONSE
+
+    # Simulate rows written by an older, buggier parser
+    conn.execute("UPDATE invoices SET total_amount = 0 WHERE id = ?", (invoice_ids[1],))
+    conn.execute("DELETE FROM invoice_items WHERE invoice_id = ?", (invoice_ids[2],))
+    conn.commit()
+
+    assert reparse_archive(workers=2, db_path=db_path, dry_run=True)["changed"] == 2
+    report = reparse_archive(workers=2, db_path=db_path)
+    assert report == {"checked": 3, "changed": 2, "unchanged": 1, "failed": 0}
+
+    totals = conn.execute("SELECT total_amount FROM invoices ORDER BY id").fetchall()
+    items = conn.execute("SELECT COUNT(*) FROM invoice_items").fetchone()[0]
+    conn.close()
+    assert totals == [(25500.0,)] * 3 and items == 3
+    assert reparse_archive(workers=2, db_path=db_path)["changed"] == 0
+
+
+def test_reparse_record_replays_follow_up_and_tiles():
+    extraction = {
+        "follow_up": True,
+        "responses": [
+            {"role": "extraction", "output_format": "verbose",
+             "content": json.dumps({"shop_name": "Alfamart", "total_amount": "20000-60000"})},
+            {"role": "follow_up", "fields": ["invoice_date", "total_amount"],
+             "content": json.dumps({"invoice_date": "2025-01-15", "total_amount": "25.500"})},
+        ],
+    }
+    invoice = reparse_record(extraction)
+    assert invoice["total_amount"] == 25500.0 and invoice["invoice_date"] == "2025-01-15"
+
+    strip = {"follow_up": False, "responses": [{
+        "role": "extraction", "output_format": "verbose",
+        "content": json.dumps({"shop_name": "", "total_amount": "99.000", "items": []}),
+    }]}
+    headerless = {"follow_up": False, "responses": [{
+        "role": "extraction", "output_format": "verbose",
+        "content": json.dumps({"shop_name": None, "items": [
+            {"name": "GULA", "quantity": 1, "unit_price": 16000, "total_price": 16000}]}),
+    }]}
+    merged = reparse_record({"tiles": [extraction, None, headerless, strip]})
+    assert merged["shop_name"] == "Alfamart" and merged["total_amount"] == 99000.0
+    assert [row["name"] for row in merged["items"]] == ["GULA"]
+    assert reparse_record({"tiles": [headerless, strip]}) is None  # no strip has the shop name
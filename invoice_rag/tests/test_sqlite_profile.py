@@ -0,0 +1,56 @@
+"""
+Tests for the SQLite pragma profile applied to raw and SQLAlchemy connections.
+"""
+
+import pytest
+from sqlalchemy import text
+
+from src.db_config import connect_sqlite, get_engine, get_sqlite_pragmas
+
+
+def pragma(conn, name):
+    return conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+
+def test_raw_connections_get_the_profile(tmp_path, monkeypatch):
+    monkeypatch.setenv("SQLITE_BUSY_TIMEOUT_MS", "7000")
+    conn = connect_sqlite(str(tmp_path / "invoices.db"))
+    try:
+        # WAL persists in the database file, so it is opt-in
+        assert pragma(conn, "journal_mode") == "delete"
+        assert pragma(conn, "synchronous") == 2  # FULL
+        assert pragma(conn, "busy_timeout") == 7000
+        assert pragma(conn, "temp_store") == 2  # MEMORY
+    finally:
+        conn.close()
+
+    conn = connect_sqlite(str(tmp_path / "invoices.db"), timeout=10)
+    try:
+        assert pragma(conn, "busy_timeout") == 10000  # explicit timeout wins
+    finally:
+        conn.close()
+
+
+def test_engine_connections_get_the_profile(tmp_path, monkeypatch):
+    monkeypatch.setenv("SQLITE_JOURNAL_MODE", "WAL")
+    monkeypatch.setenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    engine = get_engine(f"sqlite:///{tmp_path / 'invoices.db'}")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA cache_size")).scalar() == -20000
+
+
+def test_profile_can_be_disabled_and_rejects_bad_values(tmp_path, monkeypatch):
+    monkeypatch.setenv("SQLITE_PROFILE_ENABLED", "false")
+    assert get_sqlite_pragmas() == {}
+    conn = connect_sqlite(str(tmp_path / "plain.db"))
+    try:
+        assert pragma(conn, "journal_mode") == "delete"
+    finally:
+        conn.close()
+
+    monkeypatch.setenv("SQLITE_PROFILE_ENABLED", "true")
+    monkeypatch.setenv("SQLITE_SYNCHRONOUS", "NORMAL; DROP TABLE invoices")
+    with pytest.raises(ValueError):
+        get_sqlite_pragmas()
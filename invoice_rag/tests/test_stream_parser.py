@@ -0,0 +1,39 @@
+"""
+Tests for the incremental JSON parser used with streamed extractions.
+"""
+
+from src.stream_parser import IncrementalJSONParser
+
+COMPLETION = (
+    'Here is the data:\n```json\n{\n  "shop_name": "Toko \\"Maju\\" {Jaya}",\n'
+    '  "invoice_date": "2025-01-15",\n  "total_amount": "59.385",\n  "quantity": 12, "note": null,\n'
+    '  "items": [\n    {"name": "Kopi ]", "quantity": 1},\n    {"name": "Roti", "quantity": 2}\n  ]\n}\n```'
+)
+
+
+def test_fields_complete_before_items_finish():
+    parser = IncrementalJSONParser()
+    snapshots = []
+    for start in range(0, len(COMPLETION), 7):
+        if parser.feed(COMPLETION[start:start + 7]):
+            snapshots.append((dict(parser.fields), dict(parser.element_counts)))
+
+    assert parser.done
+    assert parser.fields == {
+        "shop_name": 'Toko "Maju" {Jaya}',
+        "invoice_date": "2025-01-15",
+        "total_amount": "59.385",
+        "quantity": 12,
+        "note": None,
+    }
+    # The total was known before the first item was complete
+    first_item = next(i for i, (_, counts) in enumerate(snapshots) if counts.get("items"))
+    assert "total_amount" in snapshots[first_item - 1][0]
+    assert parser.element_counts == {"items": 2}
+
+
+def test_compact_positional_items_are_counted():
+    parser = IncrementalJSONParser()
+    parser.feed('{"s":"Alfamart","t":"25.500","i":[["Teh",1,"12.750","12.750"],["Roti",1,"12.750","12.750"]]}')
+    assert parser.fields == {"s": "Alfamart", "t": "25.500"}
+    assert parser.element_counts == {"i": 2}
@@ -0,0 +1,171 @@
+"""
+Tests for tiled extraction of very long receipts.
+"""
+
+import base64
+import threading
+import time
+from io import BytesIO
+from types import SimpleNamespace
+
+from PIL import Image
+
+from src import llm_gateway, processor
+from src.image_preprocess import get_preprocess_config
+from src.tiling import (
+    get_tiling_config,
+    get_tiling_stats,
+    merge_tile_invoices,
+    split_receipt,
+    tile_bounds,
+)
+
+
+def item(name, total):
+    return {"name": name, "quantity": 1, "unit_price": total, "total_price": total}
+
+
+def test_tile_bounds_cover_image_with_overlap():
+    config = dict(get_tiling_config(), min_width=400, tile_aspect=1.5, overlap=0.15, max_tiles=8)
+    assert tile_bounds(800, 1600, config, 1600) == []  # not downscaled
+    assert tile_bounds(800, 2000, config, 1600) == []  # ordinary receipt stays 640px wide
+    assert tile_bounds(800, 4000, config, 0) == []  # no downscale configured
+
+    bounds = tile_bounds(800, 4000, config, 1600)
+    assert bounds[0][0] == 0 and bounds[-1][1] == 4000
+    for (_, bottom), (top, _) in zip(bounds, bounds[1:]):
+        assert bottom - top >= 180  # 15% of a 1200px strip
+
+    capped = tile_bounds(800, 40000, dict(config, max_tiles=4), 1600)
+    assert len(capped) == 4 and capped[-1][1] == 40000
+
+
+def test_split_receipt_keeps_resolution():
+    buffer = BytesIO()
+    Image.new("RGB", (600, 4000), (240, 240, 240)).save(buffer, format="JPEG")
+    preprocess_config = dict(get_preprocess_config(), enabled=True, crop=False)
+
+    tiles = split_receipt(buffer.getvalue(), get_tiling_config(), preprocess_config)
+    sizes = [Image.open(BytesIO(tile)).size for tile, _ in tiles]
+    assert len(tiles) == 6
+    assert all(size == (600, 900) for size in sizes)
+
+    disabled = dict(get_tiling_config(), enabled=False)
+    assert len(split_receipt(buffer.getvalue(), disabled, preprocess_config)) == 1
+
+
+def test_merge_drops_overlap_rows_and_takes_footer_total():
+    header = {"shop_name": "SUPERINDO", "invoice_date": "2025-01-15", "total_amount": 0.0,
+              "items": [item("BERAS 5KG", 75000), item("MINYAK GORENG 2L", 38000)]}
+    middle = {"shop_name": "", "invoice_date": None, "total_amount": 0.0,
+              "items": [item("MINYAK GORENG 2 L", 38000), item("GULA 1KG", 16000)]}
+    footer = {"shop_name": "", "invoice_date": None, "total_amount": 129000.0,
+              "items": [item("GULA 1KG", 16000)]}
+
+    merged = merge_tile_invoices([header, None, middle, footer])
+
+    assert merged["shop_name"] == "SUPERINDO"
+    assert merged["invoice_date"] == "2025-01-15"
+    assert merged["total_amount"] == 129000.0
+    assert [row["name"] for row in merged["items"]] == ["BERAS 5KG", "MINYAK GORENG 2L", "GULA 1KG"]
+    assert merge_tile_invoices([None, None]) is None
+
+
+def test_merge_keeps_genuine_repeated_rows_at_a_boundary():
+    header = {"shop_name": "ALFAMART", "total_amount": 0.0,
+              "items": [item("ROTI TAWAR", 15000), item("AQUA 600ML", 4000)]}
+    footer = {"shop_name": "", "total_amount": 23000.0,
+              "items": [item("AQUA 600ML", 4000)]}
+
+    merged = merge_tile_invoices([header, footer])
+    assert [row["name"] for row in merged["items"]] == ["ROTI TAWAR", "AQUA 600ML", "AQUA 600ML"]
+
+    # A run of repeated rows is a re-read overlap whatever the total says
+    header["items"].append(item("AQUA 600ML", 4000))
+    footer["items"] = [item("AQUA 600ML", 4000), item("AQUA 600ML", 4000), item("TEH BOTOL", 5000)]
+    merged = merge_tile_invoices([header, footer])
+    assert [row["name"] for row in merged["items"]] == [
+        "ROTI TAWAR", "AQUA 600ML", "AQUA 600ML", "TEH BOTOL"
+    ]
+
+
+def test_tiles_are_extracted_concurrently(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    answers = {
+        1: '{"shop_name": "SUPERINDO", "invoice_date": "2025-01-15", "total_amount": 0, '
+           '"items": [{"name": "BERAS", "quantity": 1, "unit_price": "75.000", "total_price": "75.000"}]}',
+        2: '{"shop_name": "", "total_amount": "75.000", "items": '
+           '[{"name": "BERAS", "quantity": 1, "unit_price": "75.000", "total_price": "75.000"}]}',
+    }
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def fake_completion(**request):
+        prompt = request["messages"][0]["content"][0]["text"]
+        index = 1 if "part 1 of 2" in prompt else 2
+        with lock:
+            active.append(index)
+            peak.append(len(active))
+        time.sleep(0.1)
+        with lock:
+            active.remove(index)
+        message = SimpleNamespace(content=answers[index])
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    monkeypatch.setattr(llm_gateway, "chat_completion", fake_completion)
+    tile = base64.b64encode(b"strip").decode("utf-8")
+
+    invoice = processor.process_tiles_with_llm([(tile, "image/jpeg"), (tile, "image/jpeg")])
+
+    assert max(peak) == 2
+    assert invoice["shop_name"] == "SUPERINDO"
+    assert invoice["total_amount"] == 75000.0
+    assert len(invoice["items"]) == 1
+
+
+def test_headerless_strip_keeps_its_items_and_failed_strips_are_counted(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    monkeypatch.setenv("OCR_FOLLOW_UP_ENABLED", "false")
+    answers = {
+        1: '{"shop_name": "SUPERINDO", "invoice_date": "2025-01-15", "total_amount": 0, '
+           '"items": [{"name": "BERAS", "quantity": 1, "unit_price": 75000, "total_price": 75000}]}',
+        # A middle strip without the header: shop_name null, no total
+        2: '{"shop_name": null, "items": '
+           '[{"name": "GULA", "quantity": 1, "unit_price": 16000, "total_price": 16000}]}',
+        3: "not json",
+        4: '{"shop_name": "", "total_amount": "91.000", "items": []}',
+    }
+
+    def fake_completion(**request):
+        prompt = request["messages"][0]["content"][0]["text"]
+        index = next(i for i in answers if f"part {i} of 4" in prompt)
+        message = SimpleNamespace(content=answers[index])
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    monkeypatch.setattr(llm_gateway, "chat_completion", fake_completion)
+    tile = (base64.b64encode(b"strip").decode("utf-8"), "image/jpeg")
+    before = get_tiling_stats()
+
+    invoice = processor.process_tiles_with_llm([tile] * 4)
+
+    assert [row["name"] for row in invoice["items"]] == ["BERAS", "GULA"]
+    assert invoice["_llm"]["failed_tiles"] == 1
+    after = get_tiling_stats()
+    assert after["failed_strips"] - before["failed_strips"] == 1
+    assert after["partial_merges"] - before["partial_merges"] == 1
+
+
+def test_merge_without_shop_name_is_not_saved(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    answer = '{"shop_name": "", "total_amount": "16.000", "items": []}'
+    monkeypatch.setattr(
+        llm_gateway,
+        "chat_completion",
+        lambda **request: SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=answer))]),
+    )
+    tile = (base64.b64encode(b"strip").decode("utf-8"), "image/jpeg")
+    before = get_tiling_stats()
+
+    assert processor.process_tiles_with_llm([tile, tile]) is None
+    assert get_tiling_stats()["rejected"] - before["rejected"] == 1
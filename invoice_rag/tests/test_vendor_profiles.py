@@ -0,0 +1,100 @@
+"""
+Tests for vendor profiles and the specialized prompt used for known vendors.
+The LLM is replaced; invoices are written to a temporary SQLite file.
+"""
+
+import json
+from types import SimpleNamespace
+
+from src import database, llm_gateway, processor
+from src.qris import invoice_from_qris
+from src.vendor_profiles import (
+    find_vendor_profile,
+    get_vendor_prompt_stats,
+    rebuild_vendor_profiles,
+    vendor_key,
+    vendor_max_tokens,
+    vendor_prompt,
+)
+from tests.conftest import qris_payload, receipt_with_qr
+
+RESPONSE = json.dumps({
+    "shop_name": "Indomaret",
+    "invoice_date": "15/01/2025",
+    "total_amount": "7.000",
+    "items": [
+        {"name": "AQUA 600ML", "quantity": 1, "unit_price": "3.500", "total_price": "3.500"},
+        {"name": "TEH PUCUK", "quantity": 1, "unit_price": "3.500", "total_price": "3.500"},
+    ],
+})
+
+
+def completion(content):
+    message = SimpleNamespace(content=content)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def save_history(db_path, monkeypatch, receipts=5):
+    monkeypatch.setattr(database, "get_default_db_path", lambda: db_path)
+    monkeypatch.setattr(llm_gateway, "chat_completion", lambda **kwargs: completion(RESPONSE))
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    for i in range(receipts):
+        invoice_data = processor.process_invoice_with_llm(b"photo", base64_image="x")
+        processor.save_to_database_robust(invoice_data, f"receipt_{i}.jpg")
+
+
+def test_vendor_key_matches_qr_merchant_and_printed_name():
+    assert vendor_key("INDOMARET TAMAN ANGGREK") == vendor_key("Indomaret") == "indomaret"
+    assert vendor_key("PT. Toko Maju Jaya") == "maju"
+    assert vendor_key("Bank BCA") == "bca"
+    assert vendor_key("") is None
+
+
+def test_profile_learned_from_saved_extractions(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "invoices.db")
+    save_history(db_path, monkeypatch, receipts=4)
+    monkeypatch.setenv("VENDOR_PROFILE_MIN_RECEIPTS", "5")
+    assert find_vendor_profile("INDOMARET TAMAN ANGGREK", db_path) is None
+
+    save_history(db_path, monkeypatch, receipts=1)
+    profile = find_vendor_profile("INDOMARET TAMAN ANGGREK", db_path)
+    assert profile["shop_name"] == "Indomaret" and profile["receipts"] == 5
+    assert profile["max_items"] == 2
+    assert profile["common_items"] == ["AQUA 600ML", "TEH PUCUK"]
+    assert profile["amount_format"] == "dot" and profile["date_format"] == "DD/MM/YYYY"
+
+    prompt = vendor_prompt(profile)
+    assert "dots as thousands separators" in prompt and "DD/MM/YYYY" in prompt
+    assert len(prompt) < len(processor.EXTRACTION_PROMPT)
+    assert vendor_max_tokens(profile) < 2000
+
+    # QRIS fast-path invoices have no archived extraction and are not profiled
+    processor.save_to_database_robust(invoice_from_qris(qris_payload()), "qris.jpg")
+    assert rebuild_vendor_profiles(db_path) == 1
+    assert find_vendor_profile("Indomaret", db_path) == profile
+
+
+def test_static_qris_selects_specialized_prompt(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "invoices.db")
+    save_history(db_path, monkeypatch)
+    monkeypatch.setenv("OCR_CACHE_PATH", str(tmp_path / "cache.db"))
+    monkeypatch.setenv("OCR_FOLLOW_UP_ENABLED", "false")
+    monkeypatch.setenv("VENDOR_PROMPT_HOLDOUT", "0")
+    requests = []
+
+    def fake_completion(**kwargs):
+        requests.append(kwargs)
+        # The specialized answer is truncated: the generic prompt takes over
+        return completion('{"shop_name": "Indomaret", "items": [' if len(requests) == 1 else RESPONSE)
+
+    monkeypatch.setattr(llm_gateway, "chat_completion", fake_completion)
+    image_bytes = receipt_with_qr(qris_payload(merchant="INDOMARET TAMAN ANGGREK", amount=None))
+    invoice = processor.process_invoice(image_bytes, check_quality=False)
+
+    assert invoice["total_amount"] == 7000.0
+    specialized, generic = (request["messages"][0]["content"][0]["text"] for request in requests)
+    assert specialized.startswith("This is a receipt from Indomaret")
+    assert generic == processor.EXTRACTION_PROMPT
+    assert requests[0]["max_completion_tokens"] < requests[1]["max_completion_tokens"] == 2000
+    assert invoice["_llm"]["responses"][0]["vendor"] == "indomaret"
+    assert get_vendor_prompt_stats()["specialized"]["failure_rate"] > 0
@@ -0,0 +1,68 @@
+"""
+Tests for the directory watch ingestion daemon.
+"""
+
+import os
+import threading
+import time
+
+from src import database, watcher
+
+
+def test_poll_once_debounces_and_tracks_changes(tmp_path):
+    state = watcher.new_watch_state()
+    receipt = tmp_path / "receipt.jpg"
+    receipt.write_bytes(b"partial")
+    (tmp_path / "notes.txt").write_text("ignored")
+
+    assert watcher.poll_once(str(tmp_path), state, debounce=5, limit=10, now=0) == []
+    # Still being written: the debounce restarts
+    receipt.write_bytes(b"partial scan, now complete")
+    assert watcher.poll_once(str(tmp_path), state, debounce=5, limit=10, now=4) == []
+    assert watcher.poll_once(str(tmp_path), state, debounce=5, limit=10, now=8) == []
+
+    ready = watcher.poll_once(str(tmp_path), state, debounce=5, limit=10, now=10)
+    assert [path for path, _ in ready] == [str(receipt)]
+    watcher.mark_queued(state, *ready[0])
+    assert watcher.poll_once(str(tmp_path), state, debounce=5, limit=10, now=20) == []
+
+    # Modified later: picked up again after the debounce
+    stat = os.stat(receipt)
+    os.utime(receipt, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert watcher.poll_once(str(tmp_path), state, debounce=5, limit=10, now=21) == []
+    assert len(watcher.poll_once(str(tmp_path), state, debounce=5, limit=10, now=30)) == 1
+
+    receipt.unlink()
+    watcher.poll_once(str(tmp_path), state, debounce=5, limit=10, now=40)
+    assert state["seen"] == {} and state["pending"] == {}
+
+
+def test_run_watch_ingests_new_files_once(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "invoices.db")
+    monkeypatch.setattr(database, "get_default_db_path", lambda: db_path)
+    inbox = tmp_path / "invoices"
+    (inbox / "2025").mkdir(parents=True)
+    (inbox / "a.jpg").write_bytes(b"receipt a")
+    (inbox / "2025" / "b.png").write_bytes(b"receipt b")
+
+    processed = []
+    monkeypatch.setattr(watcher, "process_invoice", lambda path: processed.append(path) or {"total_amount": 1.0})
+    monkeypatch.setattr(watcher, "save_to_database_robust", lambda data, path, content_hash: len(processed))
+
+    stop = threading.Event()
+    result = {}
+    thread = threading.Thread(
+        target=lambda: result.update(
+            watcher.run_watch(str(inbox), workers=2, poll_interval=0.05, debounce=0.1, stop_event=stop)
+        )
+    )
+    thread.start()
+    deadline = time.monotonic() + 5
+    while len(processed) < 2 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    time.sleep(0.3)
+    stop.set()
+    thread.join()
+
+    assert sorted(os.path.basename(path) for path in processed) == ["a.jpg", "b.png"]
+    assert result["saved"] == 2